@@ -1,41 +1,102 @@
-from functools import lru_cache
+import hmac
+from typing import Optional
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException, Query
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 
+from app.config import get_settings
+from app.core.events import EventBus, get_event_bus
+from app.core.tenancy import DEFAULT_TENANT, validate_tenant_id
 from app.db.database import get_db
+from app.services.analytics_service import AnalyticsService
+from app.services.anomaly_service import AnomalyService
+from app.services.budget_service import BudgetService
 from app.services.classifier_service import MerchantClassifier
-from app.services.gmail_service import GmailService
+from app.services.recurring_service import RecurringPaymentService
+from app.services.tenant_services import get_email_archive, get_gmail_service, get_merchant_classifier
 from app.services.transaction_service import TransactionService
 
+settings = get_settings()
 
-@lru_cache()
-def get_gmail_service() -> GmailService:
-    return GmailService()
 
+bearer = HTTPBearer(auto_error=False, description="API key of the tenant the request acts for")
 
-@lru_cache()
-def get_merchant_classifier() -> MerchantClassifier:
-    return MerchantClassifier()
+
+def _tenant_for_api_key(api_key: Optional[str]) -> str:
+    """Tenant an API key belongs to; without TENANT_API_KEYS every request is the default tenant's"""
+    if not settings.TENANT_API_KEYS:
+        return DEFAULT_TENANT
+    if not api_key:
+        raise HTTPException(status_code=401, detail="API key required", headers={"WWW-Authenticate": "Bearer"})
+
+    tenant_id = None
+    for key, key_tenant_id in settings.TENANT_API_KEYS.items():
+        # Every key is compared in constant time, so timing doesn't reveal how much of a key matched
+        if hmac.compare_digest(key.encode(), api_key.encode()):
+            tenant_id = key_tenant_id
+    if tenant_id is None:
+        raise HTTPException(status_code=401, detail="Invalid API key", headers={"WWW-Authenticate": "Bearer"})
+
+    try:
+        return validate_tenant_id(tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+
+def get_tenant_id(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)) -> str:
+    """Tenant the request acts for, from the API key in its Authorization header"""
+    return _tenant_for_api_key(credentials.credentials if credentials else None)
 
 
 async def get_transaction_service(
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        tenant_id: str = Depends(get_tenant_id)
 ) -> TransactionService:
-    gmail_service = GmailService()
-    classifier = get_merchant_classifier()  # Use the existing function
     return TransactionService(
-        gmail_service=gmail_service,
-        classifier=classifier,
-        db=db
+        gmail_service=get_gmail_service(tenant_id),
+        classifier=get_merchant_classifier(tenant_id),
+        db=db,
+        archive=get_email_archive(tenant_id),
+        tenant_id=tenant_id
     )
 
 
-_classifier = None
+def get_classifier(tenant_id: str = Depends(get_tenant_id)) -> MerchantClassifier:
+    return get_merchant_classifier(tenant_id)
+
+
+def get_tenant_event_bus(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer),
+        api_key: Optional[str] = Query(default=None, description="API key for clients that can't set headers")
+) -> EventBus:
+    # Browsers' EventSource can't send custom headers, so streams also accept ?api_key=
+    return get_event_bus(_tenant_for_api_key(credentials.credentials if credentials else api_key))
+
+
+def get_analytics_service(
+        db: Session = Depends(get_db),
+        tenant_id: str = Depends(get_tenant_id)
+) -> AnalyticsService:
+    return AnalyticsService(db, tenant_id)
+
+
+def get_anomaly_service(
+        db: Session = Depends(get_db),
+        tenant_id: str = Depends(get_tenant_id)
+) -> AnomalyService:
+    return AnomalyService(db, tenant_id)
+
+
+def get_budget_service(
+        db: Session = Depends(get_db),
+        tenant_id: str = Depends(get_tenant_id)
+) -> BudgetService:
+    return BudgetService(db, tenant_id)
 
 
-def get_classifier():
-    global _classifier
-    if _classifier is None:
-        _classifier = MerchantClassifier()
-    return _classifier
+def get_recurring_payment_service(
+        db: Session = Depends(get_db),
+        tenant_id: str = Depends(get_tenant_id)
+) -> RecurringPaymentService:
+    return RecurringPaymentService(db, tenant_id)
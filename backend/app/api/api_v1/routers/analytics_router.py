@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.concurrency import run_in_threadpool
+
+from app.api.api_v1.dependencies import get_analytics_service
+from app.config import get_settings
+from app.models.schemas import DateRange, SpendingTrend, TransactionSummary
+from app.services.analytics_service import TREND_GROUPS, TREND_INTERVALS, AnalyticsService
+
+settings = get_settings()
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+CURRENCY_PATTERN = f"^({'|'.join([settings.HOME_CURRENCY, *settings.FX_CURRENCIES])})$"
+
+
+@router.get("/summary", response_model=TransactionSummary)
+async def get_range_summary(
+        response: Response,
+        start_date: datetime = Query(..., alias="startDate"),
+        end_date: datetime = Query(..., alias="endDate"),
+        currency: Optional[str] = Query(default=None, pattern=CURRENCY_PATTERN),
+        service: AnalyticsService = Depends(get_analytics_service)
+):
+    """
+    Spending summary over every transaction in the range, not just one page, optionally in
+    another reporting currency. Only stored transactions are counted; this does not trigger a
+    Gmail sync.
+    """
+    date_range = DateRange(start_date=start_date, end_date=end_date)
+    await service.prepare_currency(date_range, currency)
+    # The aggregates block on the database or DuckDB, so they run on the threadpool like a plain def
+    # handler would; only the rate fetch above needs the event loop
+    summary, engine = await run_in_threadpool(service.get_summary, date_range, currency)
+    response.headers["X-Analytics-Engine"] = engine
+    return summary
+
+
+@router.get("/trends", response_model=SpendingTrend)
+async def get_trends(
+        response: Response,
+        start_date: datetime = Query(..., alias="startDate"),
+        end_date: datetime = Query(..., alias="endDate"),
+        interval: str = Query(default="month", pattern=f"^({'|'.join(TREND_INTERVALS)})$"),
+        group_by: Optional[str] = Query(default=None, pattern=f"^({'|'.join(TREND_GROUPS)})$"),
+        currency: Optional[str] = Query(default=None, pattern=CURRENCY_PATTERN),
+        service: AnalyticsService = Depends(get_analytics_service)
+):
+    """Spending and transaction counts per day, week or month, optionally split by category or card"""
+    date_range = DateRange(start_date=start_date, end_date=end_date)
+    await service.prepare_currency(date_range, currency)
+    trend, engine = await run_in_threadpool(service.get_trend, date_range, interval, group_by, currency)
+    response.headers["X-Analytics-Engine"] = engine
+    return trend
@@ -0,0 +1,40 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+
+from app.api.api_v1.dependencies import get_budget_service
+from app.core.responses import OrjsonResponse
+from app.models.schemas import BudgetRequest, BudgetStatus, BudgetStatusList
+from app.services.budget_service import BudgetService
+
+router = APIRouter(prefix="/budgets", tags=["budgets"])
+
+
+@router.get("", response_model=BudgetStatusList)
+def get_budgets(
+        month: Optional[str] = Query(default=None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$"),
+        recount: bool = False,
+        service: BudgetService = Depends(get_budget_service)
+):
+    """
+    Spend against each budget in a month (YYYY-MM, default the current month). Spend is kept
+    up to date as transactions change; ``recount`` re-sums the month from the transactions.
+    """
+    return service.get_status(month, recount)
+
+
+@router.put("", response_model=BudgetStatus)
+def set_budget(request: BudgetRequest, service: BudgetService = Depends(get_budget_service)):
+    """Create a monthly budget for a primary category or card, or change its limit"""
+    return service.set_budget(request)
+
+
+@router.delete("/{budget_id}", response_class=OrjsonResponse)
+def delete_budget(
+        budget_id: int = Path(..., description="The ID of the budget to delete"),
+        service: BudgetService = Depends(get_budget_service)
+):
+    """Delete a budget and its spend counters"""
+    if not service.delete_budget(budget_id):
+        raise HTTPException(status_code=404, detail=f"Budget {budget_id} not found")
+    return {"success": True}
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Request
+from fastapi.responses import StreamingResponse
+
+from app.api.api_v1.dependencies import get_tenant_event_bus
+from app.config import get_settings
+from app.core.events import EventBus
+
+router = APIRouter(tags=["events"])
+
+
+@router.get("/events")
+async def stream_events(
+        request: Request,
+        last_event_id: Optional[int] = Header(default=None, alias="Last-Event-ID"),
+        events: EventBus = Depends(get_tenant_event_bus)
+):
+    """
+    Server-Sent Events stream of sync progress (``sync_progress``), new and updated transactions
+    (``transactions_created``, ``transactions_updated``, ``category_updated``) and the resulting
+    changes to the spending summary (``summary_delta``) for the requesting tenant.
+    """
+    heartbeat = get_settings().EVENTS_HEARTBEAT_SECONDS
+
+    async def stream():
+        queue = events.subscribe(last_event_id)
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield event.encode()
+        finally:
+            events.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from app.api.api_v1.dependencies import get_anomaly_service, get_recurring_payment_service
+from app.models.schemas import DateRange, RecurringPaymentList, SpendingAnomalyList
+from app.services.anomaly_service import ANOMALY_KINDS, AnomalyService
+from app.services.recurring_service import RecurringPaymentService
+
+router = APIRouter(prefix="/insights", tags=["insights"])
+
+
+@router.get("/recurring", response_model=RecurringPaymentList)
+def get_recurring_payments(
+        active_only: bool = True,
+        refresh: bool = False,
+        service: RecurringPaymentService = Depends(get_recurring_payment_service)
+):
+    """
+    Subscriptions, bills and other charges that repeat at a regular interval for a stable amount.
+    Detection is refreshed for affected merchants after every sync; ``refresh`` re-runs it over the
+    whole history first.
+    """
+    if refresh:
+        service.refresh()
+    return service.get_recurring(active_only)
+
+
+@router.get("/anomalies", response_model=SpendingAnomalyList)
+def get_anomalies(
+        start_date: Optional[datetime] = Query(default=None, alias="startDate"),
+        end_date: Optional[datetime] = Query(default=None, alias="endDate"),
+        kind: Optional[str] = Query(default=None, pattern=f"^({'|'.join(ANOMALY_KINDS)})$"),
+        min_score: float = Query(default=0.0, ge=0.0),
+        limit: int = Query(default=100, ge=1, le=1000),
+        refresh: bool = False,
+        service: AnomalyService = Depends(get_anomaly_service)
+):
+    """
+    Charges far above their merchant's usual amount (``merchant``) and weeks of unusually high
+    spending in a category (``category``), newest first. New transactions are scored as they are
+    synced; ``refresh`` rebuilds the baselines and re-scores the whole window first.
+    """
+    if refresh:
+        service.rebuild(rescore=True)
+    return service.get_anomalies(DateRange(start_date=start_date, end_date=end_date), kind, min_score, limit)
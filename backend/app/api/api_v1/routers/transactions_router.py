@@ -6,8 +6,9 @@ import json
 from fastapi import APIRouter, Depends, Query, HTTPException, Body
 
 from app.api.api_v1.dependencies import get_transaction_service
+from app.core.responses import OrjsonResponse
 from app.models.schemas import (
-    Transaction, DateRange, TransactionList, CreateTransactionRequest
+    Transaction, DateRange, TransactionList, CreateTransactionRequest, TransactionSearchResult
 )
 from app.services.transaction_service import TransactionService
 
@@ -65,7 +66,7 @@ async def get_transactions(
     return TransactionList(transactions=transactions, transaction_summary=summary, categories=categories_data)
 
 
-@router.get("/transactions/count")
+@router.get("/transactions/count", response_class=OrjsonResponse)
 async def get_transaction_count(
         start_date: datetime = Query(..., alias="startDate"),
         end_date: datetime = Query(..., alias="endDate"),
@@ -99,6 +100,24 @@ async def get_transaction_count(
     return {"count": count}
 
 
+@router.get("/transactions/search", response_model=TransactionSearchResult)
+async def search_transactions(
+        q: str = Query(..., min_length=1, max_length=200),
+        start_date: Optional[datetime] = Query(default=None, alias="startDate"),
+        end_date: Optional[datetime] = Query(default=None, alias="endDate"),
+        include_excluded: bool = True,
+        limit: int = Query(default=50, ge=1, le=1000),
+        offset: int = Query(default=0, ge=0),
+        service: TransactionService = Depends(get_transaction_service)
+):
+    """
+    Search transactions by merchant and description, best matches first.
+    Only stored transactions are searched; this does not trigger a Gmail sync.
+    """
+    date_range = DateRange(start_date=start_date, end_date=end_date) if start_date or end_date else None
+    return service.search_transactions(q, date_range, include_excluded, limit, offset)
+
+
 @router.patch("/transactions/{transaction_id}/toggle-exclude", response_model=Transaction)
 async def toggle_transaction_exclusion(
         transaction_id: uuid.UUID,
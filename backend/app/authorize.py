@@ -0,0 +1,37 @@
+"""
+Sign a tenant in to Gmail.
+
+    python -m app.authorize [--tenant default]
+
+Opens Google's OAuth consent page in a browser and saves the resulting token to
+``GMAIL_TOKEN_PATH`` (``<TENANT_DATA_DIR>/<tenant>/token.json`` for other tenants). API
+requests and the scheduler never start this flow themselves: until a tenant is signed in,
+requests that need to sync Gmail answer 409 and scheduled syncs skip the tenant. Run it
+again when a token has been revoked or its refresh fails.
+"""
+import argparse
+
+from app.core.tenancy import DEFAULT_TENANT, gmail_token_path, validate_tenant_id
+from app.services.gmail_service import GmailService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Tenant whose Gmail account is signed in")
+    args = parser.parse_args()
+    try:
+        validate_tenant_id(args.tenant)
+    except ValueError as e:
+        parser.error(str(e))
+
+    token_path = gmail_token_path(args.tenant)
+    gmail_service = GmailService(token_path=token_path)
+    gmail_service.authorize(interactive=True)
+    history_id = gmail_service.get_history_id()  # Confirms the token can read the mailbox
+    print(f"Tenant:      {args.tenant}")
+    print(f"Token:       {token_path}")
+    print(f"History ID:  {history_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Historical backfill of bank alert emails.
+
+    python -m app.backfill --start 2020-01-01 [--end 2025-01-01] [--window-days 30] [--workers 4] [--tenant default]
+
+The date span is split into windows that a pool of workers fetches from Gmail, parses,
+batch-classifies and bulk inserts. Each finished window is checkpointed in the
+``backfill_windows`` table and marked as synced coverage, so a killed run resumes with
+the windows that are still pending or failed.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from app.config import get_settings
+from app.core.logger import logger
+from app.core.tenancy import (
+    DEFAULT_TENANT, classifier_model_path, gmail_token_path, rules_file_path, validate_tenant_id
+)
+from app.db.crud import BackfillCrud, SyncInfoCrud
+from app.db.database import SessionLocal
+from app.migrate import migrate
+from app.models.schemas import DateRange
+from app.services.archive_service import EmailArchive
+from app.services.classifier_service import MerchantClassifier
+from app.services.gmail_service import GmailService
+from app.services.transaction_service import TransactionService
+
+settings = get_settings()
+
+
+def split_windows(start_date: datetime, end_date: datetime, window_days: int) -> List[Tuple[datetime, datetime]]:
+    """Split a date span into consecutive windows of at most ``window_days`` days"""
+    windows = []
+    step = timedelta(days=window_days)
+    window_start = start_date
+    while window_start < end_date:
+        window_end = min(window_start + step, end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+
+async def run_backfill(
+        start_date: datetime,
+        end_date: datetime,
+        window_days: int,
+        workers: int,
+        tenant_id: str = DEFAULT_TENANT
+) -> dict:
+    migrate()
+    db = SessionLocal()
+    # Each worker gets its own session: ingestion awaits classification and rate lookups
+    # mid-batch, so workers sharing one would commit or roll back each other's work
+    sessions = []
+
+    try:
+        windows = BackfillCrud.ensure_windows(db, tenant_id, split_windows(start_date, end_date, window_days))
+        pending = [window.id for window in windows if window.status != "done"]
+        logger.info(f"Backfill {start_date:%Y-%m-%d} to {end_date:%Y-%m-%d} for tenant {tenant_id}: "
+                    f"{len(pending)} of {len(windows)} windows to process with {workers} workers")
+
+        queue = asyncio.Queue()
+        for window_id in pending:
+            queue.put_nowait(window_id)
+
+        classifier = MerchantClassifier(
+            rules_file_path=rules_file_path(tenant_id), model_path=classifier_model_path(tenant_id)
+        )
+        archive = EmailArchive(tenant_id) if settings.EMAIL_ARCHIVE_ENABLED else None
+        services = []
+        for _ in range(min(workers, len(pending))):
+            gmail_service = GmailService(token_path=gmail_token_path(tenant_id))
+            gmail_service.service  # Authenticate up front rather than racing OAuth flows in worker threads
+            sessions.append(SessionLocal())
+            services.append(TransactionService(
+                gmail_service=gmail_service, classifier=classifier, db=sessions[-1], archive=archive,
+                tenant_id=tenant_id
+            ))
+
+        totals = {"windows": 0, "failed": 0, "messages": 0, "transactions": 0}
+        started = time.perf_counter()
+
+        async def worker(service: TransactionService):
+            while not queue.empty():
+                window = BackfillCrud.get_window(service.db, queue.get_nowait())
+                window_start, window_end = window.start_date, window.end_date
+                query = service._build_gmail_query(DateRange(start_date=window_start, end_date=window_end))
+
+                try:
+                    # The Gmail client blocks, so each worker fetches on its own thread and client
+                    emails = await asyncio.to_thread(service.gmail_service.get_messages, query)
+                    created = await service.ingest_emails(emails)
+                except Exception as e:
+                    logger.error(f"Backfill window {window_start:%Y-%m-%d} failed: {str(e)}")
+                    service.db.rollback()
+                    BackfillCrud.mark_window(service.db, window, "failed", error=str(e))
+                    totals["failed"] += 1
+                    continue
+
+                BackfillCrud.mark_window(service.db, window, "done", len(emails), created)
+                SyncInfoCrud.add_coverage(service.db, tenant_id, window_start, window_end)
+
+                totals["windows"] += 1
+                totals["messages"] += len(emails)
+                totals["transactions"] += created
+                elapsed = time.perf_counter() - started
+                processed = totals["windows"] + totals["failed"]
+                eta = elapsed / processed * (len(pending) - processed)
+                logger.info(f"Window {window_start:%Y-%m-%d}..{window_end:%Y-%m-%d}: {len(emails)} messages, "
+                            f"{created} new transactions ({processed}/{len(pending)}, "
+                            f"{totals['messages'] / elapsed:.1f} msg/s, ETA {eta:.0f}s)")
+
+        await asyncio.gather(*(worker(service) for service in services))
+
+        totals["seconds"] = time.perf_counter() - started
+        return totals
+    finally:
+        for session in sessions:
+            session.close()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", required=True, type=datetime.fromisoformat, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="End date (YYYY-MM-DD), defaults to now")
+    parser.add_argument("--window-days", type=int, default=settings.BACKFILL_WINDOW_DAYS)
+    parser.add_argument("--workers", type=int, default=settings.BACKFILL_WORKERS)
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Tenant whose mailbox is backfilled")
+    args = parser.parse_args()
+
+    end_date = min(args.end or datetime.now(), datetime.now())
+    if args.start >= end_date:
+        parser.error("--start must be before --end")
+    try:
+        validate_tenant_id(args.tenant)
+    except ValueError as e:
+        parser.error(str(e))
+
+    totals = asyncio.run(run_backfill(args.start, end_date, args.window_days, args.workers, args.tenant))
+
+    seconds = totals["seconds"] or 1e-9
+    print(f"Windows:      {totals['windows']} done, {totals['failed']} failed")
+    print(f"Messages:     {totals['messages']} ({totals['messages'] / seconds:.1f}/s)")
+    print(f"Transactions: {totals['transactions']} ({totals['transactions'] / seconds:.1f}/s)")
+    print(f"Elapsed:      {seconds:.1f}s")
+    if totals["failed"]:
+        print("Re-run the same command to retry failed windows.")
+
+
+if __name__ == "__main__":
+    main()
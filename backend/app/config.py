@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import List
+from typing import Dict, List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -15,23 +15,105 @@ class Settings(BaseSettings):
 
     # External APIs
     OPENAI_API_KEY: str
+    OPENAI_BASE_URL: Optional[str] = None  # Override for OpenAI-compatible or stub servers
 
     # Gmail API
     GMAIL_CREDENTIALS_PATH: str
-    GMAIL_TOKEN_PATH: str = "token.json"
+    GMAIL_TOKEN_PATH: str = "token.json"  # Token of the default tenant; others use <TENANT_DATA_DIR>/<tenant>/token.json
     GMAIL_SCOPES: List[str] = ["https://www.googleapis.com/auth/gmail.readonly"]
 
+    # Tenancy (tenant chosen per request by the API key it authenticates with)
+    TENANTS: List[str] = []  # Allowed tenant IDs (list "default" to keep it); empty allows the "default" tenant only
+    TENANT_API_KEYS: Dict[str, str] = {}  # API key -> tenant ID; empty serves every request as "default"
+    TENANT_DATA_DIR: Optional[str] = None  # Per-tenant tokens and rules, defaults to app/data/tenants
+    TENANT_POOL_SIZE: int = 32  # Tenants whose Gmail clients and classifier caches are kept in memory
+
+    # Database
+    AUTO_MIGRATE: bool = False  # Create missing tables on startup instead of with `python -m app.migrate`
+
     # Caching
     CACHE_TTL: int = 86400  # 24 hours
     CACHE_MAX_SIZE: int = 1000
 
+    # Classification
+    CLASSIFY_BATCH_SIZE: int = 20  # Merchants classified per OpenAI call during bulk ingest
+    LOCAL_CLASSIFIER_ENABLED: bool = True  # Try a model trained on the tenant's own labels before OpenAI
+    LOCAL_CLASSIFIER_MIN_CONFIDENCE: float = 0.85  # Calibrated confidence below which OpenAI is asked instead
+    # Labeled merchants needed before the first model is trained. Models of fewer than 50 merchants
+    # (local_classifier.MIN_HOLDOUT) can't be calibrated and are never used.
+    LOCAL_CLASSIFIER_MIN_MERCHANTS: int = 200
+    LOCAL_CLASSIFIER_MIN_LABEL_CONFIDENCE: float = 0.6  # Transactions classified less confidently aren't trained on
+    LOCAL_CLASSIFIER_RETRAIN_AFTER: int = 50  # New merchant labels that trigger a warm-started retrain
+
     # Logging
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # text or json (one serialized record per line)
+    LOG_ENQUEUE: bool = True  # Write log records from a background thread
+    LOG_MODULE_LEVELS: Dict[str, str] = {}  # e.g. {"app.services.transaction_service": "DEBUG"}
+    LOG_SAMPLED_EVENTS_PER_SECOND: int = 5  # Cap on per-transaction log events, per event; 0 disables the cap
+
+    # Monitoring
+    METRICS_ENABLED: bool = True  # Expose Prometheus metrics at /metrics
+    PROFILING_ENABLED: bool = False  # Allow per-request profiling via X-Profile header or ?profile=1
+    PROFILING_SAMPLE_RATE: float = 0.0  # Fraction of requests profiled without being asked
+    PROFILING_DIR: Optional[str] = None  # Defaults to app/data/profiles
+
+    # Response compression; brotli when the optional brotli package is installed and accepted, gzip otherwise
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Smaller responses are sent as they are
+    COMPRESSION_GZIP_LEVEL: int = 6  # 9 saves ~6% more on transaction lists at over twice the CPU
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Live events (Server-Sent Events at /events)
+    EVENTS_QUEUE_SIZE: int = 1000  # Events buffered per client before its oldest are dropped
+    EVENTS_REPLAY_SIZE: int = 200  # Recent events replayed to clients reconnecting with Last-Event-ID
+    EVENTS_HEARTBEAT_SECONDS: int = 15
 
     # Sync Configuration
     MAX_SYNC_DAYS: int = 90  # Maximum days to sync in one operation
     SYNC_WINDOW_DAYS: int = 30  # Preferred sync window size
     MIN_SYNC_OVERLAP_HOURS: int = 1  # Minimum overlap to avoid re-sync
+
+    # Background sync, so reads find recent mail already ingested
+    SCHEDULED_SYNC_ENABLED: bool = True
+    SCHEDULED_SYNC_INTERVAL_MINUTES: int = 15
+    SCHEDULED_SYNC_JITTER: float = 0.2  # Each interval varies randomly by up to this fraction
+    SCHEDULED_SYNC_LOCK_FILE: Optional[str] = None  # Defaults to app/data/scheduler.lock
+
+    # Raw email archive for offline re-parsing
+    EMAIL_ARCHIVE_ENABLED: bool = True
+    EMAIL_ARCHIVE_DIR: Optional[str] = None  # Defaults to app/data/archive
+    EMAIL_ARCHIVE_CODEC: str = "zstd"  # zstd (needs the zstandard package) or gzip
+    EMAIL_ARCHIVE_SEGMENT_BYTES: int = 64 * 1024 * 1024
+
+    # Analytics snapshots (Parquet, needs the pyarrow package)
+    SNAPSHOT_DIR: Optional[str] = None  # Defaults to app/data/snapshots, one directory per tenant
+    SNAPSHOT_COMPRESSION: str = "zstd"
+    SNAPSHOT_BATCH_ROWS: int = 50000  # Rows read from the database per batch
+
+    # Range analytics (/analytics); DuckDB is used when the optional duckdb package is installed
+    ANALYTICS_DUCKDB_ENABLED: bool = True
+    ANALYTICS_DUCKDB_SOURCE: str = "sqlite"  # sqlite (live database, needs DuckDB's sqlite extension) or snapshot
+    ANALYTICS_DUCKDB_MIN_DAYS: int = 180  # Shorter ranges are answered by the transactional database
+
+    # Spending anomalies (/insights/anomalies)
+    ANOMALY_WINDOW_DAYS: int = 365  # History the merchant and category baselines are computed over
+    ANOMALY_BASELINE_MAX_AGE_HOURS: int = 24  # The first sync after this rebuilds the baselines
+    ANOMALY_SCORE_THRESHOLD: float = 3.5  # Robust z-score above which spending is flagged
+
+    # Budgets (/budgets)
+    BUDGET_ALERT_THRESHOLDS: List[float] = [0.8, 1.0]  # Shares of a budget announced once per month when crossed
+
+    # Currencies; stored amounts are in HOME_CURRENCY, converted with the rates kept in fx_rates
+    HOME_CURRENCY: str = "JMD"
+    FX_CURRENCIES: List[str] = ["USD", "CAD", "GBP", "EUR"]  # Foreign currencies whose rates are stored
+    FX_FALLBACK_RATES: Dict[str, float] = {"USD": 159.0}  # Last resort when no rate can be fetched or found
+    FX_FETCH_CONCURRENCY: int = 8  # Dates fetched from the rate source at once
+    FX_REPORTING_STEP_DAYS: int = 7  # Spacing of the rates filled in before re-denominating a long range
+
+    # Historical backfill
+    BACKFILL_WINDOW_DAYS: int = 30  # Date span fetched per backfill work item
+    BACKFILL_WORKERS: int = 4  # Concurrent Gmail fetchers during backfill
     
     # Card Types
     MASTERCARD_TYPE: str = "MASTERCARD PLATINUM USD"
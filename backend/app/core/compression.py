@@ -0,0 +1,128 @@
+import zlib
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import get_settings
+
+try:
+    import brotli
+except ImportError:  # Optional dependency, gzip is used instead
+    brotli = None
+
+settings = get_settings()
+
+# Streamed event by event, or compressed already
+SKIPPED_CONTENT_TYPES = ("text/event-stream", "application/gzip", "application/zip", "image/", "audio/", "video/")
+
+# Bodies this large are compressed in a worker thread rather than on the event loop
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """``br`` or ``gzip``, whichever the client accepts (brotli preferred when installed), or None"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    if brotli and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY, mode=brotli.MODE_TEXT)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, body: bytes, last: bool) -> bytes:
+        """Compress a chunk, flushed so the client can decode it without waiting for the next one"""
+        if self._brotli:
+            return self._brotli.process(body) + (self._brotli.finish() if last else self._brotli.flush())
+        return self._zlib.compress(body) + self._zlib.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses of at least COMPRESSION_MINIMUM_SIZE bytes.
+
+    Brotli is used when the optional ``brotli`` package is installed and the client accepts it,
+    gzip otherwise. Event streams, responses that already carry a Content-Encoding and
+    compressed media pass through untouched. Streamed bodies are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", "")) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = {}
+        state = {"skip": False, "compressor": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether compression applies
+                start.update(message)
+                headers = Headers(raw=message.get("headers", []))
+                content_type = headers.get("content-type", "").lower()
+                state["skip"] = (
+                    "content-encoding" in headers
+                    or message["status"] == 206
+                    or content_type.startswith(SKIPPED_CONTENT_TYPES)
+                )
+                if state["skip"]:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or state["skip"]:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            compressor = state["compressor"]
+            if compressor is None:
+                headers = MutableHeaders(raw=start.setdefault("headers", []))
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    state["skip"] = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                compressor = state["compressor"] = _Compressor(encoding)
+                body = await self._compress(compressor, body, not more_body)
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+            else:
+                body = await self._compress(compressor, body, not more_body)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    async def _compress(compressor: _Compressor, body: bytes, last: bool) -> bytes:
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await run_in_threadpool(compressor.compress, body, last)
+        return compressor.compress(body, last)
@@ -0,0 +1,113 @@
+import asyncio
+import itertools
+import threading
+from collections import OrderedDict, deque
+from typing import NamedTuple, Optional, Set
+
+from app.config import get_settings
+from app.core.logger import logger
+from app.core.responses import dumps
+from app.core.tenancy import DEFAULT_TENANT
+
+settings = get_settings()
+
+
+class ServerEvent(NamedTuple):
+    id: int
+    event: str
+    data: dict
+
+    def encode(self) -> str:
+        """Format as a Server-Sent Events message"""
+        return f"id: {self.id}\nevent: {self.event}\ndata: {dumps(self.data).decode()}\n\n"
+
+
+class EventBus:
+    """
+    In-process fan-out of server events (sync progress, new transactions, summary deltas) to
+    streaming clients.
+
+    Each subscriber gets a bounded queue; a subscriber that falls behind loses its oldest
+    events rather than slowing down publishers. Recent events are kept so a reconnecting
+    client can resume from its Last-Event-ID. Events only reach clients connected to the same
+    process that published them.
+    """
+
+    def __init__(self, queue_size: int = 1000, replay_size: int = 200):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._recent = deque(maxlen=replay_size)
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        if last_event_id is not None:
+            for event in self._recent:
+                if event.id > last_event_id:
+                    self._put(queue, event)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def publish(self, event: str, data: dict):
+        """Publish an event; safe to call from worker threads as well as the event loop"""
+        server_event = ServerEvent(next(self._ids), event, data)
+        self._recent.append(server_event)
+        if not self._subscribers:
+            return
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._loop:
+            self._deliver(server_event)
+        elif self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver, server_event)
+
+    def _deliver(self, event: ServerEvent):
+        for queue in list(self._subscribers):
+            self._put(queue, event)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: ServerEvent):
+        if queue.full():
+            queue.get_nowait()
+            logger.debug("Event subscriber is falling behind, dropping its oldest event")
+        queue.put_nowait(event)
+
+
+_buses: "OrderedDict[str, EventBus]" = OrderedDict()
+_buses_lock = threading.Lock()  # Events are also published from worker threads
+
+
+def get_event_bus(tenant_id: str = DEFAULT_TENANT) -> EventBus:
+    """
+    Each tenant has its own bus, so clients only ever see their own tenant's events. Beyond
+    TENANT_POOL_SIZE tenants, the least recently used buses without connected clients are
+    dropped; a bus with clients is kept, or they would stop receiving events.
+    """
+    with _buses_lock:
+        bus = _buses.get(tenant_id)
+        if bus is None:
+            bus = _buses[tenant_id] = EventBus(
+                queue_size=settings.EVENTS_QUEUE_SIZE, replay_size=settings.EVENTS_REPLAY_SIZE
+            )
+        _buses.move_to_end(tenant_id)
+
+        excess = len(_buses) - settings.TENANT_POOL_SIZE
+        if excess > 0:
+            idle = [idle_tenant_id for idle_tenant_id, idle_bus in _buses.items()
+                    if idle_tenant_id != tenant_id and not idle_bus.has_subscribers]
+            for idle_tenant_id in idle[:excess]:
+                del _buses[idle_tenant_id]
+        return bus
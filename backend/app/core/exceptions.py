@@ -30,3 +30,18 @@ class ClassificationError(TransactionAPIException):
             detail=detail,
             error_code="CLASSIFICATION_ERROR"
         )
+
+
+class GmailHistoryExpiredError(GmailAPIError):
+    def __init__(self, detail: str):
+        super().__init__(detail=detail)
+        self.error_code = "GMAIL_HISTORY_EXPIRED"
+
+
+class GmailNotAuthorizedError(TransactionAPIException):
+    def __init__(self, detail: str):
+        super().__init__(
+            status_code=409,
+            detail=detail,
+            error_code="GMAIL_NOT_AUTHORIZED"
+        )
@@ -1,4 +1,6 @@
 import sys
+import time
+from functools import lru_cache
 
 from loguru import logger
 
@@ -6,10 +8,63 @@ from app.config import get_settings
 
 settings = get_settings()
 
-# Configure logger
+TEXT_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+
+
+class LogFilter:
+    """
+    Applies per-module levels (longest matching module prefix wins, LOG_LEVEL otherwise) and
+    rate limits per-item events logged through ``sampled()`` to LOG_SAMPLED_EVENTS_PER_SECOND
+    records per event name.
+    """
+
+    def __init__(self, default_level: str, module_levels: dict, sampled_per_second: int):
+        self.default_level = logger.level(default_level).no
+        self.module_levels = sorted(
+            ((module, logger.level(level.upper()).no) for module, level in module_levels.items()),
+            key=lambda item: len(item[0]), reverse=True
+        )
+        self.sampled_per_second = sampled_per_second
+        self._windows = {}
+
+    def level_for(self, name: str) -> int:
+        for module, level in self.module_levels:
+            if name == module or name.startswith(module + "."):
+                return level
+        return self.default_level
+
+    def __call__(self, record) -> bool:
+        if record["level"].no < self.level_for(record["name"] or ""):
+            return False
+
+        event = record["extra"].get("sampled_event")
+        if event is None or not self.sampled_per_second:
+            return True
+
+        now = time.monotonic()
+        window_start, count = self._windows.get(event, (now, 0))
+        if now - window_start >= 1:
+            window_start, count = now, 0
+        self._windows[event] = (window_start, count + 1)
+        return count < self.sampled_per_second
+
+
+@lru_cache(maxsize=None)
+def sampled(event: str):
+    """Logger for per-transaction events, rate limited per event name instead of logging every item"""
+    return logger.bind(sampled_event=event)
+
+
+log_filter = LogFilter(settings.LOG_LEVEL, settings.LOG_MODULE_LEVELS, settings.LOG_SAMPLED_EVENTS_PER_SECOND)
+
+# Configure logger. With enqueue the sink is written from a background thread, so callers
+# (including the event loop) only pay for putting the record on a queue.
 logger.remove()
 logger.add(
     sys.stderr,
-    level=settings.LOG_LEVEL,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+    level=min([log_filter.default_level] + [level for _, level in log_filter.module_levels]),
+    filter=log_filter,
+    format=TEXT_FORMAT,
+    serialize=settings.LOG_FORMAT == "json",
+    enqueue=settings.LOG_ENQUEUE
 )
@@ -0,0 +1,111 @@
+import os
+import time
+from functools import wraps
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+# Request and query latencies are mostly sub-second; external calls get a longer tail
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EXTERNAL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=FAST_BUCKETS
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Time spent in TransactionCrud methods",
+    ["method"], buckets=FAST_BUCKETS
+)
+GMAIL_REQUEST_LATENCY = Histogram(
+    "gmail_request_duration_seconds", "Gmail API call latency",
+    ["operation"], buckets=EXTERNAL_BUCKETS
+)
+GMAIL_MESSAGES = Counter(
+    "gmail_messages_total", "Message IDs listed and messages fetched from Gmail",
+    ["operation"]
+)
+OPENAI_REQUEST_LATENCY = Histogram(
+    "openai_request_duration_seconds", "OpenAI chat completion latency",
+    ["kind"], buckets=EXTERNAL_BUCKETS
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total", "OpenAI tokens used",
+    ["type"]
+)
+CLASSIFIER_CACHE = Counter(
+    "classifier_cache_requests_total", "Merchant classification lookups per tier (memory, rules, local model)",
+    ["tier", "result"]
+)
+FX_FETCH_LATENCY = Histogram(
+    "fx_fetch_duration_seconds", "Exchange rate API latency",
+    ["source"], buckets=EXTERNAL_BUCKETS
+)
+SYNC_GAP_DAYS = Histogram(
+    "sync_gap_days", "Size of each date gap synced from Gmail",
+    buckets=(0.04, 0.25, 1, 7, 30, 90, 365)
+)
+SCHEDULED_SYNCS = Counter(
+    "scheduled_syncs_total", "Background syncs per tenant by outcome (synced, unchanged, failed)",
+    ["outcome"]
+)
+
+
+def timed(histogram: Histogram, **labels):
+    """Decorator observing a function's wall time in ``histogram``"""
+    def decorator(func):
+        metric = histogram.labels(**labels) if labels else histogram
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def timed_query(func):
+    """Observe a CRUD method's duration under its own name"""
+    return timed(DB_QUERY_LATENCY, method=func.__name__)(func)
+
+
+def render_metrics() -> tuple:
+    """Serialise all metrics, aggregating across worker processes when PROMETHEUS_MULTIPROC_DIR is set"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency labelled by route template rather than raw path"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                method=scope["method"],
+                route=route.path if route else "unmatched",
+                status=status["code"]
+            ).observe(time.perf_counter() - started)
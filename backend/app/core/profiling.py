@@ -0,0 +1,178 @@
+import asyncio
+import cProfile
+import json
+import os
+import random
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import parse_qs
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+from app.core.logger import logger
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # Optional dependency, cProfile is used instead
+    PyinstrumentProfiler = None
+
+settings = get_settings()
+
+# Statements run while a profiled request is active; None when nothing is being profiled.
+# Context variables follow the request into threadpool dependencies and asyncio.to_thread calls.
+_sql_log: ContextVar[Optional[List[dict]]] = ContextVar("profiling_sql_log", default=None)
+
+MAX_STATEMENTS = 1000
+
+
+def instrument_engine(engine: Engine):
+    """Record SQL statements and their durations for requests being profiled"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _sql_log.get() is not None:
+            conn.info.setdefault("profiling_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements = _sql_log.get()
+        if statements is None or not conn.info.get("profiling_started"):
+            return
+        duration = time.perf_counter() - conn.info["profiling_started"].pop()
+        if len(statements) < MAX_STATEMENTS:
+            statements.append({
+                "statement": statement,
+                "executemany": executemany,
+                "rows": cursor.rowcount,
+                "duration_ms": round(duration * 1000, 3),
+            })
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling individual requests.
+
+    A request is profiled when it carries an ``X-Profile: 1`` header or ``?profile=1`` query flag,
+    or when it is picked by PROFILING_SAMPLE_RATE. The report (SQL statements plus a speedscope
+    profile from pyinstrument, or a pstats dump from cProfile) is written to PROFILING_DIR and
+    its ID is returned in the ``X-Profile-Id`` response header. Only one request is profiled at
+    a time, since both profilers hook the event loop's thread.
+
+    Requests share that thread, so what the profile covers depends on the profiler. pyinstrument
+    runs in async mode and only samples the profiled request's task; time spent awaiting is shown
+    as such. cProfile can't tell tasks apart, and its profile includes every request that ran on
+    the event loop meanwhile. Each report therefore records its ``profiler`` scope and
+    ``concurrent_requests``, the number of other requests that overlapped it.
+    """
+
+    def __init__(self, app, profile_dir: Optional[str] = None):
+        self.app = app
+        self.profile_dir = Path(profile_dir or settings.PROFILING_DIR or os.path.join(
+            os.path.dirname(__file__), "../data/profiles")).resolve()
+        self._active = False
+        self._in_flight = 0  # Requests running besides the profiled one
+        self._concurrent = 0  # Requests that overlapped the profiled one
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self._active or not self._should_profile(scope):
+            self._in_flight += 1
+            self._concurrent += self._active
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self._in_flight -= 1
+            return
+
+        self._active = True
+        self._concurrent = self._in_flight
+        profile_id = f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        statements = []
+        token = _sql_log.set(statements)
+        profiler = PyinstrumentProfiler(async_mode="enabled") if PyinstrumentProfiler else cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            if PyinstrumentProfiler:
+                profiler.start()
+            else:
+                profiler.enable()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if PyinstrumentProfiler:
+                profiler.stop()
+            else:
+                profiler.disable()
+            duration = time.perf_counter() - started
+            _sql_log.reset(token)
+            self._active = False
+
+            report = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": scope["route"].path if scope.get("route") else None,
+                "status": status["code"],
+                "duration_ms": round(duration * 1000, 3),
+                "profiler": "pyinstrument (this request's task only)" if PyinstrumentProfiler
+                else "cProfile (every request on the event loop, see concurrent_requests)",
+                "concurrent_requests": self._concurrent,
+                "sql": {
+                    "count": len(statements),
+                    "duration_ms": round(sum(s["duration_ms"] for s in statements), 3),
+                    "statements": statements,
+                },
+            }
+            try:
+                await asyncio.to_thread(self._write_report, profile_id, profiler, report)
+            except Exception as e:
+                logger.error(f"Failed to write profile {profile_id}: {str(e)}")
+
+    @staticmethod
+    def _should_profile(scope) -> bool:
+        headers = dict(scope.get("headers") or [])
+        if headers.get(b"x-profile") in (b"1", b"true"):
+            return True
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if query.get("profile", [""])[0] in ("1", "true"):
+            return True
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def _write_report(self, profile_id: str, profiler, report: dict):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{profile_id}-{re.sub(r'[^A-Za-z0-9]+', '_', report['path']).strip('_')}"
+
+        if PyinstrumentProfiler:
+            profile_path = self.profile_dir / f"{name}.speedscope.json"
+            profile_path.write_text(profiler.output(SpeedscopeRenderer()))
+        else:
+            profile_path = self.profile_dir / f"{name}.prof"
+            profiler.dump_stats(profile_path)
+
+        report["profile"] = profile_path.name
+        with open(self.profile_dir / f"{name}.json", "w") as f:
+            json.dump(report, f, indent=2)
+
+        logger.info(
+            f"Profiled {report['method']} {report['path']} in {report['duration_ms']:.1f}ms "
+            f"({report['sql']['count']} SQL statements, {report['sql']['duration_ms']:.1f}ms, "
+            f"{report['concurrent_requests']} concurrent requests): {profile_path}"
+        )
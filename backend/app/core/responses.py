@@ -0,0 +1,32 @@
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any):
+    # Decimals are sent as numbers, like the models' json_encoders do
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes via orjson, which handles UUIDs, datetimes, dataclasses and NumPy values natively"""
+    return orjson.dumps(content, default=_default, option=JSON_OPTIONS)
+
+
+class OrjsonResponse(JSONResponse):
+    """
+    JSON response rendered by orjson, for routes without a response model.
+
+    Routes with a ``response_model`` keep FastAPI's default class: their models are serialized
+    straight to JSON bytes by pydantic-core, which is faster than dumping them to Python objects
+    for orjson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,64 @@
+import os
+import re
+from pathlib import Path
+from typing import List
+
+from app.config import get_settings
+
+settings = get_settings()
+
+DEFAULT_TENANT = "default"
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+DATA_DIR = Path(os.path.dirname(__file__)).parent / "data"
+
+
+def allowed_tenant_ids() -> List[str]:
+    """TENANTS, or just the default tenant without it. TENANTS replaces the default, so list it to keep it"""
+    return settings.TENANTS or [DEFAULT_TENANT]
+
+
+def validate_tenant_id(tenant_id: str) -> str:
+    """
+    Check a tenant ID is well formed (it is used in file paths) and allowed. Only the default
+    tenant exists unless TENANTS lists the allowed IDs.
+    """
+    if not TENANT_ID_PATTERN.match(tenant_id):
+        raise ValueError("Tenant IDs may only contain letters, digits, '-' and '_' (max 64 characters)")
+    if tenant_id not in allowed_tenant_ids():
+        raise ValueError(f"Unknown tenant '{tenant_id}'")
+    return tenant_id
+
+
+def tenant_dir(tenant_id: str) -> Path:
+    """Directory for a tenant's own files; the default tenant keeps the single-user locations"""
+    return Path(settings.TENANT_DATA_DIR or DATA_DIR / "tenants") / tenant_id
+
+
+def gmail_token_path(tenant_id: str) -> str:
+    if tenant_id == DEFAULT_TENANT:
+        return settings.GMAIL_TOKEN_PATH
+    return str(tenant_dir(tenant_id) / "token.json")
+
+
+def rules_file_path(tenant_id: str) -> str:
+    if tenant_id == DEFAULT_TENANT:
+        return str(DATA_DIR / "classification_rules.json")
+    return str(tenant_dir(tenant_id) / "classification_rules.json")
+
+
+def classifier_model_path(tenant_id: str) -> str:
+    if tenant_id == DEFAULT_TENANT:
+        return str(DATA_DIR / "merchant_model.npz")
+    return str(tenant_dir(tenant_id) / "merchant_model.npz")
+
+
+def snapshot_dir(tenant_id: str) -> str:
+    return str(Path(settings.SNAPSHOT_DIR or DATA_DIR / "snapshots") / tenant_id)
+
+
+def archive_dir(tenant_id: str) -> str:
+    root = Path(settings.EMAIL_ARCHIVE_DIR or DATA_DIR / "archive")
+    if tenant_id == DEFAULT_TENANT:
+        return str(root)
+    return str(root / "tenants" / tenant_id)
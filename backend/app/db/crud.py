@@ -1,25 +1,56 @@
 import uuid
-from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Iterable, List, Optional, Set, Tuple
 
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import Float, case, cast, extract, func, literal_column, or_, select, text, tuple_
 
 from app.config import get_settings
+from app.core.metrics import timed_query
+from app.db.search import FTS_TABLE, fts_query, fts_table
+from app.models.analysis_run_model import AnalysisRunModel
+from app.models.backfill_window_model import BackfillWindowModel
+from app.models.budget_model import BudgetModel
+from app.models.budget_spend_model import BudgetSpendModel
+from app.models.email_archive_model import EmailArchiveModel
+from app.models.fx_rate_model import FxRateModel
+from app.models.recurring_payment_model import RecurringPaymentModel
 from app.models.schemas import Transaction, DateRange
+from app.models.spending_anomaly_model import SpendingAnomalyModel
+from app.models.spending_baseline_model import SpendingBaselineModel
+from app.models.sync_coverage_model import SyncCoverageModel
 from app.models.sync_info_model import SyncInfoModel
 from app.models.transaction_model import TransactionModel
 
 settings = get_settings()
 
 
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+# Stays under SQLite's bound parameter limit with room for the other filters
+IN_CHUNK_SIZE = 500
+
+
+def to_naive(dt: Optional[datetime]) -> Optional[datetime]:
+    """Drop timezone info so datetimes compare with the naive values stored in SQLite"""
+    if dt and dt.tzinfo:
+        return dt.replace(tzinfo=None)
+    return dt
+
+
 class TransactionCrud:
     @staticmethod
-    def create_transaction(db: Session, transaction: Transaction) -> TransactionModel:
+    def _to_row(tenant_id: str, transaction: Transaction) -> dict:
         transaction_id = transaction.id if hasattr(transaction, 'id') else uuid.uuid4()
 
-        db_transaction = TransactionModel(
+        return dict(
             id=str(transaction_id),
+            tenant_id=tenant_id,
+            gmail_message_id=transaction.gmail_message_id,
             date=transaction.date,
             amount=transaction.amount,
             merchant=transaction.merchant,
@@ -27,20 +58,67 @@ class TransactionCrud:
             subcategory=transaction.subcategory,
             confidence=transaction.confidence,
             description=transaction.description,
+            excluded=transaction.excluded,
             original_currency=transaction.original_currency,
             original_amount=transaction.original_amount,
             exchange_rate=transaction.exchange_rate,
             exchange_rate_date=transaction.exchange_rate_date,
             card_type=transaction.card_type
         )
+
+    @staticmethod
+    def _to_model(tenant_id: str, transaction: Transaction) -> TransactionModel:
+        return TransactionModel(**TransactionCrud._to_row(tenant_id, transaction))
+
+    @staticmethod
+    @timed_query
+    def create_transaction(db: Session, tenant_id: str, transaction: Transaction) -> TransactionModel:
+        db_transaction = TransactionCrud._to_model(tenant_id, transaction)
         db.add(db_transaction)
+        if not db_transaction.excluded:
+            BudgetCrud.add_spend(db, tenant_id, [BudgetCrud.spend_row(db_transaction)])
         db.commit()
         db.refresh(db_transaction)
         return db_transaction
 
     @staticmethod
+    @timed_query
+    def create_transactions(db: Session, tenant_id: str, transactions: List[Transaction]) -> Set[str]:
+        """
+        Insert many transactions with a single commit. Rows whose Gmail message ID is already
+        stored are skipped by the unique index, so re-ingesting an email is a no-op. Returns the
+        IDs of the rows inserted; only those count towards budgets.
+        """
+        if not transactions:
+            return set()
+
+        rows = [TransactionCrud._to_row(tenant_id, transaction) for transaction in transactions]
+        dialect = db.bind.dialect.name
+        if dialect == "sqlite":
+            statement = sqlite_insert(TransactionModel.__table__).on_conflict_do_nothing()
+        elif dialect == "postgresql":
+            statement = postgresql_insert(TransactionModel.__table__).on_conflict_do_nothing()
+        else:
+            statement = None
+
+        if statement is None:
+            db.add_all([TransactionModel(**row) for row in rows])
+            created_ids = {row["id"] for row in rows}
+        else:
+            created_ids = set(db.execute(statement.returning(TransactionModel.__table__.c.id), rows).scalars())
+
+        BudgetCrud.add_spend(db, tenant_id, [
+            (row["primary_category"], row["card_type"], row["date"], row["amount"])
+            for row in rows if row["id"] in created_ids and not row["excluded"]
+        ])
+        db.commit()
+        return created_ids
+
+    @staticmethod
+    @timed_query
     def get_transactions(
             db: Session,
+            tenant_id: str,
             date_range: Optional[DateRange] = None,
             categories: Optional[List[dict]] = None,
             category: Optional[str] = None,
@@ -50,7 +128,7 @@ class TransactionCrud:
             limit: Optional[int] = None,
             offset: Optional[int] = None
     ) -> List[TransactionModel]:
-        query = db.query(TransactionModel)
+        query = db.query(TransactionModel).filter(TransactionModel.tenant_id == tenant_id)
 
         if date_range:
             if date_range.start_date:
@@ -95,7 +173,8 @@ class TransactionCrud:
         if not include_excluded:
             query = query.filter(TransactionModel.excluded == False)
 
-        query = query.order_by(TransactionModel.date.desc())
+        # ix_transactions_tenant_date_id read backwards, so pages come out in index order without a sort
+        query = query.order_by(TransactionModel.date.desc(), TransactionModel.id.desc())
         
         if offset:
             query = query.offset(offset)
@@ -105,17 +184,95 @@ class TransactionCrud:
         return query.all()
 
     @staticmethod
-    def transaction_exists(db: Session, transaction: Transaction) -> bool:
-        return db.query(TransactionModel).filter(
-            TransactionModel.date == transaction.date,
-            TransactionModel.amount == transaction.amount,
-            TransactionModel.merchant == transaction.merchant
-        ).first() is not None
+    @timed_query
+    def search_transactions(
+            db: Session,
+            tenant_id: str,
+            query_text: str,
+            date_range: Optional[DateRange] = None,
+            include_excluded: bool = True,
+            limit: int = 50,
+            offset: int = 0
+    ) -> Tuple[List[TransactionModel], int]:
+        """
+        Find transactions whose merchant or description matches ``query_text``, best matches first.
+        Returns one page of results and the total number of matches.
+        """
+        dialect = db.bind.dialect.name
+        query = db.query(TransactionModel).filter(TransactionModel.tenant_id == tenant_id)
+
+        if dialect == "sqlite":
+            match = fts_query(query_text)
+            if not match:
+                return [], 0
+            # Merchant matches outrank description matches
+            rank = text(f"bm25({FTS_TABLE}, 10.0, 1.0)")
+            query = query.join(fts_table, fts_table.c.rowid == TransactionModel.seq) \
+                .filter(text(f"{FTS_TABLE} MATCH :match")).params(match=match)
+        else:
+            if not query_text.strip():
+                return [], 0
+            pattern = f"%{query_text.strip()}%"
+            # Served by the pg_trgm GIN indexes on PostgreSQL, a table scan elsewhere
+            query = query.filter(or_(TransactionModel.merchant.ilike(pattern), TransactionModel.description.ilike(pattern)))
+            rank = func.greatest(
+                func.similarity(TransactionModel.merchant, query_text),
+                func.similarity(TransactionModel.description, query_text)
+            ).desc() if dialect == "postgresql" else None
+
+        if date_range:
+            if date_range.start_date:
+                query = query.filter(TransactionModel.date >= date_range.start_date)
+            if date_range.end_date:
+                query = query.filter(TransactionModel.date <= date_range.end_date)
+
+        if not include_excluded:
+            query = query.filter(TransactionModel.excluded == False)
+
+        total = query.count()
+        order = [TransactionModel.date.desc(), TransactionModel.id.desc()]
+        if rank is not None:
+            order.insert(0, rank)
+        return query.order_by(*order).offset(offset).limit(limit).all(), total
 
     @staticmethod
-    def set_exclusion(db: Session, transaction_id: uuid.UUID, excluded: bool) -> Optional[TransactionModel]:
-        transaction = db.query(TransactionModel).filter(TransactionModel.id == str(transaction_id)).first()
+    @timed_query
+    def get_transactions_by_message_ids(db: Session, tenant_id: str, message_ids: List[str]) -> dict:
+        """Map Gmail message IDs to the transactions created from them"""
+        transactions = {}
+        message_ids = list(set(message_ids))
+        for i in range(0, len(message_ids), IN_CHUNK_SIZE):
+            for tx in db.query(TransactionModel).filter(
+                    TransactionModel.tenant_id == tenant_id,
+                    TransactionModel.gmail_message_id.in_(message_ids[i:i + IN_CHUNK_SIZE])
+            ).all():
+                transactions[tx.gmail_message_id] = tx
+        return transactions
+
+    @staticmethod
+    @timed_query
+    def get_ingested_message_ids(db: Session, tenant_id: str, message_ids: List[str]) -> set:
+        """The subset of ``message_ids`` that already produced a transaction, answered from the unique index"""
+        ingested = set()
+        message_ids = list(set(message_ids))
+        for i in range(0, len(message_ids), IN_CHUNK_SIZE):
+            rows = db.query(TransactionModel.gmail_message_id).filter(
+                TransactionModel.tenant_id == tenant_id,
+                TransactionModel.gmail_message_id.in_(message_ids[i:i + IN_CHUNK_SIZE])
+            )
+            ingested.update(message_id for message_id, in rows)
+        return ingested
+
+    @staticmethod
+    @timed_query
+    def set_exclusion(db: Session, tenant_id: str, transaction_id: uuid.UUID, excluded: bool) -> Optional[TransactionModel]:
+        transaction = db.query(TransactionModel).filter(
+            TransactionModel.tenant_id == tenant_id,
+            TransactionModel.id == str(transaction_id)
+        ).first()
         if transaction:
+            if transaction.excluded != excluded:
+                BudgetCrud.add_spend(db, tenant_id, [BudgetCrud.spend_row(transaction)], sign=-1 if excluded else 1)
             transaction.excluded = excluded
             db.commit()
             db.refresh(transaction)
@@ -123,10 +280,32 @@ class TransactionCrud:
 
     # app/crud/transaction.py
     @staticmethod
-    def update_transactions_by_merchant(db: Session, merchant: str, category: str, subcategory: str):
+    @timed_query
+    def update_transactions_by_merchant(db: Session, tenant_id: str, merchant: str, category: str, subcategory: str):
         """Update the classification of all transactions with matching merchant name"""
         try:
+            if BudgetCrud.has_counters(db, tenant_id, "category"):
+                # Move this merchant's spend between category counters, one group per old category and month
+                month = TransactionCrud._period(db.bind.dialect.name, "month")
+                moved = db.query(
+                    TransactionModel.primary_category, month, func.sum(TransactionModel.amount), func.count()
+                ).filter(
+                    TransactionModel.tenant_id == tenant_id,
+                    TransactionModel.merchant == merchant,
+                    TransactionModel.excluded == False,
+                    TransactionModel.primary_category != category
+                ).group_by(TransactionModel.primary_category, month).all()
+                # Several old categories can move into the same new category counter, so deltas add up
+                deltas = defaultdict(lambda: [Decimal("0"), 0])
+                for old_category, period, total, count in moved:
+                    month_key = str(period)[:7]
+                    for target, sign in ((old_category, -1), (category, 1)):
+                        deltas[("category", target, month_key)][0] += sign * Decimal(str(total))
+                        deltas[("category", target, month_key)][1] += sign * count
+                BudgetCrud.adjust_counters(db, tenant_id, deltas)
+
             updated_count = db.query(TransactionModel).filter(
+                TransactionModel.tenant_id == tenant_id,
                 TransactionModel.merchant == merchant
             ).update({
                 "primary_category": category,
@@ -140,8 +319,10 @@ class TransactionCrud:
 
 
     @staticmethod
+    @timed_query
     def get_categories(
             db: Session,
+            tenant_id: str,
             date_range: Optional[DateRange] = None,
             categories: Optional[List[dict]] = None,
             category: Optional[str] = None,
@@ -153,7 +334,7 @@ class TransactionCrud:
         query = db.query(
             TransactionModel.primary_category,
             TransactionModel.subcategory
-        ).distinct()
+        ).filter(TransactionModel.tenant_id == tenant_id).distinct()
 
         if date_range:
             if date_range.start_date:
@@ -184,8 +365,10 @@ class TransactionCrud:
         return categories
 
     @staticmethod
+    @timed_query
     def get_transaction_count(
             db: Session,
+            tenant_id: str,
             date_range: Optional[DateRange] = None,
             categories: Optional[List[dict]] = None,
             category: Optional[str] = None,
@@ -194,7 +377,7 @@ class TransactionCrud:
             include_excluded: bool = True
     ) -> int:
         """Get count of transactions matching filters"""
-        query = db.query(TransactionModel)
+        query = db.query(TransactionModel).filter(TransactionModel.tenant_id == tenant_id)
 
         if date_range:
             if date_range.start_date:
@@ -241,116 +424,266 @@ class TransactionCrud:
 
         return query.count()
 
+    @staticmethod
+    def _reporting_amount(currency: Optional[str] = None):
+        """
+        Transaction amount in a reporting currency: the original amount when the transaction was in
+        that currency, otherwise the home-currency amount divided by the latest rate on or before
+        its date (the earliest rate after it when none is older)
+        """
+        if not currency or currency == settings.HOME_CURRENCY:
+            return TransactionModel.amount
+
+        day = func.date(TransactionModel.date)
+        pair = (FxRateModel.base == currency, FxRateModel.quote == settings.HOME_CURRENCY)
+        rates = [
+            select(FxRateModel.rate).where(*pair, FxRateModel.date <= day).order_by(FxRateModel.date.desc()).limit(1).scalar_subquery(),
+            select(FxRateModel.rate).where(*pair, FxRateModel.date > day).order_by(FxRateModel.date).limit(1).scalar_subquery(),
+        ]
+        if currency in settings.FX_FALLBACK_RATES:
+            rates.append(literal_column(str(float(settings.FX_FALLBACK_RATES[currency]))))
+        return case(
+            (TransactionModel.original_currency == currency, TransactionModel.original_amount),
+            else_=TransactionModel.amount / func.coalesce(*rates)
+        )
 
-class SyncInfoCrud:
     @staticmethod
-    def get_last_sync(db: Session) -> Optional[SyncInfoModel]:
-        return db.query(SyncInfoModel).filter(SyncInfoModel.id == "last_sync").first()
+    @timed_query
+    def get_spending_breakdown(db: Session, tenant_id: str, date_range: DateRange, currency: Optional[str] = None) -> list:
+        """
+        Spending and transaction counts per category, subcategory, card and merchant over a
+        date range, leaving out excluded transactions. Totals are in ``currency`` when given.
+        """
+        amount = TransactionCrud._reporting_amount(currency)
+        query = db.query(
+            TransactionModel.primary_category, TransactionModel.subcategory, TransactionModel.card_type,
+            TransactionModel.merchant, func.sum(amount).label("total"), func.count().label("count")
+        ).filter(
+            TransactionModel.tenant_id == tenant_id,
+            TransactionModel.excluded == False,
+            TransactionModel.date >= date_range.start_date,
+            TransactionModel.date <= date_range.end_date
+        )
+        return query.group_by(
+            TransactionModel.primary_category, TransactionModel.subcategory, TransactionModel.card_type,
+            TransactionModel.merchant
+        ).all()
 
     @staticmethod
-    def update_last_sync(db: Session, start_date: Optional[datetime], end_date: Optional[datetime]) -> SyncInfoModel:
-        sync_info = db.query(SyncInfoModel).filter(SyncInfoModel.id == "last_sync").first()
+    def _period(dialect: str, interval: str):
+        """Start of the day, ISO week or month containing each transaction"""
+        if dialect == "postgresql":
+            return func.date_trunc(interval, TransactionModel.date)
+        if interval == "week":
+            return func.date(TransactionModel.date, "-6 days", "weekday 1")
+        return func.strftime("%Y-%m-01" if interval == "month" else "%Y-%m-%d", TransactionModel.date)
 
-        # Helper function to make datetime objects timezone-naive
-        def to_naive(dt):
-            if dt and dt.tzinfo:
-                return dt.replace(tzinfo=None)
-            return dt
+    @staticmethod
+    @timed_query
+    def get_spending_trend(
+            db: Session,
+            tenant_id: str,
+            date_range: DateRange,
+            interval: str = "month",
+            group_by: Optional[str] = None,
+            currency: Optional[str] = None
+    ) -> list:
+        """
+        Spending per day, week or month, optionally split by a column such as primary_category,
+        in ``currency`` when given
+        """
+        period = TransactionCrud._period(db.bind.dialect.name, interval).label("period")
+        group = getattr(TransactionModel, group_by).label("group") if group_by else literal_column("NULL").label("group")
+        amount = TransactionCrud._reporting_amount(currency)
+        query = db.query(
+            period, group, func.sum(amount).label("total"), func.count().label("count")
+        ).filter(
+            TransactionModel.tenant_id == tenant_id,
+            TransactionModel.excluded == False,
+            TransactionModel.date >= date_range.start_date,
+            TransactionModel.date <= date_range.end_date
+        ).group_by(period)
+        if group_by:
+            query = query.group_by(group)
+        return query.order_by(period).all()
 
-        # Normalize datetime objects
-        start_date = to_naive(start_date)
-        end_date = to_naive(end_date)
+    @staticmethod
+    def _unix_day(dialect: str):
+        """Fractional days since 1970-01-01, so columnar readers skip datetime parsing"""
+        if dialect == "sqlite":
+            return func.julianday(TransactionModel.date) - UNIX_EPOCH_JULIAN_DAY
+        return extract("epoch", TransactionModel.date) / 86400.0
+
+    @staticmethod
+    @timed_query
+    def get_merchant_series(db: Session, tenant_id: str, merchants: Optional[List[str]] = None) -> list:
+        """
+        (merchant, day, amount, original amount) of every included transaction, optionally only
+        for some merchants. Days are as returned by ``_unix_day``.
+        """
+        day = TransactionCrud._unix_day(db.bind.dialect.name)
+        query = db.query(
+            TransactionModel.merchant, day, cast(TransactionModel.amount, Float),
+            cast(func.coalesce(TransactionModel.original_amount, TransactionModel.amount), Float)
+        ).filter(
+            TransactionModel.tenant_id == tenant_id,
+            TransactionModel.excluded == False
+        )
+        if merchants is None:
+            return query.all()
+
+        rows = []
+        merchants = list(set(merchants))
+        for i in range(0, len(merchants), IN_CHUNK_SIZE):
+            rows.extend(query.filter(TransactionModel.merchant.in_(merchants[i:i + IN_CHUNK_SIZE])).all())
+        return rows
+
+    @staticmethod
+    @timed_query
+    def get_spending_series(db: Session, tenant_id: str, since: datetime) -> list:
+        """(id, merchant, primary category, day, amount) of every included transaction since a date"""
+        return db.query(
+            TransactionModel.id, TransactionModel.merchant, TransactionModel.primary_category,
+            TransactionCrud._unix_day(db.bind.dialect.name), cast(TransactionModel.amount, Float)
+        ).filter(
+            TransactionModel.tenant_id == tenant_id,
+            TransactionModel.excluded == False,
+            TransactionModel.date >= to_naive(since)
+        ).all()
+
+    @staticmethod
+    @timed_query
+    def get_merchant_labels(db: Session, tenant_id: str, min_confidence: float, skip_description: str) -> list:
+        """
+        (merchant, primary category, subcategory, count) of each label the tenant's merchants have
+        with at least ``min_confidence``, leaving out transactions whose description starts with
+        ``skip_description``
+        """
+        return db.query(
+            TransactionModel.merchant, TransactionModel.primary_category, TransactionModel.subcategory, func.count()
+        ).filter(
+            TransactionModel.tenant_id == tenant_id,
+            TransactionModel.merchant.isnot(None),
+            TransactionModel.primary_category.isnot(None),
+            TransactionModel.subcategory.isnot(None),
+            TransactionModel.confidence >= min_confidence,
+            or_(TransactionModel.description.is_(None), TransactionModel.description.notlike(f"{skip_description}%"))
+        ).group_by(
+            TransactionModel.merchant, TransactionModel.primary_category, TransactionModel.subcategory
+        ).all()
+
+    # Columns exported to analytics snapshots, in file order
+    SNAPSHOT_COLUMNS = [
+        TransactionModel.id, TransactionModel.gmail_message_id, TransactionModel.date, TransactionModel.amount,
+        TransactionModel.merchant, TransactionModel.primary_category, TransactionModel.subcategory,
+        TransactionModel.confidence, TransactionModel.description, TransactionModel.excluded,
+        TransactionModel.original_currency, TransactionModel.original_amount, TransactionModel.exchange_rate,
+        TransactionModel.exchange_rate_date, TransactionModel.card_type,
+    ]
+
+    @staticmethod
+    @timed_query
+    def get_rows_after(db: Session, tenant_id: str, after_seq: int, limit: int) -> list:
+        """
+        Snapshot columns of up to ``limit`` rows inserted after ``after_seq``, oldest first, each
+        prefixed by its seq. Seqs only grow, so the last one seen is a resume watermark.
+        """
+        return db.query(TransactionModel.seq, *TransactionCrud.SNAPSHOT_COLUMNS).filter(
+            TransactionModel.tenant_id == tenant_id,
+            TransactionModel.seq > after_seq
+        ).order_by(TransactionModel.seq).limit(limit).all()
+
+    @staticmethod
+    @timed_query
+    def get_monthly_rollups(db: Session, tenant_id: str) -> list:
+        """Spending and transaction counts per month, category and card, leaving out excluded transactions"""
+        year = extract("year", TransactionModel.date)
+        month = extract("month", TransactionModel.date)
+        return db.query(
+            year.label("year"), month.label("month"),
+            TransactionModel.primary_category, TransactionModel.subcategory, TransactionModel.card_type,
+            func.sum(TransactionModel.amount).label("total"), func.count().label("count")
+        ).filter(
+            TransactionModel.tenant_id == tenant_id,
+            TransactionModel.excluded == False
+        ).group_by(
+            year, month, TransactionModel.primary_category, TransactionModel.subcategory, TransactionModel.card_type
+        ).order_by(year, month).all()
+
+
+class SyncInfoCrud:
+    @staticmethod
+    def get_last_sync(db: Session, tenant_id: str) -> Optional[SyncInfoModel]:
+        return db.get(SyncInfoModel, tenant_id)
+
+    @staticmethod
+    def update_last_sync(db: Session, tenant_id: str) -> SyncInfoModel:
+        sync_info = SyncInfoCrud.get_last_sync(db, tenant_id)
 
         if not sync_info:
             sync_info = SyncInfoModel(
-                id="last_sync",
-                last_sync_date=datetime.now(),
-                start_date=start_date,
-                end_date=end_date
+                tenant_id=tenant_id,
+                last_sync_date=datetime.now()
             )
             db.add(sync_info)
         else:
             sync_info.last_sync_date = datetime.now()
-            
-            # Use intelligent range management instead of always expanding
-            new_start, new_end = SyncInfoCrud._calculate_optimal_sync_range(
-                sync_info, start_date, end_date
-            )
-            
-            sync_info.start_date = new_start
-            sync_info.end_date = new_end
 
         db.commit()
         db.refresh(sync_info)
         return sync_info
 
     @staticmethod
-    def _calculate_optimal_sync_range(
-        sync_info: SyncInfoModel, 
-        requested_start: Optional[datetime], 
-        requested_end: Optional[datetime]
-    ) -> Tuple[Optional[datetime], Optional[datetime]]:
-        """
-        Calculate optimal sync range using sliding window strategy with configurable limits
-        """
-        def to_naive(dt):
-            if dt and dt.tzinfo:
-                return dt.replace(tzinfo=None)
-            return dt
-
-        # Get current sync range
-        current_start = to_naive(sync_info.start_date)
-        current_end = to_naive(sync_info.end_date)
-        
-        # Normalize requested dates
-        requested_start = to_naive(requested_start)
-        requested_end = to_naive(requested_end)
-        
-        # If no current range, use requested range (with limits)
-        if not current_start or not current_end:
-            return SyncInfoCrud._apply_sync_limits(requested_start, requested_end)
-        
-        # Calculate the union of current and requested ranges
-        union_start = min(filter(None, [current_start, requested_start]))
-        union_end = max(filter(None, [current_end, requested_end]))
-        
-        # Check if the union exceeds maximum allowed days
-        max_range_days = timedelta(days=settings.MAX_SYNC_DAYS)
-        if union_end - union_start > max_range_days:
-            # Use sliding window: prioritize recent data
-            if requested_end:
-                # Keep requested end, limit start date
-                optimal_start = max(
-                    union_start,
-                    requested_end - max_range_days
-                )
-                optimal_end = requested_end
-            else:
-                # Keep current end, limit start date  
-                optimal_start = max(
-                    union_start,
-                    current_end - max_range_days
-                )
-                optimal_end = current_end
-        else:
-            # Union fits within limits, check for minimal expansion
-            overlap_threshold = timedelta(hours=settings.MIN_SYNC_OVERLAP_HOURS)
-            
-            # Only expand if there's minimal overlap with existing range
-            if requested_start and current_start:
-                start_gap = abs(requested_start - current_start)
-                if start_gap < overlap_threshold:
-                    union_start = current_start  # Don't expand for minimal difference
-                    
-            if requested_end and current_end:
-                end_gap = abs(requested_end - current_end)
-                if end_gap < overlap_threshold:
-                    union_end = current_end  # Don't expand for minimal difference
-                    
-            optimal_start = union_start
-            optimal_end = union_end
-        
-        return optimal_start, optimal_end
+    def update_history(db: Session, tenant_id: str, history_id: str, history_date: datetime) -> Optional[SyncInfoModel]:
+        """Record the Gmail history ID from which the next incremental sync should start"""
+        sync_info = SyncInfoCrud.get_last_sync(db, tenant_id)
+        if sync_info:
+            sync_info.history_id = history_id
+            sync_info.history_date = history_date
+            db.commit()
+            db.refresh(sync_info)
+        return sync_info
+
+    @staticmethod
+    def get_coverage(db: Session, tenant_id: str, start_date: datetime, end_date: datetime) -> List[SyncCoverageModel]:
+        """Get the synced intervals overlapping a date range, in chronological order"""
+        return db.query(SyncCoverageModel).filter(
+            SyncCoverageModel.tenant_id == tenant_id,
+            SyncCoverageModel.end_date >= start_date,
+            SyncCoverageModel.start_date <= end_date
+        ).order_by(SyncCoverageModel.start_date).all()
+
+    @staticmethod
+    def add_coverage(db: Session, tenant_id: str, start_date: datetime, end_date: datetime) -> SyncCoverageModel:
+        """Mark a date range as synced, merging it with any overlapping or touching intervals"""
+        start_date = to_naive(start_date)
+        end_date = to_naive(end_date)
+
+        overlapping = SyncInfoCrud.get_coverage(db, tenant_id, start_date, end_date)
+        if overlapping:
+            start_date = min(start_date, overlapping[0].start_date)
+            end_date = max(end_date, overlapping[-1].end_date)
+            for interval in overlapping:
+                db.delete(interval)
+
+        coverage = SyncCoverageModel(tenant_id=tenant_id, start_date=start_date, end_date=end_date)
+        db.add(coverage)
+        db.commit()
+        db.refresh(coverage)
+        return coverage
+
+    @staticmethod
+    def _migrate_legacy_range(db: Session, tenant_id: str) -> bool:
+        """Move the single start/end range of the old sync_info row into the coverage table"""
+        sync_info = SyncInfoCrud.get_last_sync(db, tenant_id)
+        if not sync_info or not sync_info.start_date or not sync_info.end_date:
+            return False
+
+        start_date, end_date = sync_info.start_date, sync_info.end_date
+        sync_info.start_date = None
+        sync_info.end_date = None
+        SyncInfoCrud.add_coverage(db, tenant_id, start_date, end_date)
+        return True
 
     @staticmethod
     def _apply_sync_limits(
@@ -370,42 +703,422 @@ class SyncInfoCrud:
         return start_date, end_date
 
     @staticmethod
-    def get_sync_gaps(db: Session, requested_range: DateRange) -> List[DateRange]:
+    def get_sync_gaps(db: Session, tenant_id: str, requested_range: DateRange) -> List[DateRange]:
         """
-        Identify date ranges that need syncing by finding gaps in current sync coverage
+        Identify date ranges that need syncing: the parts of the requested range not covered
+        by any synced interval, each limited to MAX_SYNC_DAYS
         """
-        sync_info = SyncInfoCrud.get_last_sync(db)
-        
-        if not sync_info or not sync_info.start_date or not sync_info.end_date:
-            # No previous sync, return the requested range (with limits applied)
-            limited_start, limited_end = SyncInfoCrud._apply_sync_limits(
-                requested_range.start_date, requested_range.end_date
-            )
-            return [DateRange(start_date=limited_start, end_date=limited_end)]
-        
-        def to_naive(dt):
-            if dt and dt.tzinfo:
-                return dt.replace(tzinfo=None)
-            return dt
-        
-        # Normalize dates
-        sync_start = to_naive(sync_info.start_date)
-        sync_end = to_naive(sync_info.end_date) 
         req_start = to_naive(requested_range.start_date)
         req_end = to_naive(requested_range.end_date)
-        
+
+        intervals = SyncInfoCrud.get_coverage(db, tenant_id, req_start, req_end)
+        if not intervals and SyncInfoCrud._migrate_legacy_range(db, tenant_id):
+            intervals = SyncInfoCrud.get_coverage(db, tenant_id, req_start, req_end)
+
+        uncovered = []
+        cursor = req_start
+        for interval in intervals:
+            if interval.start_date > cursor:
+                uncovered.append((cursor, interval.start_date))
+            cursor = max(cursor, interval.end_date)
+            if cursor >= req_end:
+                break
+
+        if cursor < req_end:
+            uncovered.append((cursor, req_end))
+
         gaps = []
-        
-        # Check for gap before current sync range
-        if req_start < sync_start:
-            gap_end = min(sync_start, req_end)
-            limited_start, limited_end = SyncInfoCrud._apply_sync_limits(req_start, gap_end)
+        for gap_start, gap_end in uncovered:
+            limited_start, limited_end = SyncInfoCrud._apply_sync_limits(gap_start, gap_end)
             gaps.append(DateRange(start_date=limited_start, end_date=limited_end))
-        
-        # Check for gap after current sync range
-        if req_end > sync_end:
-            gap_start = max(sync_end, req_start)
-            limited_start, limited_end = SyncInfoCrud._apply_sync_limits(gap_start, req_end)
-            gaps.append(DateRange(start_date=limited_start, end_date=limited_end))
-        
+
         return gaps
+
+
+class BackfillCrud:
+    @staticmethod
+    def get_window(db: Session, window_id: int) -> Optional[BackfillWindowModel]:
+        return db.get(BackfillWindowModel, window_id)
+
+    @staticmethod
+    def get_windows(db: Session, tenant_id: str, start_date: datetime, end_date: datetime) -> List[BackfillWindowModel]:
+        return db.query(BackfillWindowModel).filter(
+            BackfillWindowModel.tenant_id == tenant_id,
+            BackfillWindowModel.start_date >= start_date,
+            BackfillWindowModel.end_date <= end_date
+        ).order_by(BackfillWindowModel.start_date).all()
+
+    @staticmethod
+    def ensure_windows(db: Session, tenant_id: str, windows: List[Tuple[datetime, datetime]]) -> List[BackfillWindowModel]:
+        """Create checkpoints for windows not seen before and return all of them, oldest first"""
+        existing = {
+            (window.start_date, window.end_date): window
+            for window in BackfillCrud.get_windows(db, tenant_id, windows[0][0], windows[-1][1])
+        } if windows else {}
+
+        for start_date, end_date in windows:
+            if (start_date, end_date) not in existing:
+                window = BackfillWindowModel(
+                    tenant_id=tenant_id, start_date=start_date, end_date=end_date, status="pending"
+                )
+                db.add(window)
+                existing[(start_date, end_date)] = window
+
+        db.commit()
+        return [existing[key] for key in windows]
+
+    @staticmethod
+    def mark_window(
+            db: Session,
+            window: BackfillWindowModel,
+            status: str,
+            message_count: int = 0,
+            transaction_count: int = 0,
+            error: Optional[str] = None
+    ) -> BackfillWindowModel:
+        window.status = status
+        window.message_count = message_count
+        window.transaction_count = transaction_count
+        window.error = error
+        window.updated_at = datetime.now()
+        db.commit()
+        return window
+
+
+class EmailArchiveCrud:
+    @staticmethod
+    def get_entry(db: Session, tenant_id: str, message_id: str) -> Optional[EmailArchiveModel]:
+        return db.get(EmailArchiveModel, (tenant_id, message_id))
+
+    @staticmethod
+    def get_archived_ids(db: Session, tenant_id: str, message_ids: List[str]) -> set:
+        """Return which of the given message IDs are already archived, in one query"""
+        if not message_ids:
+            return set()
+        rows = db.query(EmailArchiveModel.message_id).filter(
+            EmailArchiveModel.tenant_id == tenant_id,
+            EmailArchiveModel.message_id.in_(message_ids)
+        ).all()
+        return {row.message_id for row in rows}
+
+    @staticmethod
+    def get_entries(db: Session, tenant_id: str, date_range: Optional[DateRange] = None) -> List[EmailArchiveModel]:
+        """Archive entries in storage order, so segments are read sequentially"""
+        query = db.query(EmailArchiveModel).filter(EmailArchiveModel.tenant_id == tenant_id)
+        if date_range:
+            if date_range.start_date:
+                query = query.filter(EmailArchiveModel.date >= to_naive(date_range.start_date))
+            if date_range.end_date:
+                query = query.filter(EmailArchiveModel.date <= to_naive(date_range.end_date))
+        return query.order_by(EmailArchiveModel.segment, EmailArchiveModel.offset).all()
+
+    @staticmethod
+    def add_entries(db: Session, entries: List[EmailArchiveModel]) -> None:
+        db.add_all(entries)
+        db.commit()
+
+
+class AnalysisRunCrud:
+    @staticmethod
+    def get_completed_at(db: Session, tenant_id: str, name: str) -> Optional[datetime]:
+        """When the tenant's last full run of the analysis completed; None if it never has"""
+        return db.query(AnalysisRunModel.completed_at).filter(
+            AnalysisRunModel.tenant_id == tenant_id,
+            AnalysisRunModel.name == name
+        ).scalar()
+
+    @staticmethod
+    def mark_completed(db: Session, tenant_id: str, name: str, completed_at: datetime) -> None:
+        db.merge(AnalysisRunModel(tenant_id=tenant_id, name=name, completed_at=completed_at))
+        db.commit()
+
+
+class RecurringPaymentCrud:
+    @staticmethod
+    def get_payments(db: Session, tenant_id: str) -> List[RecurringPaymentModel]:
+        return db.query(RecurringPaymentModel).filter(
+            RecurringPaymentModel.tenant_id == tenant_id
+        ).order_by(RecurringPaymentModel.merchant).all()
+
+    @staticmethod
+    def replace_payments(
+            db: Session,
+            tenant_id: str,
+            payments: List[RecurringPaymentModel],
+            merchants: Optional[List[str]] = None
+    ) -> None:
+        """Swap in fresh detections for the given merchants (every merchant when None) in one commit"""
+        query = db.query(RecurringPaymentModel).filter(RecurringPaymentModel.tenant_id == tenant_id)
+        if merchants is None:
+            query.delete(synchronize_session=False)
+        else:
+            merchants = list(set(merchants))
+            for i in range(0, len(merchants), IN_CHUNK_SIZE):
+                query.filter(
+                    RecurringPaymentModel.merchant.in_(merchants[i:i + IN_CHUNK_SIZE])
+                ).delete(synchronize_session=False)
+        db.add_all(payments)
+        db.commit()
+
+
+class AnomalyCrud:
+    @staticmethod
+    def get_baselines(db: Session, tenant_id: str, kind: str, subjects: List[str]) -> dict:
+        """Baselines of the given merchants or categories, by subject"""
+        baselines = {}
+        subjects = list(set(subjects))
+        for i in range(0, len(subjects), IN_CHUNK_SIZE):
+            for baseline in db.query(SpendingBaselineModel).filter(
+                SpendingBaselineModel.tenant_id == tenant_id,
+                SpendingBaselineModel.kind == kind,
+                SpendingBaselineModel.subject.in_(subjects[i:i + IN_CHUNK_SIZE])
+            ):
+                baselines[baseline.subject] = baseline
+        return baselines
+
+    @staticmethod
+    def replace_baselines(db: Session, tenant_id: str, baselines: List[SpendingBaselineModel]) -> None:
+        db.query(SpendingBaselineModel).filter(
+            SpendingBaselineModel.tenant_id == tenant_id
+        ).delete(synchronize_session=False)
+        db.add_all(baselines)
+        db.commit()
+
+    @staticmethod
+    def save_anomalies(db: Session, tenant_id: str, anomalies: List[SpendingAnomalyModel]) -> None:
+        """Insert anomalies, replacing earlier scores of the same transaction or category week"""
+        for kind in {anomaly.kind for anomaly in anomalies}:
+            keys = [anomaly.key for anomaly in anomalies if anomaly.kind == kind]
+            for i in range(0, len(keys), IN_CHUNK_SIZE):
+                db.query(SpendingAnomalyModel).filter(
+                    SpendingAnomalyModel.tenant_id == tenant_id,
+                    SpendingAnomalyModel.kind == kind,
+                    SpendingAnomalyModel.key.in_(keys[i:i + IN_CHUNK_SIZE])
+                ).delete(synchronize_session=False)
+        db.add_all(anomalies)
+        db.commit()
+
+    @staticmethod
+    @timed_query
+    def get_anomalies(
+            db: Session,
+            tenant_id: str,
+            date_range: DateRange,
+            kind: Optional[str] = None,
+            min_score: float = 0.0,
+            limit: int = 100
+    ) -> List[SpendingAnomalyModel]:
+        query = db.query(SpendingAnomalyModel).filter(
+            SpendingAnomalyModel.tenant_id == tenant_id,
+            SpendingAnomalyModel.score >= min_score
+        )
+        if date_range.start_date:
+            query = query.filter(SpendingAnomalyModel.period_start >= date_range.start_date.date())
+        if date_range.end_date:
+            query = query.filter(SpendingAnomalyModel.period_start <= date_range.end_date.date())
+        if kind:
+            query = query.filter(SpendingAnomalyModel.kind == kind)
+        return query.order_by(SpendingAnomalyModel.period_start.desc(), SpendingAnomalyModel.score.desc()).limit(limit).all()
+
+
+class BudgetCrud:
+    @staticmethod
+    def spend_row(transaction: TransactionModel) -> tuple:
+        return transaction.primary_category, transaction.card_type, transaction.date, transaction.amount
+
+    @staticmethod
+    def add_spend(db: Session, tenant_id: str, rows: Iterable[tuple], sign: int = 1) -> None:
+        """
+        Adjust the monthly counters of budgeted categories and cards for transactions, given as
+        (primary_category, card_type, date, amount), that started (``sign`` 1) or stopped (-1)
+        counting. Doesn't commit, so counters change in the same commit as the transactions.
+        """
+        deltas = defaultdict(lambda: [Decimal("0"), 0])
+        for primary_category, card_type, date, amount in rows:
+            month = date.strftime("%Y-%m")
+            for key in (("category", primary_category, month), ("card", card_type, month)):
+                if key[1]:
+                    deltas[key][0] += sign * Decimal(str(amount))
+                    deltas[key][1] += sign
+        BudgetCrud.adjust_counters(db, tenant_id, deltas)
+
+    @staticmethod
+    def adjust_counters(db: Session, tenant_id: str, deltas: dict) -> None:
+        """Add (amount, count) deltas keyed by (scope, target, month) to the counters that exist"""
+        months = list({month for _, _, month in deltas})
+        if not months:
+            return
+
+        # Counters only exist for budgeted targets in months whose status has been read; the
+        # rest are seeded from the transactions on first read
+        existing = set()
+        for i in range(0, len(months), IN_CHUNK_SIZE):
+            existing.update(db.query(BudgetSpendModel.scope, BudgetSpendModel.target, BudgetSpendModel.month).filter(
+                BudgetSpendModel.tenant_id == tenant_id,
+                BudgetSpendModel.month.in_(months[i:i + IN_CHUNK_SIZE])
+            ).all())
+
+        for (scope, target, month), (amount, count) in deltas.items():
+            if (scope, target, month) not in existing or (not amount and not count):
+                continue
+            db.query(BudgetSpendModel).filter(
+                BudgetSpendModel.tenant_id == tenant_id,
+                BudgetSpendModel.scope == scope,
+                BudgetSpendModel.target == target,
+                BudgetSpendModel.month == month
+            ).update({
+                BudgetSpendModel.spent: BudgetSpendModel.spent + amount,
+                BudgetSpendModel.count: BudgetSpendModel.count + count
+            }, synchronize_session=False)
+
+    @staticmethod
+    def has_counters(db: Session, tenant_id: str, scope: str) -> bool:
+        return db.query(BudgetSpendModel.id).filter(
+            BudgetSpendModel.tenant_id == tenant_id,
+            BudgetSpendModel.scope == scope
+        ).first() is not None
+
+    @staticmethod
+    def get_counters(db: Session, tenant_id: str, month: str) -> dict:
+        """Counters of one month, by (scope, target)"""
+        return {
+            (counter.scope, counter.target): counter
+            for counter in db.query(BudgetSpendModel).filter(
+                BudgetSpendModel.tenant_id == tenant_id,
+                BudgetSpendModel.month == month
+            )
+        }
+
+    @staticmethod
+    @timed_query
+    def sum_month_spend(db: Session, tenant_id: str, month: str, targets: List[Tuple[str, str]]) -> dict:
+        """(total, count) of included transactions in a month for (scope, target) pairs, one query per scope"""
+        start = datetime.strptime(month, "%Y-%m")
+        end = (start + timedelta(days=32)).replace(day=1)
+        spend = {}
+        for scope, column in (("category", TransactionModel.primary_category), ("card", TransactionModel.card_type)):
+            scope_targets = [target for target_scope, target in targets if target_scope == scope]
+            if not scope_targets:
+                continue
+            totals = {
+                target: (Decimal(str(total or 0)), count)
+                for target, total, count in db.query(column, func.sum(TransactionModel.amount), func.count()).filter(
+                    TransactionModel.tenant_id == tenant_id,
+                    TransactionModel.excluded == False,
+                    TransactionModel.date >= start,
+                    TransactionModel.date < end,
+                    column.in_(scope_targets)
+                ).group_by(column)
+            }
+            for target in scope_targets:
+                spend[(scope, target)] = totals.get(target, (Decimal("0"), 0))
+        return spend
+
+    @staticmethod
+    def seed_counters(db: Session, tenant_id: str, month: str, targets: List[Tuple[str, str]]) -> dict:
+        """Create the month's counters for (scope, target) pairs by summing their transactions once"""
+        counters = {
+            (scope, target): BudgetSpendModel(
+                tenant_id=tenant_id, scope=scope, target=target, month=month, spent=total, count=count, alerted=0.0
+            )
+            for (scope, target), (total, count) in BudgetCrud.sum_month_spend(db, tenant_id, month, targets).items()
+        }
+        db.add_all(counters.values())
+        db.commit()
+        return counters
+
+    @staticmethod
+    def recount_counters(db: Session, tenant_id: str, month: str, counters: dict) -> None:
+        """Re-sum existing counters from the transactions, keeping which alerts were sent"""
+        for key, (total, count) in BudgetCrud.sum_month_spend(db, tenant_id, month, list(counters)).items():
+            counters[key].spent = total
+            counters[key].count = count
+        db.commit()
+
+    @staticmethod
+    def get_budgets(db: Session, tenant_id: str) -> List[BudgetModel]:
+        return db.query(BudgetModel).filter(
+            BudgetModel.tenant_id == tenant_id
+        ).order_by(BudgetModel.scope, BudgetModel.target).all()
+
+    @staticmethod
+    def set_budget(db: Session, tenant_id: str, scope: str, target: str, amount: Decimal) -> BudgetModel:
+        """Create the budget for a category or card, or change its limit"""
+        budget = db.query(BudgetModel).filter(
+            BudgetModel.tenant_id == tenant_id,
+            BudgetModel.scope == scope,
+            BudgetModel.target == target
+        ).first()
+        if budget is None:
+            budget = BudgetModel(tenant_id=tenant_id, scope=scope, target=target, created_at=datetime.now())
+            db.add(budget)
+        budget.amount = amount
+        db.commit()
+        db.refresh(budget)
+        return budget
+
+    @staticmethod
+    def delete_budget(db: Session, tenant_id: str, budget_id: int) -> bool:
+        budget = db.query(BudgetModel).filter(BudgetModel.tenant_id == tenant_id, BudgetModel.id == budget_id).first()
+        if budget is None:
+            return False
+        db.query(BudgetSpendModel).filter(
+            BudgetSpendModel.tenant_id == tenant_id,
+            BudgetSpendModel.scope == budget.scope,
+            BudgetSpendModel.target == budget.target
+        ).delete(synchronize_session=False)
+        db.delete(budget)
+        db.commit()
+        return True
+
+
+class FxRateCrud:
+    @staticmethod
+    def get_rates(db: Session, currencies: Set[str], quote: str, start: date, end: date) -> list:
+        """
+        (base, date, rate) of the rates from the currencies into ``quote`` between ``start`` and
+        ``end``, plus each currency's nearest rate before and after them, oldest first. Those are
+        every rate a "latest on or before, else earliest after" lookup in the span can pick.
+        """
+        pair = [FxRateModel.base.in_(list(currencies)), FxRateModel.quote == quote]
+        before = select(FxRateModel.base, func.max(FxRateModel.date)).where(
+            *pair, FxRateModel.date < start
+        ).group_by(FxRateModel.base)
+        after = select(FxRateModel.base, func.min(FxRateModel.date)).where(
+            *pair, FxRateModel.date > end
+        ).group_by(FxRateModel.base)
+        return db.query(FxRateModel.base, FxRateModel.date, FxRateModel.rate).filter(
+            *pair,
+            or_(
+                FxRateModel.date.between(start, end),
+                tuple_(FxRateModel.base, FxRateModel.date).in_(before),
+                tuple_(FxRateModel.base, FxRateModel.date).in_(after)
+            )
+        ).order_by(FxRateModel.base, FxRateModel.date).all()
+
+    @staticmethod
+    def get_dates(db: Session, quote: str, dates: Set[date]) -> Set[date]:
+        """Which of the dates already have rates into ``quote``"""
+        dates = list(dates)
+        stored = set()
+        for i in range(0, len(dates), IN_CHUNK_SIZE):
+            stored.update(day for day, in db.query(FxRateModel.date).filter(
+                FxRateModel.quote == quote,
+                FxRateModel.date.in_(dates[i:i + IN_CHUNK_SIZE])
+            ).distinct())
+        return stored
+
+    @staticmethod
+    def add_rates(db: Session, rows: List[dict]) -> None:
+        """Insert rates, keeping the stored rate where one already exists for the date"""
+        if not rows:
+            return
+        dialect = db.bind.dialect.name
+        if dialect == "sqlite":
+            db.execute(sqlite_insert(FxRateModel.__table__).on_conflict_do_nothing(), rows)
+        elif dialect == "postgresql":
+            db.execute(postgresql_insert(FxRateModel.__table__).on_conflict_do_nothing(), rows)
+        else:
+            for row in rows:
+                db.merge(FxRateModel(**row))
+        db.commit()
@@ -0,0 +1,23 @@
+"""
+Schema lookups for migrations.
+
+Databases that predate the migrations were built by ``Base.metadata.create_all`` at whatever
+point of the schema's history they were created, so a migration may find its change already
+made. Migrations check the live schema with these helpers and skip what is already there.
+"""
+from typing import Set
+
+from alembic import op
+from sqlalchemy import inspect
+
+
+def has_table(table: str) -> bool:
+    return inspect(op.get_bind()).has_table(table)
+
+
+def columns(table: str) -> Set[str]:
+    return {column["name"] for column in inspect(op.get_bind()).get_columns(table)}
+
+
+def indexes(table: str) -> Set[str]:
+    return {index["name"] for index in inspect(op.get_bind()).get_indexes(table)}
@@ -0,0 +1,50 @@
+"""
+Alembic environment for the app's database (``app.db.database``).
+
+``python -m app.migrate`` passes its own connection in ``config.attributes``; the alembic CLI
+connects with the app's engine.
+"""
+from alembic import context
+
+import app.db.crud  # noqa: F401  (registers every model on Base.metadata)
+from app.db.base_class import Base
+from app.db.database import engine
+from app.db.search import FTS_TABLE
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # The search index is created by app.db.search, outside the models, so autogenerate
+    # must not try to drop it
+    if type_ == "table" and name.startswith(FTS_TABLE):
+        return False
+    if type_ == "index" and name.endswith("_trgm"):
+        return False
+    return True
+
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=Base.metadata,
+        include_object=include_object,
+        # SQLite can't alter most constraints in place; batch mode rebuilds the table instead
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    context.configure(
+        url=engine.url,
+        target_metadata=Base.metadata,
+        include_object=include_object,
+        literal_binds=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+elif context.config.attributes.get("connection") is not None:
+    run_migrations(context.config.attributes["connection"])
+else:
+    with engine.connect() as connection:
+        run_migrations(connection)
@@ -0,0 +1,58 @@
+"""baseline schema
+
+The transactions and sync_info tables as ``Base.metadata.create_all`` created them before
+any of the later schema changes. ``python -m app.migrate`` stamps unversioned databases with
+this revision once it has checked they have these columns; the following migrations skip
+changes such a database already has.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 01:53:00.632483
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sync_info',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('last_sync_date', sa.DateTime(), nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=True),
+    sa.Column('end_date', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('transactions',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=True),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('merchant', sa.String(), nullable=True),
+    sa.Column('primary_category', sa.String(), nullable=True),
+    sa.Column('subcategory', sa.String(), nullable=True),
+    sa.Column('confidence', sa.Float(), nullable=True),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('excluded', sa.Boolean(), nullable=False),
+    sa.Column('original_currency', sa.String(length=3), nullable=True),
+    sa.Column('original_amount', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('exchange_rate', sa.Numeric(precision=10, scale=6), nullable=True),
+    sa.Column('exchange_rate_date', sa.Date(), nullable=True),
+    sa.Column('card_type', sa.String(length=50), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_transactions_date', 'transactions', ['date'], unique=False)
+    op.create_index('ix_transactions_merchant', 'transactions', ['merchant'], unique=False)
+    op.create_index('ix_transactions_primary_category', 'transactions', ['primary_category'], unique=False)
+    op.create_index('ix_transactions_subcategory', 'transactions', ['subcategory'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transactions_subcategory', table_name='transactions')
+    op.drop_index('ix_transactions_primary_category', table_name='transactions')
+    op.drop_index('ix_transactions_merchant', table_name='transactions')
+    op.drop_index('ix_transactions_date', table_name='transactions')
+    op.drop_table('transactions')
+    op.drop_table('sync_info')
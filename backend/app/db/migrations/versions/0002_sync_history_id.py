@@ -0,0 +1,30 @@
+"""sync history id
+
+Gmail mailbox history position for incremental syncs.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 11:02:14.503127
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import columns
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = columns('sync_info')
+    if 'history_id' not in existing:
+        op.add_column('sync_info', sa.Column('history_id', sa.String(), nullable=True))
+    if 'history_date' not in existing:
+        op.add_column('sync_info', sa.Column('history_date', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('sync_info', 'history_date')
+    op.drop_column('sync_info', 'history_id')
@@ -0,0 +1,34 @@
+"""sync coverage
+
+Date intervals whose alert emails have been ingested.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 11:03:40.918264
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import has_table
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if has_table('sync_coverage'):
+        return
+    op.create_table('sync_coverage',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('end_date', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_coverage_interval', 'sync_coverage', ['end_date', 'start_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sync_coverage_interval', table_name='sync_coverage')
+    op.drop_table('sync_coverage')
@@ -0,0 +1,38 @@
+"""backfill windows
+
+Checkpoints of historical backfill runs.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 11:04:52.377010
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import has_table
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if has_table('backfill_windows'):
+        return
+    op.create_table('backfill_windows',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('end_date', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('start_date', 'end_date', name='uq_backfill_window')
+    )
+
+
+def downgrade():
+    op.drop_table('backfill_windows')
@@ -0,0 +1,37 @@
+"""email archive
+
+Locations of raw alert emails inside the compressed archive segments.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 11:06:05.640193
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import has_table
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if has_table('email_archive'):
+        return
+    op.create_table('email_archive',
+    sa.Column('message_id', sa.String(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('segment', sa.Integer(), nullable=False),
+    sa.Column('offset', sa.Integer(), nullable=False),
+    sa.Column('length', sa.Integer(), nullable=False),
+    sa.Column('codec', sa.String(length=8), nullable=False),
+    sa.PrimaryKeyConstraint('message_id')
+    )
+    op.create_index('ix_email_archive_date', 'email_archive', ['date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_email_archive_date', table_name='email_archive')
+    op.drop_table('email_archive')
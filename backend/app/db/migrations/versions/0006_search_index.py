@@ -0,0 +1,25 @@
+"""search index
+
+Full-text index over merchants and descriptions (see app.db.search), filled from the
+existing rows. As first created it was keyed on the implicit rowid; 0012 rekeys it on seq.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 11:07:21.085512
+"""
+from alembic import op
+
+from app.db.search import create_search_index, drop_search_index
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_search_index(op.get_bind(), key_column='rowid')
+
+
+def downgrade():
+    drop_search_index(op.get_bind())
@@ -0,0 +1,132 @@
+"""tenancy
+
+Partitions every table by ``tenant_id``; existing rows belong to the default tenant.
+
+- transactions, sync_coverage, backfill_windows and email_archive get a ``tenant_id``
+  column, and their indexes and keys lead with it.
+- ``sync_info.id`` (always 'last_sync') becomes ``sync_info.tenant_id``.
+
+SQLite can't change a primary key or unique constraint in place, so email_archive,
+backfill_windows and sync_info are rebuilt in batch mode.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 11:09:47.212380
+"""
+import warnings
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import columns, indexes
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+DEFAULT_TENANT = 'default'
+
+SINGLE_COLUMN_INDEXES = {
+    'ix_transactions_date': ['date'],
+    'ix_transactions_merchant': ['merchant'],
+    'ix_transactions_primary_category': ['primary_category'],
+    'ix_transactions_subcategory': ['subcategory'],
+}
+
+TENANT_INDEXES = {
+    'ix_transactions_tenant_date': ['tenant_id', 'date'],
+    'ix_transactions_tenant_merchant': ['tenant_id', 'merchant'],
+    'ix_transactions_tenant_category': ['tenant_id', 'primary_category', 'subcategory'],
+}
+
+
+def tenant_column():
+    return sa.Column('tenant_id', sa.String(length=64), server_default=DEFAULT_TENANT, nullable=False)
+
+
+def rebuild_email_archive(tenanted):
+    """Add or drop email_archive's tenant_id, which leads its primary key"""
+    primary_key = sa.inspect(op.get_bind()).get_pk_constraint('email_archive')['name']
+    with warnings.catch_warnings():
+        # The copied columns still carry the old primary key flag until the new key replaces it
+        warnings.filterwarnings('ignore', "Table '_alembic_tmp_email_archive'", sa.exc.SAWarning)
+        with op.batch_alter_table('email_archive') as batch_op:
+            if tenanted:
+                batch_op.add_column(tenant_column())
+            else:
+                batch_op.drop_column('tenant_id')
+            if primary_key:
+                batch_op.drop_constraint(primary_key, type_='primary')
+            batch_op.create_primary_key(
+                'pk_email_archive', ['tenant_id', 'message_id'] if tenanted else ['message_id']
+            )
+
+
+def upgrade():
+    if 'tenant_id' not in columns('transactions'):
+        op.add_column('transactions', tenant_column())
+    existing = indexes('transactions')
+    for name in SINGLE_COLUMN_INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name='transactions')
+    for name, index_columns in TENANT_INDEXES.items():
+        op.create_index(name, 'transactions', index_columns, unique=False, if_not_exists=True)
+
+    if 'tenant_id' not in columns('sync_info'):
+        with op.batch_alter_table('sync_info') as batch_op:
+            batch_op.alter_column(
+                'id', new_column_name='tenant_id', existing_type=sa.String(), type_=sa.String(length=64),
+                existing_nullable=False
+            )
+        op.execute(sa.text(
+            "UPDATE sync_info SET tenant_id = :tenant WHERE tenant_id = 'last_sync'"
+        ).bindparams(tenant=DEFAULT_TENANT))
+
+    if 'tenant_id' not in columns('sync_coverage'):
+        op.add_column('sync_coverage', tenant_column())
+        op.drop_index('ix_sync_coverage_interval', table_name='sync_coverage')
+        op.create_index(
+            'ix_sync_coverage_interval', 'sync_coverage', ['tenant_id', 'end_date', 'start_date'], unique=False
+        )
+
+    if 'tenant_id' not in columns('backfill_windows'):
+        with op.batch_alter_table('backfill_windows') as batch_op:
+            batch_op.add_column(tenant_column())
+            batch_op.drop_constraint('uq_backfill_window', type_='unique')
+            batch_op.create_unique_constraint('uq_backfill_window', ['tenant_id', 'start_date', 'end_date'])
+
+    if 'tenant_id' not in columns('email_archive'):
+        op.drop_index('ix_email_archive_date', table_name='email_archive')
+        rebuild_email_archive(tenanted=True)
+        op.create_index('ix_email_archive_tenant_date', 'email_archive', ['tenant_id', 'date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_email_archive_tenant_date', table_name='email_archive')
+    rebuild_email_archive(tenanted=False)
+    op.create_index('ix_email_archive_date', 'email_archive', ['date'], unique=False)
+
+    with op.batch_alter_table('backfill_windows') as batch_op:
+        batch_op.drop_constraint('uq_backfill_window', type_='unique')
+        batch_op.create_unique_constraint('uq_backfill_window', ['start_date', 'end_date'])
+        batch_op.drop_column('tenant_id')
+
+    op.drop_index('ix_sync_coverage_interval', table_name='sync_coverage')
+    op.drop_column('sync_coverage', 'tenant_id')
+    op.create_index('ix_sync_coverage_interval', 'sync_coverage', ['end_date', 'start_date'], unique=False)
+
+    # Only the default tenant fits the single-row shape
+    op.execute(sa.text("DELETE FROM sync_info WHERE tenant_id != :tenant").bindparams(tenant=DEFAULT_TENANT))
+    op.execute("UPDATE sync_info SET tenant_id = 'last_sync'")
+    with op.batch_alter_table('sync_info') as batch_op:
+        batch_op.alter_column(
+            'tenant_id', new_column_name='id', existing_type=sa.String(length=64), type_=sa.String(),
+            existing_nullable=False
+        )
+
+    for name in TENANT_INDEXES:
+        op.drop_index(name, table_name='transactions', if_exists=True)
+    op.drop_column('transactions', 'tenant_id')
+    for name, index_columns in SINGLE_COLUMN_INDEXES.items():
+        op.create_index(name, 'transactions', index_columns, unique=False)
@@ -0,0 +1,32 @@
+"""transaction message id
+
+The Gmail message each transaction was parsed from. The unique index makes re-ingesting a
+message a no-op; rows from before this column existed have no message id and don't clash.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 11:12:33.954718
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import columns
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'gmail_message_id' not in columns('transactions'):
+        op.add_column('transactions', sa.Column('gmail_message_id', sa.String(), nullable=True))
+    op.create_index(
+        'ux_transactions_tenant_message', 'transactions', ['tenant_id', 'gmail_message_id'], unique=True,
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index('ux_transactions_tenant_message', table_name='transactions')
+    op.drop_column('transactions', 'gmail_message_id')
@@ -0,0 +1,113 @@
+"""recurring payments, anomalies, budgets and fx rates
+
+Tables of the spending insights (recurring payments, anomalies and their baselines), budgets
+with their monthly spend counters, and cached exchange rates.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 11:15:08.406521
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import has_table
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table('recurring_payments'):
+        op.create_table('recurring_payments',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('tenant_id', sa.String(length=64), server_default='default', nullable=False),
+        sa.Column('merchant', sa.String(), nullable=False),
+        sa.Column('cadence', sa.String(length=16), nullable=False),
+        sa.Column('period_days', sa.Float(), nullable=False),
+        sa.Column('typical_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('amount_variation', sa.Float(), nullable=False),
+        sa.Column('regularity', sa.Float(), nullable=False),
+        sa.Column('occurrences', sa.Integer(), nullable=False),
+        sa.Column('first_date', sa.Date(), nullable=False),
+        sa.Column('last_date', sa.Date(), nullable=False),
+        sa.Column('next_expected_date', sa.Date(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('tenant_id', 'merchant', name='uq_recurring_payment_merchant')
+        )
+    if not has_table('spending_anomalies'):
+        op.create_table('spending_anomalies',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('tenant_id', sa.String(length=64), server_default='default', nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('subject', sa.String(), nullable=False),
+        sa.Column('transaction_id', sa.String(length=36), nullable=True),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('baseline', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('detected_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('tenant_id', 'kind', 'key', name='uq_spending_anomaly_key')
+        )
+        op.create_index(
+            'ix_spending_anomalies_tenant_period', 'spending_anomalies', ['tenant_id', 'period_start'], unique=False
+        )
+    if not has_table('spending_baselines'):
+        op.create_table('spending_baselines',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('tenant_id', sa.String(length=64), server_default='default', nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('subject', sa.String(), nullable=False),
+        sa.Column('median', sa.Float(), nullable=False),
+        sa.Column('mad', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('tenant_id', 'kind', 'subject', name='uq_spending_baseline_subject')
+        )
+    if not has_table('budgets'):
+        op.create_table('budgets',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('tenant_id', sa.String(length=64), server_default='default', nullable=False),
+        sa.Column('scope', sa.String(length=16), nullable=False),
+        sa.Column('target', sa.String(), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('tenant_id', 'scope', 'target', name='uq_budget_target')
+        )
+    if not has_table('budget_spend'):
+        op.create_table('budget_spend',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('tenant_id', sa.String(length=64), server_default='default', nullable=False),
+        sa.Column('scope', sa.String(length=16), nullable=False),
+        sa.Column('target', sa.String(), nullable=False),
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('spent', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('alerted', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('tenant_id', 'scope', 'target', 'month', name='uq_budget_spend_month')
+        )
+    if not has_table('fx_rates'):
+        op.create_table('fx_rates',
+        sa.Column('base', sa.String(length=3), nullable=False),
+        sa.Column('quote', sa.String(length=3), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('rate', sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.PrimaryKeyConstraint('base', 'quote', 'date')
+        )
+
+
+def downgrade():
+    op.drop_table('fx_rates')
+    op.drop_table('budget_spend')
+    op.drop_table('budgets')
+    op.drop_table('spending_baselines')
+    op.drop_index('ix_spending_anomalies_tenant_period', table_name='spending_anomalies')
+    op.drop_table('spending_anomalies')
+    op.drop_table('recurring_payments')
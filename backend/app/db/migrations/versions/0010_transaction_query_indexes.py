@@ -0,0 +1,57 @@
+"""transaction query indexes
+
+Composite indexes matched to the TransactionCrud query shapes (see ``python -m app.explain``):
+
+- (tenant_id, date, id) replaces (tenant_id, date): listing pages are read backwards in
+  index order, with id as a tiebreaker, and counts are answered from the index alone.
+- (tenant_id, primary_category, subcategory, date) replaces (tenant_id, primary_category,
+  subcategory), adding the date bound of budget sums and category filters.
+- A partial index over included transactions covers the range aggregates (breakdown, trend,
+  rollups), so they never read the table.
+
+ANALYZE runs afterwards so the planner weighs the new indexes by their real selectivity;
+without statistics SQLite can pick a date index over the search index for full-text queries.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 02:05:12.118406
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+INCLUDED_COLUMNS = [
+    'tenant_id', 'date', 'primary_category', 'subcategory', 'card_type', 'merchant', 'amount', 'excluded'
+]
+
+
+def upgrade():
+    op.create_index(
+        'ix_transactions_tenant_date_id', 'transactions', ['tenant_id', 'date', 'id'], if_not_exists=True
+    )
+    op.create_index(
+        'ix_transactions_tenant_category_date', 'transactions',
+        ['tenant_id', 'primary_category', 'subcategory', 'date'], if_not_exists=True
+    )
+    op.create_index(
+        'ix_transactions_tenant_included', 'transactions', INCLUDED_COLUMNS, if_not_exists=True,
+        sqlite_where=sa.text('excluded = 0'), postgresql_where=sa.text('excluded = false')
+    )
+    op.drop_index('ix_transactions_tenant_date', table_name='transactions', if_exists=True)
+    op.drop_index('ix_transactions_tenant_category', table_name='transactions', if_exists=True)
+    op.execute('ANALYZE')
+
+
+def downgrade():
+    op.create_index('ix_transactions_tenant_date', 'transactions', ['tenant_id', 'date'], if_not_exists=True)
+    op.create_index(
+        'ix_transactions_tenant_category', 'transactions', ['tenant_id', 'primary_category', 'subcategory'],
+        if_not_exists=True
+    )
+    op.drop_index('ix_transactions_tenant_included', table_name='transactions', if_exists=True)
+    op.drop_index('ix_transactions_tenant_category_date', table_name='transactions', if_exists=True)
+    op.drop_index('ix_transactions_tenant_date_id', table_name='transactions', if_exists=True)
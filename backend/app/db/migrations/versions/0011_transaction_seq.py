@@ -0,0 +1,43 @@
+"""transaction insertion sequence
+
+Adds ``transactions.seq``, the watermark of incremental snapshot exports, replacing SQLite's
+implicit rowid, which VACUUM may renumber and which is reused after the newest row is deleted.
+On SQLite a trigger stamps new rows from the ``row_sequences`` counter (see app.db.sequence);
+existing rows are numbered by their current rowid, so stored rowid watermarks stay valid.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 09:12:40.271935
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import columns, has_table
+from app.db.sequence import create_sequence_trigger, drop_sequence_trigger
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table('row_sequences'):
+        op.create_table('row_sequences',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+        )
+    if 'seq' not in columns('transactions'):
+        op.add_column('transactions', sa.Column('seq', sa.Integer(), nullable=True))
+    create_sequence_trigger(op.get_bind())
+    op.create_index(
+        'ix_transactions_tenant_seq', 'transactions', ['tenant_id', 'seq'], unique=False, if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index('ix_transactions_tenant_seq', table_name='transactions')
+    drop_sequence_trigger(op.get_bind())
+    op.drop_column('transactions', 'seq')
+    op.drop_table('row_sequences')
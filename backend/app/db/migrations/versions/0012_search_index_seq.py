@@ -0,0 +1,33 @@
+"""search index keyed on seq
+
+Rebuilds the SQLite full-text index keyed on ``transactions.seq`` instead of the implicit
+rowid, which VACUUM may renumber and SQLite reuses after deletes, leaving index entries
+pointing at the wrong transactions. PostgreSQL's trigram indexes are keyed on the rows
+themselves and are left alone.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 14:21:36.572093
+"""
+from alembic import op
+
+from app.db.search import create_search_index, drop_search_index
+
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        drop_search_index(bind)
+        create_search_index(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        drop_search_index(bind)
+        create_search_index(bind, key_column='rowid')
@@ -0,0 +1,34 @@
+"""analysis runs
+
+When each tenant's last full recurring payment detection and anomaly baseline rebuild
+completed, so a history without recurring payments or baselines isn't mistaken for one that
+was never analysed.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 15:02:48.310576
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import has_table
+
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if has_table('analysis_runs'):
+        return
+    op.create_table('analysis_runs',
+    sa.Column('tenant_id', sa.String(length=64), nullable=False),
+    sa.Column('name', sa.String(length=32), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('tenant_id', 'name')
+    )
+
+
+def downgrade():
+    op.drop_table('analysis_runs')
@@ -0,0 +1,119 @@
+"""
+Full-text search index over transaction merchants and descriptions.
+
+On SQLite this is an FTS5 external-content table (``transactions_fts``) kept in sync with
+``transactions`` by triggers, so bulk inserts during ingest and merchant recategorisation
+update it without any application code. On PostgreSQL, trigram GIN indexes serve the same
+queries. The index is created (and backfilled from existing rows) by the search index
+migrations, and whenever ``Base.metadata.create_all`` runs.
+"""
+import re
+from typing import List
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, event, text
+
+from app.db.base_class import Base
+
+FTS_TABLE = "transactions_fts"
+
+# For building queries only; kept off Base.metadata since create_all can't create virtual tables
+fts_table = Table(
+    FTS_TABLE, MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("merchant", String),
+    Column("description", String),
+)
+
+# The index is keyed on transactions.seq rather than the implicit rowid, which VACUUM may
+# renumber and SQLite reuses after deletes (see app.db.sequence); a renumbered rowid would point
+# index entries at the wrong transactions. New rows get their seq from an UPDATE made by the
+# sequence trigger, so rows are indexed when seq is set rather than when they are inserted.
+KEY_COLUMN = "seq"
+
+
+def sqlite_ddl(key_column: str = KEY_COLUMN) -> List[str]:
+    """
+    The FTS table and the triggers that keep it in step with ``transactions``. ``key_column``
+    is ``rowid`` only for the index as first created, by revision 0006.
+    """
+    watched = "merchant, description" if key_column == "rowid" else f"merchant, description, {key_column}"
+    return [
+        f"""
+        CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+            merchant, description,
+            content='transactions', content_rowid='{key_column}',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions
+        WHEN new.{key_column} IS NOT NULL BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, merchant, description)
+            VALUES (new.{key_column}, new.merchant, new.description);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions
+        WHEN old.{key_column} IS NOT NULL BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, merchant, description)
+            VALUES ('delete', old.{key_column}, old.merchant, old.description);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF {watched} ON transactions BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, merchant, description)
+            SELECT 'delete', old.{key_column}, old.merchant, old.description WHERE old.{key_column} IS NOT NULL;
+            INSERT INTO {FTS_TABLE}(rowid, merchant, description)
+            SELECT new.{key_column}, new.merchant, new.description WHERE new.{key_column} IS NOT NULL;
+        END
+        """,
+    ]
+
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_merchant_trgm ON transactions USING gin (merchant gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_description_trgm ON transactions USING gin (description gin_trgm_ops)",
+]
+
+
+def create_search_index(connection, key_column: str = KEY_COLUMN):
+    """Create the search index for the connection's dialect if it doesn't exist yet"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        if exists:
+            return
+        for statement in sqlite_ddl(key_column):
+            connection.execute(text(statement))
+        # Index rows inserted before the search table existed
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    elif dialect == "postgresql":
+        for statement in POSTGRES_DDL:
+            connection.execute(text(statement))
+
+
+def drop_search_index(connection):
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        for trigger in ("insert", "delete", "update"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS transactions_fts_{trigger}"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    elif dialect == "postgresql":
+        for column in ("merchant", "description"):
+            connection.execute(text(f"DROP INDEX IF EXISTS ix_transactions_{column}_trgm"))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    create_search_index(connection)
+
+
+def fts_query(query: str) -> str:
+    """
+    Turn free text into an FTS5 MATCH expression: every word must match as a word prefix,
+    so ``uber tri`` finds "UBER TRIP". Quoting each word keeps FTS5 operators in user input inert.
+    """
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", query))
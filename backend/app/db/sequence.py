@@ -0,0 +1,51 @@
+"""
+Insertion order of transactions, the watermark of incremental snapshot exports.
+
+``transactions.id`` is a random UUID, and SQLite's implicit rowid may be renumbered by VACUUM
+and is reused once the newest row is deleted, so neither can tell which rows an export has
+already seen. On SQLite a trigger stamps every new row's ``seq`` from a counter in
+``row_sequences`` that only ever grows; writers are serialised, so rows are numbered in
+commit order. Rows that existed before keep their rowid as ``seq``. On other databases
+``seq`` stays empty and snapshots are always full exports.
+"""
+from sqlalchemy import Column, Integer, String, Table, event, text
+
+from app.db.base_class import Base
+
+TRANSACTIONS_SEQUENCE = "transactions"
+
+row_sequences = Table(
+    "row_sequences", Base.metadata,
+    Column("name", String(64), primary_key=True),
+    Column("value", Integer, nullable=False),
+)
+
+SQLITE_TRIGGER = f"""
+CREATE TRIGGER IF NOT EXISTS transactions_seq_insert AFTER INSERT ON transactions WHEN new.seq IS NULL BEGIN
+    UPDATE row_sequences SET value = value + 1 WHERE name = '{TRANSACTIONS_SEQUENCE}';
+    UPDATE transactions SET seq = (SELECT value FROM row_sequences WHERE name = '{TRANSACTIONS_SEQUENCE}')
+    WHERE rowid = new.rowid;
+END
+"""
+
+
+def create_sequence_trigger(connection):
+    """Number existing transactions and start stamping new ones; a no-op outside SQLite"""
+    if connection.dialect.name != "sqlite":
+        return
+    connection.execute(text("UPDATE transactions SET seq = rowid WHERE seq IS NULL"))
+    connection.execute(text(
+        "INSERT OR IGNORE INTO row_sequences (name, value) "
+        "SELECT :name, COALESCE(MAX(seq), 0) FROM transactions"
+    ), {"name": TRANSACTIONS_SEQUENCE})
+    connection.execute(text(SQLITE_TRIGGER))
+
+
+def drop_sequence_trigger(connection):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TRIGGER IF EXISTS transactions_seq_insert"))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    create_sequence_trigger(connection)
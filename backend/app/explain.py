@@ -0,0 +1,138 @@
+"""
+Print the query plan of every TransactionCrud read query, to check which indexes they use.
+
+    python -m app.explain [--tenant default] [--days 90] [--sql]
+
+Each query runs once with arguments taken from the tenant's own data (its latest ``--days``
+of transactions, most frequent merchant and category), and the SQL it issued is passed to
+``EXPLAIN QUERY PLAN`` on SQLite or ``EXPLAIN`` on PostgreSQL. Lines mentioning ``SCAN
+transactions`` or a temporary B-tree are the ones an index could remove.
+"""
+import argparse
+import time
+from datetime import timedelta
+from typing import Callable, List, Tuple
+
+from sqlalchemy import event, func
+
+from app.core.tenancy import DEFAULT_TENANT, validate_tenant_id
+from app.db.crud import TransactionCrud
+from app.db.database import SessionLocal, engine
+from app.models.schemas import DateRange
+from app.models.transaction_model import TransactionModel
+
+
+def sample_arguments(db, tenant_id: str, days: int) -> dict:
+    """A recent date range, the most frequent merchant and category, and some message IDs of the tenant"""
+    latest = db.query(func.max(TransactionModel.date)).filter(TransactionModel.tenant_id == tenant_id).scalar()
+    if latest is None:
+        return {}
+
+    def most_common(column):
+        return db.query(column).filter(TransactionModel.tenant_id == tenant_id).group_by(column) \
+            .order_by(func.count().desc()).limit(1).scalar()
+
+    message_ids = [message_id for message_id, in db.query(TransactionModel.gmail_message_id).filter(
+        TransactionModel.tenant_id == tenant_id, TransactionModel.gmail_message_id.isnot(None)
+    ).order_by(TransactionModel.date.desc()).limit(100)]
+    return {
+        "date_range": DateRange(start_date=latest - timedelta(days=days), end_date=latest),
+        "merchant": most_common(TransactionModel.merchant),
+        "category": most_common(TransactionModel.primary_category),
+        "message_ids": message_ids,
+        "since": latest - timedelta(days=days),
+    }
+
+
+def transaction_queries(tenant_id: str, args: dict) -> List[Tuple[str, Callable]]:
+    """(label, call) for each read query, in the order the API typically issues them"""
+    date_range, category = args["date_range"], args["category"]
+    return [
+        ("get_transactions: date range, newest first",
+         lambda db: TransactionCrud.get_transactions(db, tenant_id, date_range, limit=100)),
+        ("get_transactions: date range, included only, page 5",
+         lambda db: TransactionCrud.get_transactions(db, tenant_id, date_range, include_excluded=False,
+                                                     limit=100, offset=400)),
+        ("get_transactions: category filter",
+         lambda db: TransactionCrud.get_transactions(db, tenant_id, date_range, category=category, limit=100)),
+        ("get_transaction_count: date range",
+         lambda db: TransactionCrud.get_transaction_count(db, tenant_id, date_range)),
+        ("get_categories: date range",
+         lambda db: TransactionCrud.get_categories(db, tenant_id, date_range)),
+        ("search_transactions: merchant words",
+         lambda db: TransactionCrud.search_transactions(db, tenant_id, args["merchant"] or "", date_range)),
+        ("get_transactions_by_message_ids",
+         lambda db: TransactionCrud.get_transactions_by_message_ids(db, tenant_id, args["message_ids"])),
+        ("get_ingested_message_ids",
+         lambda db: TransactionCrud.get_ingested_message_ids(db, tenant_id, args["message_ids"])),
+        ("get_spending_breakdown: date range",
+         lambda db: TransactionCrud.get_spending_breakdown(db, tenant_id, date_range)),
+        ("get_spending_trend: weekly per category",
+         lambda db: TransactionCrud.get_spending_trend(db, tenant_id, date_range, "week", "primary_category")),
+        ("get_merchant_series: one merchant",
+         lambda db: TransactionCrud.get_merchant_series(db, tenant_id, [args["merchant"]])),
+        ("get_spending_series: since range start",
+         lambda db: TransactionCrud.get_spending_series(db, tenant_id, args["since"])),
+        ("get_monthly_rollups",
+         lambda db: TransactionCrud.get_monthly_rollups(db, tenant_id)),
+    ]
+
+
+def explain(connection, statement: str, parameters) -> List[str]:
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node_id] + detail)
+        return lines
+    return [line for line, in connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Tenant whose data the queries run against")
+    parser.add_argument("--days", type=int, default=90, help="Length of the sample date range")
+    parser.add_argument("--sql", action="store_true", help="Also print each statement")
+    args = parser.parse_args()
+    try:
+        validate_tenant_id(args.tenant)
+    except ValueError as e:
+        parser.error(str(e))
+
+    db = SessionLocal()
+    try:
+        sample = sample_arguments(db, args.tenant, args.days)
+        if not sample:
+            parser.exit(1, f"Tenant {args.tenant} has no transactions\n")
+
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        for label, call in transaction_queries(args.tenant, sample):
+            statements.clear()
+            event.listen(engine, "before_cursor_execute", capture)
+            started = time.perf_counter()
+            try:
+                call(db)
+            finally:
+                event.remove(engine, "before_cursor_execute", capture)
+            elapsed = (time.perf_counter() - started) * 1000
+
+            print(f"== {label} ({elapsed:.1f} ms)")
+            for statement, parameters in statements:
+                if args.sql:
+                    print(" ".join(statement.split()))
+                for line in explain(db.connection(), statement, parameters):
+                    print(f"   {line}")
+            print()
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
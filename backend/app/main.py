@@ -1,14 +1,22 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.api_v1.routers.analytics_router import router as analytics_router
+from app.api.api_v1.routers.budgets_router import router as budgets_router
 from app.api.api_v1.routers.category_rules_router import router as category_rules_router
+from app.api.api_v1.routers.events_router import router as events_router
+from app.api.api_v1.routers.insights_router import router as insights_router
 from app.api.api_v1.routers.transactions_router import router as transactions_router
 from app.config import get_settings
+from app.core.compression import CompressionMiddleware
 from app.core.logger import logger
-from app.db.base_class import Base
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.profiling import ProfilingMiddleware, instrument_engine
 from app.db.database import engine
+from app.migrate import is_migrated, migrate
+from app.services.scheduler_service import SyncScheduler
 
 settings = get_settings()
 
@@ -18,14 +26,24 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up Transaction API")
 
-    # Initialize database tables
-    logger.info("Creating database tables if they don't exist")
-    Base.metadata.create_all(bind=engine)
+    if settings.AUTO_MIGRATE:
+        logger.info("Creating database tables if they don't exist")
+        migrate()
+    elif not is_migrated():
+        logger.warning("Database schema is not up to date; run `python -m app.migrate` or set AUTO_MIGRATE=true")
+
+    scheduler = None
+    if settings.SCHEDULED_SYNC_ENABLED:
+        scheduler = SyncScheduler()
+        scheduler.start()
 
     yield
 
     # Shutdown
     logger.info("Shutting down Transaction API")
+    if scheduler:
+        await scheduler.stop()
+    await logger.complete()
 
 
 app = FastAPI(
@@ -43,9 +61,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        content, media_type = render_metrics()
+        return Response(content=content, media_type=media_type)
+
+if settings.PROFILING_ENABLED:
+    instrument_engine(engine)
+    app.add_middleware(ProfilingMiddleware)
+
 # Include API router
 app.include_router(transactions_router, prefix=settings.API_V1_STR)
 app.include_router(category_rules_router, prefix=settings.API_V1_STR)
+app.include_router(events_router, prefix=settings.API_V1_STR)
+app.include_router(analytics_router, prefix=settings.API_V1_STR)
+app.include_router(insights_router, prefix=settings.API_V1_STR)
+app.include_router(budgets_router, prefix=settings.API_V1_STR)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, DateTime, String
+
+from app.db.base_class import Base
+
+
+class AnalysisRunModel(Base):
+    """When a full pass of one of a tenant's analyses (recurring payments, anomaly baselines) last completed."""
+    __tablename__ = "analysis_runs"
+
+    tenant_id = Column(String(64), primary_key=True)
+    name = Column(String(32), primary_key=True)  # recurring or baselines
+    completed_at = Column(DateTime, nullable=False)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, DateTime, Integer, String, UniqueConstraint
+
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.base_class import Base
+
+
+class BackfillWindowModel(Base):
+    """Checkpoint for one date window of a historical backfill run."""
+    __tablename__ = "backfill_windows"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT)
+    start_date = Column(DateTime, nullable=False)
+    end_date = Column(DateTime, nullable=False)
+    status = Column(String(16), nullable=False, default="pending")  # pending, done, failed
+    message_count = Column(Integer, nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "start_date", "end_date", name="uq_backfill_window"),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, Integer, Numeric, String, UniqueConstraint
+
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.base_class import Base
+
+
+class BudgetModel(Base):
+    """A monthly spending limit for a primary category or a card."""
+    __tablename__ = "budgets"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT)
+    scope = Column(String(16), nullable=False)  # category or card
+    target = Column(String, nullable=False)  # Primary category or card type
+    amount = Column(Numeric(12, 2), nullable=False)  # Monthly limit, in JMD
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "scope", "target", name="uq_budget_target"),
+    )
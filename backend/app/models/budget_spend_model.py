@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Float, Integer, Numeric, String, UniqueConstraint
+
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.base_class import Base
+
+
+class BudgetSpendModel(Base):
+    """
+    Running spend of a budgeted category or card in one month, adjusted as transactions are
+    created, excluded or recategorised so budget status never re-sums the month.
+    """
+    __tablename__ = "budget_spend"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT)
+    scope = Column(String(16), nullable=False)  # category or card
+    target = Column(String, nullable=False)
+    month = Column(String(7), nullable=False)  # YYYY-MM
+    spent = Column(Numeric(14, 2), nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+    alerted = Column(Float, nullable=False, default=0.0)  # Highest alert threshold already announced
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "scope", "target", "month", name="uq_budget_spend_month"),
+    )
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String
+
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.base_class import Base
+
+
+class EmailArchiveModel(Base):
+    """Location of a raw alert email inside the compressed archive segments."""
+    __tablename__ = "email_archive"
+
+    # Gmail message IDs are only unique within a mailbox
+    tenant_id = Column(String(64), primary_key=True, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT)
+    message_id = Column(String, primary_key=True)
+    date = Column(DateTime, nullable=False)
+    segment = Column(Integer, nullable=False)
+    offset = Column(Integer, nullable=False)
+    length = Column(Integer, nullable=False)
+    codec = Column(String(8), nullable=False)  # zstd or gzip
+
+    __table_args__ = (
+        Index("ix_email_archive_tenant_date", "tenant_id", "date"),
+    )
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Date, Numeric, String
+
+from app.db.base_class import Base
+
+
+class FxRateModel(Base):
+    """Exchange rate on a date: one unit of ``base`` costs ``rate`` units of ``quote``. Shared by all tenants."""
+    __tablename__ = "fx_rates"
+
+    # Primary key order serves "latest rate on or before a date" lookups for a currency pair
+    base = Column(String(3), primary_key=True)
+    quote = Column(String(3), primary_key=True)
+    date = Column(Date, primary_key=True)
+    rate = Column(Numeric(18, 8), nullable=False)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Date, DateTime, Float, Integer, Numeric, String, UniqueConstraint
+
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.base_class import Base
+
+
+class RecurringPaymentModel(Base):
+    """A merchant charged at a regular interval for a stable amount, as found by the recurring payment detector."""
+    __tablename__ = "recurring_payments"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT)
+    merchant = Column(String, nullable=False)
+    cadence = Column(String(16), nullable=False)  # weekly, biweekly, monthly, quarterly, yearly
+    period_days = Column(Float, nullable=False)  # Median days between charges
+    typical_amount = Column(Numeric(10, 2), nullable=False)  # Median charge, in JMD
+    amount_variation = Column(Float, nullable=False)  # Coefficient of variation of the original-currency amounts
+    regularity = Column(Float, nullable=False)  # Share of intervals close to the median interval
+    occurrences = Column(Integer, nullable=False)
+    first_date = Column(Date, nullable=False)
+    last_date = Column(Date, nullable=False)
+    next_expected_date = Column(Date, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "merchant", name="uq_recurring_payment_merchant"),
+    )
@@ -11,6 +11,7 @@ class EmailMessage(BaseModel):
     sender: str
     date: datetime
     body: str
+    message_id: Optional[str] = None
 
 
 class MerchantCategory(BaseModel):
@@ -40,6 +41,9 @@ class Transaction(BaseModel):
     # Card information
     card_type: Optional[str] = None
 
+    # Source alert email, absent for manual transactions
+    gmail_message_id: Optional[str] = None
+
     class Config:
         json_encoders = {
             Decimal: lambda v: float(v)
@@ -68,17 +72,144 @@ class TransactionSummary(BaseModel):
         }
 
 
+class CategoryDelta(BaseModel):
+    total: Decimal
+    count: int
+
+    class Config:
+        json_encoders = {
+            Decimal: lambda v: float(v)
+        }
+
+
+class SummaryDelta(BaseModel):
+    """Change to the spending summary caused by new, excluded or re-included transactions"""
+    total_spending: Decimal
+    transaction_count: int
+    by_primary_category: Dict[str, CategoryDelta]
+    by_subcategory: Dict[str, CategoryDelta]
+    by_card_type: Dict[str, CategoryDelta]
+
+    class Config:
+        json_encoders = {
+            Decimal: lambda v: float(v)
+        }
+
+
 class DateRange(BaseModel):
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
 
 
+class TrendPoint(BaseModel):
+    period: date  # First day of the day, ISO week or month
+    group: Optional[str] = None
+    total: Decimal
+    count: int
+
+    class Config:
+        json_encoders = {
+            Decimal: lambda v: float(v)
+        }
+
+
+class SpendingTrend(BaseModel):
+    interval: str
+    group_by: Optional[str] = None
+    points: List[TrendPoint]
+
+
+class RecurringPayment(BaseModel):
+    merchant: str
+    cadence: str
+    period_days: float
+    typical_amount: Decimal
+    amount_variation: float
+    regularity: float
+    occurrences: int
+    first_date: date
+    last_date: date
+    next_expected_date: date
+    active: bool
+
+    class Config:
+        json_encoders = {
+            Decimal: lambda v: float(v)
+        }
+
+
+class RecurringPaymentList(BaseModel):
+    payments: List[RecurringPayment]
+    monthly_total: Decimal  # Typical monthly cost of the active payments
+
+    class Config:
+        json_encoders = {
+            Decimal: lambda v: float(v)
+        }
+
+
+class SpendingAnomaly(BaseModel):
+    kind: str  # merchant (one unusual charge) or category (an unusual week)
+    subject: str  # Merchant or primary category
+    transaction_id: Optional[str] = None
+    period_start: date
+    amount: Decimal
+    baseline: Decimal  # Median charge or median weekly total
+    ratio: float  # amount / baseline
+    score: float
+    detected_at: datetime
+
+    class Config:
+        json_encoders = {
+            Decimal: lambda v: float(v)
+        }
+
+
+class SpendingAnomalyList(BaseModel):
+    anomalies: List[SpendingAnomaly]
+
+
+class BudgetRequest(BaseModel):
+    scope: str = Field(pattern="^(category|card)$")
+    target: str = Field(min_length=1, max_length=255)  # Primary category or card type
+    amount: Decimal = Field(decimal_places=2, gt=0)  # Monthly limit
+
+
+class BudgetStatus(BaseModel):
+    id: int
+    scope: str
+    target: str
+    amount: Decimal
+    month: str  # YYYY-MM
+    spent: Decimal
+    remaining: Decimal
+    used: float  # spent / amount
+    count: int
+
+    class Config:
+        json_encoders = {
+            Decimal: lambda v: float(v)
+        }
+
+
+class BudgetStatusList(BaseModel):
+    month: str
+    budgets: List[BudgetStatus]
+
+
 class TransactionList(BaseModel):
     transaction_summary: TransactionSummary
     transactions: List[Transaction]
     categories: Dict[str, List[str]]
 
 
+class TransactionSearchResult(BaseModel):
+    transactions: List[Transaction]
+    total: int
+    limit: int
+    offset: int
+
+
 class ClassificationRule(BaseModel):
     merchant: str
     category: str
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Date, DateTime, Float, Index, Integer, Numeric, String, UniqueConstraint
+
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.base_class import Base
+
+
+class SpendingAnomalyModel(Base):
+    """A charge far above its merchant's usual amount, or a week of unusually high spending in a category."""
+    __tablename__ = "spending_anomalies"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT)
+    kind = Column(String(16), nullable=False)  # merchant or category
+    key = Column(String, nullable=False)  # Transaction ID for merchant anomalies, "<category>/<week start>" for category spikes
+    subject = Column(String, nullable=False)  # Merchant name or primary category
+    transaction_id = Column(String(36), nullable=True)
+    period_start = Column(Date, nullable=False)  # Transaction date, or the Monday of the spiking week
+    amount = Column(Numeric(12, 2), nullable=False)  # Charge or weekly total, in JMD
+    baseline = Column(Numeric(12, 2), nullable=False)  # Median charge or median weekly total
+    score = Column(Float, nullable=False)  # Robust z-score: deviations from the median in MAD-based standard deviations
+    detected_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "kind", "key", name="uq_spending_anomaly_key"),
+        Index("ix_spending_anomalies_tenant_period", "tenant_id", "period_start"),
+    )
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, Float, Integer, String, UniqueConstraint
+
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.base_class import Base
+
+
+class SpendingBaselineModel(Base):
+    """Robust statistics of a merchant's charges or a category's weekly spending, used to score new transactions."""
+    __tablename__ = "spending_baselines"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT)
+    kind = Column(String(16), nullable=False)  # merchant (per charge) or category (per week)
+    subject = Column(String, nullable=False)  # Merchant name or primary category
+    median = Column(Float, nullable=False)
+    mad = Column(Float, nullable=False)  # Median absolute deviation from the median
+    count = Column(Integer, nullable=False)  # Charges, or weeks with spending, in the window
+    computed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "kind", "subject", name="uq_spending_baseline_subject"),
+    )
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String
+
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.base_class import Base
+
+
+class SyncCoverageModel(Base):
+    """A date interval whose alert emails have been ingested; rows are kept merged and disjoint."""
+    __tablename__ = "sync_coverage"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT)
+    start_date = Column(DateTime, nullable=False)
+    end_date = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Overlap lookups seek on the tenant and end_date >= start, and filter start_date <= end from the index
+        Index("ix_sync_coverage_interval", "tenant_id", "end_date", "start_date"),
+    )
@@ -1,12 +1,17 @@
 from sqlalchemy import Column, String, DateTime
 
+from app.core.tenancy import DEFAULT_TENANT
 from app.db.base_class import Base  # Import existing Base instead of creating a new one
 
 
 class SyncInfoModel(Base):
     __tablename__ = "sync_info"
 
-    id = Column(String, primary_key=True, default="last_sync")
+    tenant_id = Column(String(64), primary_key=True, default=DEFAULT_TENANT)  # One row per tenant
     last_sync_date = Column(DateTime, nullable=False)
     start_date = Column(DateTime, nullable=True)
     end_date = Column(DateTime, nullable=True)
+
+    # Gmail mailbox history position for incremental syncs
+    history_id = Column(String, nullable=True)
+    history_date = Column(DateTime, nullable=True)  # When history_id was captured
@@ -1,7 +1,9 @@
 import uuid
 
-from sqlalchemy import Column, String, DateTime, Numeric, Float, Boolean, Date
+from sqlalchemy import Column, String, DateTime, Numeric, Float, Boolean, Date, Index, Integer, text
 
+from app.core.tenancy import DEFAULT_TENANT
+from app.db import sequence  # noqa: F401  (row_sequences and the trigger that fills seq)
 from app.db.base_class import Base
 
 
@@ -9,11 +11,13 @@ class TransactionModel(Base):
     __tablename__ = "transactions"
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    date = Column(DateTime, index=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT)
+    gmail_message_id = Column(String)  # Alert email the transaction was parsed from; empty for manual entries
+    date = Column(DateTime)
     amount = Column(Numeric(10, 2), nullable=False)
-    merchant = Column(String, index=True)
-    primary_category = Column(String, index=True)
-    subcategory = Column(String, index=True)
+    merchant = Column(String)
+    primary_category = Column(String)
+    subcategory = Column(String)
     confidence = Column(Float)
     description = Column(String)
     excluded = Column(Boolean, default=False, nullable=False)
@@ -26,3 +30,26 @@ class TransactionModel(Base):
     
     # Card information
     card_type = Column(String(50))  # Card type used for transaction
+
+    seq = Column(Integer)  # Insertion order, set by a trigger (see app.db.sequence); the snapshot watermark
+
+    __table_args__ = (
+        # Every query is scoped to one tenant, so indexes lead with tenant_id. Changes here need a
+        # migration in app/db/migrations.
+        # Listing pages, read backwards for newest first; id breaks ties so pages don't overlap
+        Index("ix_transactions_tenant_date_id", "tenant_id", "date", "id"),
+        Index("ix_transactions_tenant_merchant", "tenant_id", "merchant"),
+        # Category filters and budget sums within a month
+        Index("ix_transactions_tenant_category_date", "tenant_id", "primary_category", "subcategory", "date"),
+        # Covers the range aggregates, which all leave out excluded transactions. excluded is
+        # repeated as a column because SQLite only treats a partial index as covering if it is.
+        Index(
+            "ix_transactions_tenant_included", "tenant_id", "date", "primary_category", "subcategory", "card_type",
+            "merchant", "amount", "excluded",
+            sqlite_where=text("excluded = 0"), postgresql_where=text("excluded = false")
+        ),
+        # Incremental snapshot exports
+        Index("ix_transactions_tenant_seq", "tenant_id", "seq"),
+        # Idempotency key for ingest: an alert email yields at most one transaction
+        Index("ux_transactions_tenant_message", "tenant_id", "gmail_message_id", unique=True),
+    )
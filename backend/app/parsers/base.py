@@ -0,0 +1,90 @@
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple, Optional, Pattern, Tuple
+
+from app.models.schemas import EmailMessage
+
+
+class ParsedAlert(NamedTuple):
+    """Fields extracted from a bank alert; a tuple keeps construction cheap on the ingest path."""
+    bank: str
+    currency: str
+    amount: Decimal
+    merchant: str
+    card_type: Optional[str] = None
+
+
+class AlertTemplate:
+    """
+    Base class for a bank's transaction alert format.
+
+    Subclasses provide precompiled patterns for the amount (with ``currency`` and
+    ``amount`` named groups) and the merchant (first group), plus the card type
+    names to look for in priority order. Each pattern starts with a literal so the
+    regex engine can skip straight to candidate positions.
+
+    ``required_phrase`` and ``requires_card_type`` are checked by ``parse`` as well as
+    put into the Gmail query, so incremental (history) syncs, which only see the
+    sender and subject before fetching, accept the same emails as windowed syncs.
+    """
+
+    bank: str = ""
+    senders: Tuple[str, ...] = ()
+    subject_pattern: Optional[Pattern] = None
+    card_types: Tuple[str, ...] = ()
+    required_phrase: Optional[str] = None  # e.g. only approved transactions
+    requires_card_type: bool = False
+    amount_pattern: Pattern
+    merchant_pattern: Pattern
+
+    @property
+    def gmail_query(self) -> str:
+        """Gmail search fragment selecting this bank's alert emails."""
+        query = " OR ".join(f"from:{sender}" for sender in self.senders)
+        if len(self.senders) > 1:
+            query = f"({query})"
+        if self.required_phrase:
+            query += f' "{self.required_phrase}"'
+        if self.requires_card_type and self.card_types:
+            query += " (" + " OR ".join(f'"{card_type}"' for card_type in self.card_types) + ")"
+        return query
+
+    def matches_subject(self, subject: str) -> bool:
+        return self.subject_pattern is None or self.subject_pattern.search(subject) is not None
+
+    def parse(self, email: EmailMessage) -> Optional[ParsedAlert]:
+        """Extract the alert fields, or return None if the email is incomplete or not an accepted alert."""
+        body = email.body
+        if self.required_phrase and self.required_phrase not in body:
+            return None
+
+        amount_match = self.amount_pattern.search(body)
+        if not amount_match:
+            return None
+
+        merchant_match = self.merchant_pattern.search(body)
+        merchant = merchant_match.group(1).strip() if merchant_match else ""
+        if not merchant:
+            return None
+
+        try:
+            amount = Decimal(amount_match.group("amount").replace(",", ""))
+        except InvalidOperation:
+            return None
+        if not amount:
+            return None
+
+        card_type = None
+        for name in self.card_types:
+            if name in body:
+                card_type = name
+                break
+        if self.requires_card_type and card_type is None:
+            return None
+
+        return ParsedAlert(
+            bank=self.bank,
+            currency=amount_match.group("currency"),
+            amount=amount,
+            merchant=merchant,
+            card_type=card_type
+        )
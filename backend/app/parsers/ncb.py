@@ -0,0 +1,20 @@
+import re
+
+from app.config import get_settings
+from app.parsers.base import AlertTemplate
+
+
+class NCBAlertTemplate(AlertTemplate):
+    """NCB (National Commercial Bank Jamaica) card transaction alerts."""
+
+    bank = "NCB"
+    senders = ("no-reply-ncbcardalerts@jncb.com",)
+    amount_pattern = re.compile(r"(?P<currency>USD|JMD|CAD|GBP|EUR)\s+(?P<amount>[\d,\.]+)")
+    merchant_pattern = re.compile(r"Merchant</div></td>\s*<td[^>]*><div[^>]*>([^<]+)</div>")
+    required_phrase = "Transaction Approved"
+    requires_card_type = True
+
+    def __init__(self):
+        settings = get_settings()
+        # Mastercard is checked first, matching the original detection order
+        self.card_types = (settings.MASTERCARD_TYPE, settings.VISA_TYPE)
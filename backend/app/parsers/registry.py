@@ -0,0 +1,58 @@
+from email.utils import parseaddr
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from app.models.schemas import EmailMessage
+from app.parsers.base import AlertTemplate, ParsedAlert
+from app.parsers.ncb import NCBAlertTemplate
+
+
+class TemplateRegistry:
+    """Registry of bank alert templates, dispatched by sender address and subject."""
+
+    def __init__(self):
+        self._templates: List[AlertTemplate] = []
+        self._by_sender: Dict[str, List[AlertTemplate]] = {}
+        # Alerts come from a handful of From headers, so parsed addresses are memoised
+        self._addresses: Dict[str, str] = {}
+
+    def register(self, template: AlertTemplate) -> None:
+        self._templates.append(template)
+        for sender in template.senders:
+            self._by_sender.setdefault(sender.lower(), []).append(template)
+
+    @property
+    def templates(self) -> List[AlertTemplate]:
+        return self._templates.copy()
+
+    def find_template(self, sender: str, subject: str) -> Optional[AlertTemplate]:
+        """Select the template for an email; a dict lookup keeps this O(1) in the number of banks."""
+        address = self._addresses.get(sender)
+        if address is None:
+            address = parseaddr(sender)[1].lower()
+            if len(self._addresses) < 1024:
+                self._addresses[sender] = address
+        for template in self._by_sender.get(address, ()):
+            if template.matches_subject(subject):
+                return template
+        return None
+
+    def parse(self, email: EmailMessage) -> Optional[ParsedAlert]:
+        template = self.find_template(email.sender, email.subject)
+        if template is None:
+            return None
+        return template.parse(email)
+
+    def gmail_query(self) -> str:
+        """Gmail search expression matching the alerts of every registered bank."""
+        queries = [template.gmail_query for template in self._templates]
+        if len(queries) == 1:
+            return queries[0]
+        return "(" + " OR ".join(f"({query})" for query in queries) + ")"
+
+
+@lru_cache()
+def get_template_registry() -> TemplateRegistry:
+    registry = TemplateRegistry()
+    registry.register(NCBAlertTemplate())
+    return registry
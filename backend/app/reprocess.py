@@ -0,0 +1,89 @@
+"""
+Re-parse (and optionally re-classify) transactions from the local email archive.
+
+    python -m app.reprocess [--start 2024-01-01] [--end 2024-12-31] [--reclassify] [--tenant default]
+
+Emails are read from the compressed archive written during syncs, so changes to the alert
+parsers can be applied to history without fetching anything from Gmail. With
+``--reclassify`` every merchant is classified again by OpenAI (special rules still apply)
+instead of keeping stored categories.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.core.tenancy import DEFAULT_TENANT, classifier_model_path, rules_file_path, validate_tenant_id
+from app.db.database import SessionLocal
+from app.migrate import migrate
+from app.models.schemas import DateRange
+from app.services.archive_service import EmailArchive
+from app.services.classifier_service import MerchantClassifier
+from app.services.gmail_service import GmailService
+from app.services.transaction_service import TransactionService
+
+BATCH_SIZE = 500
+
+
+async def run_reprocess(date_range: Optional[DateRange], reclassify: bool, tenant_id: str = DEFAULT_TENANT) -> dict:
+    migrate()
+    db = SessionLocal()
+    archive = EmailArchive(tenant_id)
+    # Reclassifying asks OpenAI again rather than the local model, which has learned the stored labels
+    classifier = MerchantClassifier(
+        rules_file_path=rules_file_path(tenant_id), model_path=None if reclassify else classifier_model_path(tenant_id)
+    )
+
+    # The Gmail client is never initialised; everything is read from the archive
+    service = TransactionService(gmail_service=GmailService(), classifier=classifier, db=db, tenant_id=tenant_id)
+    totals = {"emails": 0, "updated": 0, "created": 0}
+    started = time.perf_counter()
+
+    async def flush(batch):
+        updated, created = await service.reprocess_emails(batch, reclassify=reclassify)
+        totals["emails"] += len(batch)
+        totals["updated"] += updated
+        totals["created"] += created
+
+    try:
+        batch = []
+        for email in archive.iter_emails(db, date_range):
+            batch.append(email)
+            if len(batch) >= BATCH_SIZE:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+    finally:
+        archive.close()
+        db.close()
+
+    totals["seconds"] = time.perf_counter() - started
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Only emails on or after this date")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Only emails on or before this date")
+    parser.add_argument("--reclassify", action="store_true", help="Classify every merchant again")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Tenant whose archive is reprocessed")
+    args = parser.parse_args()
+    try:
+        validate_tenant_id(args.tenant)
+    except ValueError as e:
+        parser.error(str(e))
+
+    date_range = DateRange(start_date=args.start, end_date=args.end) if args.start or args.end else None
+    totals = asyncio.run(run_reprocess(date_range, args.reclassify, args.tenant))
+
+    seconds = totals["seconds"] or 1e-9
+    print(f"Emails:  {totals['emails']} ({totals['emails'] / seconds:.1f}/s)")
+    print(f"Updated: {totals['updated']}")
+    print(f"Created: {totals['created']}")
+    print(f"Elapsed: {seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.core.logger import logger
+from app.core.tenancy import DEFAULT_TENANT, snapshot_dir
+from app.db.crud import TransactionCrud, to_naive
+from app.db import database
+from app.models.schemas import CategorySummary, DateRange, SpendingTrend, TransactionSummary, TrendPoint
+from app.services.fx_service import FxService
+
+try:
+    import duckdb
+except ImportError:  # Optional dependency, range analytics then run on the transactional database
+    duckdb = None
+
+settings = get_settings()
+
+TREND_INTERVALS = ("day", "week", "month")
+TREND_GROUPS = ("primary_category", "subcategory", "card_type")
+
+_connection = None
+_connection_failed = False
+_connection_lock = threading.Lock()
+
+
+def _duckdb_cursor():
+    """
+    Cursor on the process-wide DuckDB connection, or None when DuckDB can't be used. Cursors are
+    independent connections to the same database, so each request thread gets its own.
+    """
+    global _connection, _connection_failed
+    with _connection_lock:
+        if _connection is None and not _connection_failed:
+            try:
+                connection = duckdb.connect()
+                if settings.ANALYTICS_DUCKDB_SOURCE == "sqlite":
+                    # INSTALL is a no-op once the extension is present; otherwise it is downloaded once
+                    connection.execute("INSTALL sqlite")
+                    connection.execute("LOAD sqlite")
+                    path = database.engine.url.database.replace("'", "''")
+                    connection.execute(f"ATTACH '{path}' AS oltp (TYPE sqlite, READ_ONLY)")
+                _connection = connection
+            except duckdb.Error as e:
+                _connection_failed = True
+                logger.warning(f"DuckDB analytics unavailable, using the transactional database: {str(e)}")
+        return _connection.cursor() if _connection is not None else None
+
+
+class AnalyticsService:
+    """
+    Spending summaries and trends over arbitrary date ranges.
+
+    Long ranges are aggregated by an embedded DuckDB, either reading the live SQLite file
+    through DuckDB's sqlite extension or the Parquet snapshots written by ``app.snapshot``
+    (which only reflect the last snapshot). Short ranges, and every range when DuckDB isn't
+    installed, use GROUP BY queries on the transactional database. Totals in another reporting
+    currency are converted on the transactional database, joining each transaction to its rate
+    in ``fx_rates``. Apart from filling missing rates, nothing here writes.
+    """
+
+    def __init__(self, db: Session, tenant_id: str = DEFAULT_TENANT):
+        self.db = db
+        self.tenant_id = tenant_id
+
+    async def prepare_currency(self, date_range: DateRange, currency: Optional[str]):
+        """Make sure rates across the range are stored before totals are converted to ``currency``"""
+        if currency and currency != settings.HOME_CURRENCY:
+            await FxService(self.db).ensure_range(date_range.start_date.date(), date_range.end_date.date())
+
+    def get_summary(self, date_range: DateRange, currency: Optional[str] = None) -> Tuple[TransactionSummary, str]:
+        """Summary of every transaction in the range, in ``currency`` if given, and the engine that computed it"""
+        cursor, source = self._duckdb_source(date_range, currency)
+        if cursor is None:
+            rows = TransactionCrud.get_spending_breakdown(self.db, self.tenant_id, date_range, currency)
+            return self._to_summary(rows), "sql"
+
+        where, params = self._where(date_range)
+        rows = cursor.execute(f"""
+            SELECT primary_category, subcategory, card_type, merchant,
+                   CAST(sum(amount) AS DECIMAL(18, 2)) AS total, count(*) AS count
+            FROM {source}
+            WHERE {where}
+            GROUP BY ALL
+        """, params).fetchall()
+        return self._to_summary(rows), "duckdb"
+
+    def get_trend(
+            self,
+            date_range: DateRange,
+            interval: str = "month",
+            group_by: Optional[str] = None,
+            currency: Optional[str] = None
+    ) -> Tuple[SpendingTrend, str]:
+        """Spending per day, week or month, optionally split by category or card, and the engine used"""
+        # Both end up in the DuckDB query text, so only the values the router's patterns allow are accepted
+        if interval not in TREND_INTERVALS or group_by not in (None, *TREND_GROUPS):
+            raise ValueError(f"Unsupported trend interval '{interval}' or grouping '{group_by}'")
+        cursor, source = self._duckdb_source(date_range, currency)
+        if cursor is None:
+            rows = TransactionCrud.get_spending_trend(
+                self.db, self.tenant_id, date_range, interval, group_by, currency
+            )
+            engine = "sql"
+        else:
+            where, params = self._where(date_range)
+            group = group_by or "NULL"
+            rows = cursor.execute(f"""
+                SELECT date_trunc('{interval}', date) AS period, {group} AS "group",
+                       CAST(sum(amount) AS DECIMAL(18, 2)) AS total, count(*) AS count
+                FROM {source}
+                WHERE {where}
+                GROUP BY ALL
+                ORDER BY period
+            """, params).fetchall()
+            engine = "duckdb"
+
+        points = [
+            TrendPoint(period=self._to_date(period), group=group, total=Decimal(str(total)), count=count)
+            for period, group, total, count in rows
+        ]
+        return SpendingTrend(interval=interval, group_by=group_by, points=points), engine
+
+    def _duckdb_source(self, date_range: DateRange, currency: Optional[str] = None):
+        """DuckDB cursor and the relation holding this tenant's transactions, or (None, None)"""
+        if not settings.ANALYTICS_DUCKDB_ENABLED or duckdb is None:
+            return None, None
+        if currency and currency != settings.HOME_CURRENCY:
+            # Snapshots carry no rates; conversions run where fx_rates lives
+            return None, None
+        if (date_range.end_date - date_range.start_date).days < settings.ANALYTICS_DUCKDB_MIN_DAYS:
+            return None, None
+
+        if settings.ANALYTICS_DUCKDB_SOURCE == "snapshot":
+            files = Path(snapshot_dir(self.tenant_id)) / "transactions"
+            if not any(files.glob("year=*/month=*/*.parquet")):
+                return None, None
+            pattern = str(files / "**" / "*.parquet").replace("'", "''")
+            source = f"read_parquet('{pattern}', hive_partitioning = true)"
+        else:
+            source = "oltp.transactions"
+
+        cursor = _duckdb_cursor()
+        return (cursor, source) if cursor is not None else (None, None)
+
+    def _where(self, date_range: DateRange) -> Tuple[str, list]:
+        conditions = ["CAST(excluded AS INTEGER) = 0", "date >= ?", "date <= ?"]
+        params = [to_naive(date_range.start_date), to_naive(date_range.end_date)]
+        if settings.ANALYTICS_DUCKDB_SOURCE != "snapshot":
+            # Snapshots are written per tenant; the shared database is filtered
+            conditions.append("tenant_id = ?")
+            params.append(self.tenant_id)
+        return " AND ".join(conditions), params
+
+    @staticmethod
+    def _to_date(period) -> date:
+        if isinstance(period, datetime):
+            return period.date()
+        if isinstance(period, date):
+            return period
+        return date.fromisoformat(str(period)[:10])
+
+    @staticmethod
+    def _to_summary(rows: List[tuple]) -> TransactionSummary:
+        """Fold (category, subcategory, card, merchant, total, count) groups into a TransactionSummary"""
+        totals = defaultdict(lambda: [Decimal("0"), 0, set()])
+
+        def add(key, total, count, merchant):
+            bucket = totals[key]
+            bucket[0] += total
+            bucket[1] += count
+            if merchant:
+                bucket[2].add(merchant)
+
+        for primary_category, subcategory, card_type, merchant, total, count in rows:
+            total = Decimal(str(total))
+            add(("all", None), total, count, merchant)
+            add(("primary", primary_category), total, count, merchant)
+            add(("sub", f"{primary_category} - {subcategory}"), total, count, merchant)
+            if card_type:
+                add(("card", card_type), total, count, merchant)
+
+        def category_summaries(kind: str) -> dict:
+            return {
+                key: CategorySummary(total=total, count=count, average=total / count, merchants=sorted(merchants))
+                for (bucket_kind, key), (total, count, merchants) in totals.items() if bucket_kind == kind
+            }
+
+        total, count, merchants = totals[("all", None)] if rows else (Decimal("0"), 0, set())
+        return TransactionSummary(
+            total_spending=total,
+            transaction_count=count,
+            average_transaction=total / count if count else Decimal("0"),
+            by_primary_category=category_summaries("primary"),
+            by_subcategory=category_summaries("sub"),
+            by_card_type=category_summaries("card"),
+            merchants=sorted(merchants)
+        )
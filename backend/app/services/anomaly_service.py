@@ -0,0 +1,279 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.core.logger import logger
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.crud import AnalysisRunCrud, AnomalyCrud, TransactionCrud
+from app.models.schemas import DateRange, SpendingAnomaly, SpendingAnomalyList, Transaction
+from app.models.spending_anomaly_model import SpendingAnomalyModel
+from app.models.spending_baseline_model import SpendingBaselineModel
+from app.services.recurring_service import group_medians
+
+settings = get_settings()
+
+ANOMALY_KINDS = ("merchant", "category")
+MAD_TO_SIGMA = 0.6745  # A normal distribution's MAD is 0.6745 standard deviations
+MIN_MAD_SHARE = 0.05  # Fixed-price merchants have a MAD of zero; their spread is floored at 5% of the median
+MIN_MERCHANT_CHARGES = 5
+MIN_CATEGORY_WEEKS = 8  # Weeks with spending in the window
+MIN_SPIKE_RATIO = 2.0  # A flagged category week is also at least double the median week
+
+EPOCH = datetime(1970, 1, 1)
+
+BASELINES_RUN = "baselines"  # AnalysisRunCrud name of a baseline rebuild
+
+
+def robust_scores(values: np.ndarray, medians: np.ndarray, mads: np.ndarray) -> np.ndarray:
+    """How many (MAD-estimated) standard deviations each value is above its median, 0 where undefined"""
+    scale = np.maximum(mads, MIN_MAD_SHARE * np.abs(medians))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(scale > 0, MAD_TO_SIGMA * (values - medians) / scale, 0.0)
+
+
+def _weeks(days: np.ndarray) -> np.ndarray:
+    """Week numbers of fractional day numbers (1970-01-01 was a Thursday); weeks start on Monday"""
+    return np.floor((days + 3) / 7).astype(np.int64)
+
+
+def _week_number(moment: datetime) -> int:
+    return int(_weeks(np.array([(moment - EPOCH).total_seconds() / 86400]))[0])
+
+
+def _week_start(week: int) -> date:
+    return (EPOCH + timedelta(days=int(week) * 7 - 3)).date()
+
+
+def _codes(values) -> tuple:
+    """Integer codes for values in order of first appearance, and the distinct values"""
+    names = {}
+    codes = np.fromiter((names.setdefault(value, len(names)) for value in values), dtype=np.int64, count=len(values))
+    return codes, list(names)
+
+
+class AnomalyService:
+    """
+    Flags charges far above their merchant's usual amount and weeks of unusually high spending
+    in a category.
+
+    Baselines (median and median absolute deviation of each merchant's charges and of each
+    category's weekly totals over ``ANOMALY_WINDOW_DAYS``) are computed in one vectorized pass
+    over a columnar extract and stored. Each sync then scores only its new transactions against
+    the stored baselines, so it costs O(new rows); the first sync after
+    ``ANOMALY_BASELINE_MAX_AGE_HOURS`` rebuilds them. Median and MAD rather than mean and
+    standard deviation, so one large charge doesn't hide the next.
+    """
+
+    def __init__(self, db: Session, tenant_id: str = DEFAULT_TENANT):
+        self.db = db
+        self.tenant_id = tenant_id
+
+    def rebuild(self, rescore: bool = False) -> int:
+        """
+        Recompute every baseline. With ``rescore`` every transaction and complete week in the window is
+        also scored, as on first use. Returns the number of anomalies found.
+        """
+        now = datetime.now()
+        since = now - timedelta(days=settings.ANOMALY_WINDOW_DAYS)
+        rows = TransactionCrud.get_spending_series(self.db, self.tenant_id, since)
+        ids, merchants, categories, days, amounts = (list(column) for column in zip(*rows)) if rows else ([],) * 5
+        merchant_codes, merchant_names = _codes(merchants)
+        category_codes, category_names = _codes(categories)
+        days, amounts = np.array(days, dtype=float), np.array(amounts, dtype=float)
+
+        # Merchants: individual charges
+        merchant_counts = np.bincount(merchant_codes, minlength=len(merchant_names))
+        merchant_medians = group_medians(merchant_codes, amounts, merchant_counts)
+        merchant_mads = group_medians(
+            merchant_codes, np.abs(amounts - merchant_medians[merchant_codes]), merchant_counts
+        )
+
+        # Categories: totals of each complete week in the window, weeks without spending counting as zero
+        weeks = _weeks(days)
+        first_week = _week_number(since) + 1
+        current_week = _week_number(now)
+        week_count = max(current_week - first_week, 0)
+        complete = (weeks >= first_week) & (weeks < current_week)
+        week_totals = np.bincount(
+            category_codes[complete] * week_count + weeks[complete] - first_week,
+            weights=amounts[complete], minlength=len(category_names) * week_count
+        ).reshape(len(category_names), week_count)
+        if week_count:
+            category_medians = np.median(week_totals, axis=1)
+            category_mads = np.median(np.abs(week_totals - category_medians[:, None]), axis=1)
+        else:
+            category_medians = category_mads = np.zeros(len(category_names))
+        category_counts = np.count_nonzero(week_totals, axis=1)
+
+        baselines = [
+            SpendingBaselineModel(
+                tenant_id=self.tenant_id, kind=kind, subject=subject, median=float(median), mad=float(mad),
+                count=int(count), computed_at=now
+            )
+            for kind, subjects, medians, mads, counts in (
+                ("merchant", merchant_names, merchant_medians, merchant_mads, merchant_counts),
+                ("category", category_names, category_medians, category_mads, category_counts),
+            )
+            for subject, median, mad, count in zip(subjects, medians, mads, counts)
+        ]
+        AnomalyCrud.replace_baselines(self.db, self.tenant_id, baselines)
+        logger.debug(f"Rebuilt {len(baselines)} spending baselines from {len(rows)} transactions for tenant {self.tenant_id}")
+        if not rescore:
+            # Marked even without baselines (too little history), so the next sync doesn't rebuild again
+            AnalysisRunCrud.mark_completed(self.db, self.tenant_id, BASELINES_RUN, now)
+            return 0
+
+        anomalies = []
+        scores = robust_scores(amounts, merchant_medians[merchant_codes], merchant_mads[merchant_codes])
+        flagged = (scores >= settings.ANOMALY_SCORE_THRESHOLD) & (merchant_counts[merchant_codes] >= MIN_MERCHANT_CHARGES)
+        for index in np.flatnonzero(flagged):
+            code = merchant_codes[index]
+            anomalies.append(self._merchant_anomaly(
+                ids[index], merchant_names[code], (EPOCH + timedelta(days=float(days[index]))).date(),
+                amounts[index], merchant_medians[code], scores[index], now
+            ))
+
+        scores = robust_scores(week_totals, category_medians[:, None], category_mads[:, None])
+        flagged = (
+            (scores >= settings.ANOMALY_SCORE_THRESHOLD)
+            & (week_totals >= MIN_SPIKE_RATIO * category_medians[:, None])
+            & (category_medians[:, None] > 0)
+            & (category_counts[:, None] >= MIN_CATEGORY_WEEKS)
+        )
+        for code, week in zip(*np.nonzero(flagged)):
+            anomalies.append(self._category_anomaly(
+                category_names[code], _week_start(first_week + week), week_totals[code, week],
+                category_medians[code], scores[code, week], now
+            ))
+
+        AnomalyCrud.save_anomalies(self.db, self.tenant_id, anomalies)
+        AnalysisRunCrud.mark_completed(self.db, self.tenant_id, BASELINES_RUN, now)
+        return len(anomalies)
+
+    def score(self, transactions: List[Transaction]) -> List[SpendingAnomaly]:
+        """Score newly stored transactions against the baselines, returning (and saving) the anomalies found"""
+        transactions = [transaction for transaction in transactions if not transaction.excluded]
+        if not transactions:
+            return []
+
+        now = datetime.now()
+        computed_at = AnalysisRunCrud.get_completed_at(self.db, self.tenant_id, BASELINES_RUN)
+        if computed_at is None or now - computed_at > timedelta(hours=settings.ANOMALY_BASELINE_MAX_AGE_HOURS):
+            self.rebuild(rescore=computed_at is None)
+
+        anomalies = self._score_charges(transactions, now) + self._score_weeks(transactions, now)
+        AnomalyCrud.save_anomalies(self.db, self.tenant_id, anomalies)
+        return [self._to_schema(anomaly) for anomaly in anomalies]
+
+    def _score_charges(self, transactions: List[Transaction], now: datetime) -> List[SpendingAnomalyModel]:
+        baselines = AnomalyCrud.get_baselines(
+            self.db, self.tenant_id, "merchant", [transaction.merchant for transaction in transactions]
+        )
+        scored = [
+            (transaction, baselines[transaction.merchant]) for transaction in transactions
+            if transaction.merchant in baselines and baselines[transaction.merchant].count >= MIN_MERCHANT_CHARGES
+        ]
+        if not scored:
+            return []
+
+        medians = np.array([baseline.median for _, baseline in scored])
+        scores = robust_scores(
+            np.array([float(transaction.amount) for transaction, _ in scored]),
+            medians,
+            np.array([baseline.mad for _, baseline in scored])
+        )
+        return [
+            self._merchant_anomaly(
+                str(transaction.id), transaction.merchant, transaction.date.date(), transaction.amount,
+                median, score, now
+            )
+            for (transaction, _), median, score in zip(scored, medians, scores)
+            if score >= settings.ANOMALY_SCORE_THRESHOLD
+        ]
+
+    def _score_weeks(self, transactions: List[Transaction], now: datetime) -> List[SpendingAnomalyModel]:
+        """Re-total and score the category weeks the new transactions fall in"""
+        baselines = {
+            category: baseline
+            for category, baseline in AnomalyCrud.get_baselines(
+                self.db, self.tenant_id, "category", [transaction.primary_category for transaction in transactions]
+            ).items()
+            if baseline.median > 0 and baseline.count >= MIN_CATEGORY_WEEKS
+        }
+        affected = {
+            (transaction.primary_category, transaction.date.date() - timedelta(days=transaction.date.weekday()))
+            for transaction in transactions if transaction.primary_category in baselines
+        }
+        if not affected:
+            return []
+
+        week_starts = [week_start for _, week_start in affected]
+        date_range = DateRange(
+            start_date=datetime.combine(min(week_starts), datetime.min.time()),
+            end_date=datetime.combine(max(week_starts) + timedelta(days=7), datetime.min.time()) - timedelta(microseconds=1)
+        )
+        rows = []
+        for period, category, total, _ in TransactionCrud.get_spending_trend(
+                self.db, self.tenant_id, date_range, "week", "primary_category"
+        ):
+            week_start = date.fromisoformat(str(period)[:10])
+            if (category, week_start) in affected:
+                rows.append((category, week_start, total))
+        if not rows:
+            return []
+
+        totals = np.array([float(total) for _, _, total in rows])
+        medians = np.array([baselines[category].median for category, _, _ in rows])
+        scores = robust_scores(totals, medians, np.array([baselines[category].mad for category, _, _ in rows]))
+        return [
+            self._category_anomaly(category, week_start, total, median, score, now)
+            for (category, week_start, _), total, median, score in zip(rows, totals, medians, scores)
+            if score >= settings.ANOMALY_SCORE_THRESHOLD and total >= MIN_SPIKE_RATIO * median
+        ]
+
+    def _merchant_anomaly(self, transaction_id: str, merchant: str, day: date, amount, median, score, now) -> SpendingAnomalyModel:
+        return SpendingAnomalyModel(
+            tenant_id=self.tenant_id, kind="merchant", key=transaction_id, subject=merchant,
+            transaction_id=transaction_id, period_start=day, amount=self._money(amount),
+            baseline=self._money(median), score=round(float(score), 2), detected_at=now
+        )
+
+    def _category_anomaly(self, category: str, week_start: date, total, median, score, now) -> SpendingAnomalyModel:
+        return SpendingAnomalyModel(
+            tenant_id=self.tenant_id, kind="category", key=f"{category}/{week_start.isoformat()}", subject=category,
+            period_start=week_start, amount=self._money(total), baseline=self._money(median),
+            score=round(float(score), 2), detected_at=now
+        )
+
+    @staticmethod
+    def _money(value) -> Decimal:
+        return Decimal(str(round(float(value), 2)))
+
+    def get_anomalies(
+            self,
+            date_range: DateRange,
+            kind: Optional[str] = None,
+            min_score: float = 0.0,
+            limit: int = 100
+    ) -> SpendingAnomalyList:
+        anomalies = AnomalyCrud.get_anomalies(self.db, self.tenant_id, date_range, kind, min_score, limit)
+        return SpendingAnomalyList(anomalies=[self._to_schema(anomaly) for anomaly in anomalies])
+
+    @staticmethod
+    def _to_schema(anomaly: SpendingAnomalyModel) -> SpendingAnomaly:
+        amount, baseline = Decimal(str(anomaly.amount)), Decimal(str(anomaly.baseline))
+        return SpendingAnomaly(
+            kind=anomaly.kind,
+            subject=anomaly.subject,
+            transaction_id=anomaly.transaction_id,
+            period_start=anomaly.period_start,
+            amount=amount,
+            baseline=baseline,
+            ratio=round(float(amount / baseline), 2) if baseline else 0.0,
+            score=anomaly.score,
+            detected_at=anomaly.detected_at
+        )
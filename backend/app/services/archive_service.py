@@ -0,0 +1,167 @@
+import gzip
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows; a single writer process is assumed
+    fcntl = None
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.core.logger import logger
+from app.core.tenancy import DEFAULT_TENANT, archive_dir as tenant_archive_dir
+from app.db.crud import EmailArchiveCrud
+from app.models.email_archive_model import EmailArchiveModel
+from app.models.schemas import DateRange, EmailMessage
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, gzip is used instead
+    zstandard = None
+
+settings = get_settings()
+
+
+class EmailArchive:
+    """
+    Append-only store of raw alert emails for offline re-parsing.
+
+    Each email is compressed as an independent frame and appended to numbered segment
+    files in the tenant's archive directory; the email_archive table maps Gmail message IDs
+    to (segment, offset, length).
+    Reads memory-map the segment and decompress only the requested frame. Appends from
+    several processes are serialized by an exclusive lock on the directory's lock file, held
+    from choosing offsets until the new frames are indexed.
+    """
+
+    SEGMENT_PREFIX = "segment-"
+    LOCK_FILE = ".lock"
+    SEGMENT_SUFFIX = ".bin"
+
+    def __init__(self, tenant_id: str = DEFAULT_TENANT, archive_dir: Optional[str] = None):
+        self.tenant_id = tenant_id
+        self.archive_dir = Path(archive_dir or tenant_archive_dir(tenant_id))
+        self.codec = "zstd" if settings.EMAIL_ARCHIVE_CODEC == "zstd" and zstandard else "gzip"
+        self._maps: Dict[int, mmap.mmap] = {}
+
+    def add(self, db: Session, emails: List[EmailMessage]) -> int:
+        """Archive emails not stored yet, returning how many were added"""
+        emails = [email for email in emails if email.message_id]
+        if not emails:
+            return 0
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        with self._writer_lock():
+            # Checked under the lock, so another process can't archive the same email in between
+            archived = EmailArchiveCrud.get_archived_ids(db, self.tenant_id, [email.message_id for email in emails])
+
+            entries = []
+            segment = self._last_segment()
+            f = open(self._segment_path(segment), "ab")
+            try:
+                for email in emails:
+                    if email.message_id in archived:
+                        continue
+                    archived.add(email.message_id)
+
+                    frame = self._compress(email.model_dump_json().encode("utf-8"))
+                    if f.tell() and f.tell() + len(frame) > settings.EMAIL_ARCHIVE_SEGMENT_BYTES:
+                        f.close()
+                        segment += 1
+                        f = open(self._segment_path(segment), "ab")
+
+                    entries.append(EmailArchiveModel(
+                        tenant_id=self.tenant_id,
+                        message_id=email.message_id,
+                        date=email.date,
+                        segment=segment,
+                        offset=f.tell(),
+                        length=len(frame),
+                        codec=self.codec
+                    ))
+                    f.write(frame)
+            finally:
+                f.close()
+
+            # Frames are on disk before they are indexed; a crash in between only leaves unreferenced bytes
+            if entries:
+                EmailArchiveCrud.add_entries(db, entries)
+        return len(entries)
+
+    def get(self, db: Session, message_id: str) -> Optional[EmailMessage]:
+        entry = EmailArchiveCrud.get_entry(db, self.tenant_id, message_id)
+        return self.read(entry) if entry else None
+
+    def iter_emails(self, db: Session, date_range: Optional[DateRange] = None) -> Iterator[EmailMessage]:
+        """Yield archived emails in storage order, optionally limited to a date range"""
+        for entry in EmailArchiveCrud.get_entries(db, self.tenant_id, date_range):
+            try:
+                yield self.read(entry)
+            except Exception as e:
+                logger.error(f"Failed to read archived email {entry.message_id}: {str(e)}")
+
+    def read(self, entry: EmailArchiveModel) -> EmailMessage:
+        segment_map = self._map(entry.segment, entry.offset + entry.length)
+        frame = memoryview(segment_map)[entry.offset:entry.offset + entry.length]
+        try:
+            return EmailMessage.model_validate_json(self._decompress(frame, entry.codec))
+        finally:
+            frame.release()
+
+    def close(self) -> None:
+        for segment_map in self._maps.values():
+            segment_map.close()
+        self._maps.clear()
+
+    def _map(self, segment: int, min_size: int) -> mmap.mmap:
+        segment_map = self._maps.get(segment)
+        # Remap when the segment has grown since it was mapped
+        if segment_map is None or len(segment_map) < min_size:
+            if segment_map is not None:
+                segment_map.close()
+            with open(self._segment_path(segment), "rb") as f:
+                segment_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = segment_map
+        return segment_map
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=3).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    @staticmethod
+    def _decompress(frame, codec: str) -> bytes:
+        if codec == "zstd":
+            if not zstandard:
+                raise RuntimeError("zstandard is required to read zstd archive segments")
+            return zstandard.ZstdDecompressor().decompress(frame)
+        return gzip.decompress(frame)
+
+    @contextmanager
+    def _writer_lock(self):
+        """Exclusive lock on the archive directory, so concurrent appends can't share offsets"""
+        if fcntl is None:
+            yield
+            return
+
+        fd = os.open(self.archive_dir / self.LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.archive_dir / f"{self.SEGMENT_PREFIX}{segment:06d}{self.SEGMENT_SUFFIX}"
+
+    def _last_segment(self) -> int:
+        segments = [
+            int(path.stem[len(self.SEGMENT_PREFIX):])
+            for path in self.archive_dir.glob(f"{self.SEGMENT_PREFIX}*{self.SEGMENT_SUFFIX}")
+        ] if self.archive_dir.exists() else []
+        return max(segments, default=1)
@@ -0,0 +1,108 @@
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.core.events import get_event_bus
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.crud import BudgetCrud
+from app.models.budget_model import BudgetModel
+from app.models.budget_spend_model import BudgetSpendModel
+from app.models.schemas import BudgetRequest, BudgetStatus, BudgetStatusList
+
+settings = get_settings()
+
+
+def current_month() -> str:
+    return date.today().strftime("%Y-%m")
+
+
+class BudgetService:
+    """
+    Monthly budgets per primary category or card.
+
+    Spend is kept in one counter per budgeted target and month, adjusted in the same commit as
+    every created, excluded, re-included, recategorised or reprocessed transaction, so reading
+    status costs one row per budget. A month's counters are seeded with a single grouped query
+    the first time its status is read.
+    """
+
+    def __init__(self, db: Session, tenant_id: str = DEFAULT_TENANT):
+        self.db = db
+        self.tenant_id = tenant_id
+
+    def get_status(self, month: Optional[str] = None, recount: bool = False) -> BudgetStatusList:
+        """Spend against every budget in a month (the current one by default); ``recount`` re-sums it"""
+        month = month or current_month()
+        budgets = BudgetCrud.get_budgets(self.db, self.tenant_id)
+        counters = self._get_counters(budgets, month)
+        if recount:
+            BudgetCrud.recount_counters(self.db, self.tenant_id, month, counters)
+        return BudgetStatusList(
+            month=month,
+            budgets=[self._to_status(budget, counters[(budget.scope, budget.target)]) for budget in budgets]
+        )
+
+    def set_budget(self, request: BudgetRequest) -> BudgetStatus:
+        budget = BudgetCrud.set_budget(self.db, self.tenant_id, request.scope, request.target, request.amount)
+        month = current_month()
+        return self._to_status(budget, self._get_counters([budget], month)[(budget.scope, budget.target)])
+
+    def delete_budget(self, budget_id: int) -> bool:
+        return BudgetCrud.delete_budget(self.db, self.tenant_id, budget_id)
+
+    def check_thresholds(self) -> List[dict]:
+        """
+        Publish a ``budget_threshold`` event for each budget whose spend this month crossed one of
+        ``BUDGET_ALERT_THRESHOLDS`` since the last check, and return them. A threshold is
+        announced once per month, or again if exclusions take spend back under it first.
+        """
+        thresholds = sorted(settings.BUDGET_ALERT_THRESHOLDS)
+        budgets = BudgetCrud.get_budgets(self.db, self.tenant_id)
+        if not budgets or not thresholds:
+            return []
+
+        month = current_month()
+        counters = self._get_counters(budgets, month)
+        alerts = []
+        changed = False
+        for budget in budgets:
+            counter = counters[(budget.scope, budget.target)]
+            status = self._to_status(budget, counter)
+            reached = max((threshold for threshold in thresholds if status.used >= threshold), default=0.0)
+            if reached > counter.alerted:
+                alerts.append({"threshold": reached, "budget": status.model_dump(mode="json")})
+            if reached != counter.alerted:
+                counter.alerted = reached
+                changed = True
+
+        if changed:
+            self.db.commit()
+        events = get_event_bus(self.tenant_id)
+        for alert in alerts:
+            events.publish("budget_threshold", alert)
+        return alerts
+
+    def _get_counters(self, budgets: List[BudgetModel], month: str) -> dict:
+        counters = BudgetCrud.get_counters(self.db, self.tenant_id, month)
+        missing = [(budget.scope, budget.target) for budget in budgets if (budget.scope, budget.target) not in counters]
+        if missing:
+            counters.update(BudgetCrud.seed_counters(self.db, self.tenant_id, month, missing))
+        return counters
+
+    @staticmethod
+    def _to_status(budget: BudgetModel, counter: BudgetSpendModel) -> BudgetStatus:
+        amount, spent = Decimal(str(budget.amount)), Decimal(str(counter.spent)).quantize(Decimal("0.01"))
+        return BudgetStatus(
+            id=budget.id,
+            scope=budget.scope,
+            target=budget.target,
+            amount=amount,
+            month=counter.month,
+            spent=spent,
+            remaining=amount - spent,
+            used=round(float(spent / amount), 4),
+            count=counter.count
+        )
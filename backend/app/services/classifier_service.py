@@ -1,16 +1,19 @@
 import asyncio
 import json
 import os
+import time
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, List, Optional
 
-import openai
 from cachetools import TTLCache
+from sqlalchemy.orm import Session
 
 from app.config import get_settings
 from app.core.exceptions import ClassificationError
-from app.core.logger import logger
+from app.core.logger import logger, sampled
+from app.core.metrics import CLASSIFIER_CACHE, OPENAI_REQUEST_LATENCY, OPENAI_TOKENS
 from app.models.schemas import MerchantCategory
+from app.services.local_classifier import LOCAL_DESCRIPTION, LocalMerchantModel, training_examples
 
 settings = get_settings()
 
@@ -69,6 +72,13 @@ class SpecialClassificationRuleManager:
         """Return all special classification rules."""
         return self._rules.copy()
 
+    def get_rule(self, merchant: str) -> Optional[Dict[str, str]]:
+        """Return the rule for a merchant, if there is one."""
+        for rule in self._rules:
+            if rule["merchant"].lower() == merchant.lower():
+                return rule
+        return None
+
     def add_rule(self, merchant: str, category: str, subcategory: str) -> bool:
         """Add a new special classification rule."""
         # Check if rule already exists
@@ -119,34 +129,245 @@ class SpecialClassificationRuleManager:
 
 
 class MerchantClassifier:
-    def __init__(self):
-        self.client = openai.Client(api_key=settings.OPENAI_API_KEY)
+    """
+    Classifies merchants with OpenAI, guided by one tenant's special rules. Each tenant gets its
+    own instance, so the result cache is namespaced per tenant and one tenant's rules or churn
+    never affect another's classifications.
+
+    Before OpenAI is asked, merchants with a special rule take the rule's category and others go
+    to a local model trained on the tenant's own labeled transactions (``LocalMerchantModel``,
+    saved at ``model_path``). Only calibrated predictions of at least
+    ``LOCAL_CLASSIFIER_MIN_CONFIDENCE`` are used and the rest are sent to OpenAI. Once
+    ``LOCAL_CLASSIFIER_RETRAIN_AFTER`` merchants have been labeled that way (or by hand)
+    ``retrain`` folds them into the model.
+    """
+
+    def __init__(self, rules_file_path: Optional[str] = None, model_path: Optional[str] = None):
+        self._client = None
         self.cache = TTLCache(
             maxsize=settings.CACHE_MAX_SIZE,
             ttl=settings.CACHE_TTL
         )
-        self.rule_manager = SpecialClassificationRuleManager()
+        self.rule_manager = SpecialClassificationRuleManager(rules_file_path)
+        self.model_path = model_path
+        self.local_model = self._load_local_model()
+        # Merchants labeled by OpenAI or by hand since the local model was trained; without a
+        # model the first ingest checks whether there are enough labels to train one
+        self.new_labels = 0 if self.local_model else settings.LOCAL_CLASSIFIER_RETRAIN_AFTER
+        self._training = asyncio.Lock()
+
+    def _load_local_model(self) -> Optional[LocalMerchantModel]:
+        if not (settings.LOCAL_CLASSIFIER_ENABLED and self.model_path):
+            return None
+        try:
+            return LocalMerchantModel.load(self.model_path)
+        except Exception as e:
+            logger.error(f"Failed to load local classifier from {self.model_path}: {str(e)}")
+            return None
+
+    @property
+    def client(self):
+        # Created on first classification; importing the OpenAI SDK dominates startup time
+        if self._client is None:
+            import openai
+            self._client = openai.Client(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+        return self._client
 
     async def classify_merchant(self, merchant_name: str) -> MerchantCategory:
         cache_key = merchant_name.lower()
 
         if cache_key in self.cache:
+            CLASSIFIER_CACHE.labels(tier="memory", result="hit").inc()
             return self.cache[cache_key]
+        CLASSIFIER_CACHE.labels(tier="memory", result="miss").inc()
+
+        result = self._classify_locally(merchant_name)
+        if result is None:
+            try:
+                response = await self._get_classification(merchant_name)
+                result = self._parse_response(response)
+            except Exception as e:
+                logger.error(f"Classification failed for {merchant_name}: {str(e)}")
+                raise ClassificationError(f"Failed to classify merchant: {str(e)}")
+            self.new_labels += 1
+
+        self.cache[cache_key] = result
+        return result
+
+    async def classify_merchants(self, merchant_names: Iterable[str]) -> Dict[str, MerchantCategory]:
+        """
+        Classify many merchants, sending those neither cached nor confidently classified locally
+        to OpenAI in batches of CLASSIFY_BATCH_SIZE. Merchants that could not be classified are
+        left out of the result.
+        """
+        results = {}
+        pending = []
+        hits = misses = 0
+        for merchant_name in dict.fromkeys(merchant_names):
+            cache_key = merchant_name.lower()
+            if cache_key in self.cache:
+                results[merchant_name] = self.cache[cache_key]
+                hits += 1
+                continue
+
+            misses += 1
+            result = self._classify_locally(merchant_name)
+            if result is None:
+                pending.append(merchant_name)
+            else:
+                self.cache[cache_key] = result
+                results[merchant_name] = result
+
+        CLASSIFIER_CACHE.labels(tier="memory", result="hit").inc(hits)
+        CLASSIFIER_CACHE.labels(tier="memory", result="miss").inc(misses)
+
+        batch_size = max(1, settings.CLASSIFY_BATCH_SIZE)
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i:i + batch_size]
+            try:
+                response = await self._get_batch_classification(batch)
+                classified = self._parse_batch_response(response, batch)
+            except ClassificationError:
+                classified = {}
+
+            for merchant_name, result in classified.items():
+                self.cache[merchant_name.lower()] = result
+                results[merchant_name] = result
+            self.new_labels += len(classified)
+
+        return results
+
+    def _classify_locally(self, merchant_name: str) -> Optional[MerchantCategory]:
+        """The merchant's special rule, or the local model's prediction if it is confident enough"""
+        if not settings.LOCAL_CLASSIFIER_ENABLED:
+            return None
+
+        rule = self.rule_manager.get_rule(merchant_name)
+        if rule:
+            CLASSIFIER_CACHE.labels(tier="rules", result="hit").inc()
+            return MerchantCategory(
+                primary_category=rule["category"], subcategory=rule["subcategory"], confidence=1.0,
+                description=f"{LOCAL_DESCRIPTION}: special classification rule for {rule['merchant']}"
+            )
+        if self.local_model is None or not self.local_model.calibrated:
+            # Raw softmax probabilities overstate confidence, so the threshold means nothing for them
+            return None
+
+        primary_category, subcategory, confidence = self.local_model.predict(merchant_name)
+        if confidence < settings.LOCAL_CLASSIFIER_MIN_CONFIDENCE:
+            CLASSIFIER_CACHE.labels(tier="local", result="miss").inc()
+            return None
+        CLASSIFIER_CACHE.labels(tier="local", result="hit").inc()
+        return MerchantCategory(
+            primary_category=primary_category, subcategory=subcategory, confidence=round(confidence, 3),
+            description=f"{LOCAL_DESCRIPTION}: predicted from {self.local_model.merchant_count} labeled merchants"
+        )
+
+    def label_changed(self, merchant_name: str) -> None:
+        """Note a merchant was recategorized by hand, so neither the cache nor the next training set has the old label"""
+        self.cache.pop(merchant_name.lower(), None)
+        self.new_labels += 1
+
+    def needs_training(self) -> bool:
+        """Whether enough merchants have been labeled for a retrain; classifiers without a model_path never train"""
+        return bool(
+            settings.LOCAL_CLASSIFIER_ENABLED and self.model_path
+            and self.new_labels >= settings.LOCAL_CLASSIFIER_RETRAIN_AFTER
+        )
+
+    async def retrain(self, db: Session, tenant_id: str, full: bool = False) -> Optional[LocalMerchantModel]:
+        """
+        Train the local model on the tenant's labeled transactions and special rules, warm
+        starting from the current model unless ``full``, and save it to ``model_path``. Returns
+        None without training while fewer than LOCAL_CLASSIFIER_MIN_MERCHANTS merchants are
+        labeled, or when a retrain is already running.
+        """
+        if self._training.locked():
+            return None
+        async with self._training:
+            labels_seen = self.new_labels
+            names, labels, weights = training_examples(db, tenant_id, self.rule_manager.get_all_rules())
+            if len(names) < settings.LOCAL_CLASSIFIER_MIN_MERCHANTS or len(set(labels)) < 2:
+                self.new_labels -= labels_seen
+                return None
+
+            started = time.perf_counter()
+            # Training is pure NumPy and takes seconds on large histories; keep it off the event loop
+            model = await asyncio.to_thread(
+                LocalMerchantModel.fit, names, labels, weights, None if full else self.local_model
+            )
+            await asyncio.to_thread(model.save, self.model_path)
+            self.local_model = model
+            self.new_labels -= labels_seen
+            accuracy = "n/a" if model.holdout_accuracy is None else f"{model.holdout_accuracy:.1%}"
+            logger.info(
+                f"Trained local classifier for tenant {tenant_id} on {len(names)} merchants and {len(model.labels)} "
+                f"labels in {time.perf_counter() - started:.1f}s (held-out accuracy {accuracy})"
+            )
+            return model
 
+    async def _get_batch_classification(self, merchant_names: List[str]) -> str:
+        merchants = "\n".join(f"- {name}" for name in merchant_names)
         try:
-            response = await self._get_classification(merchant_name)
-            result = self._parse_response(response)
-            self.cache[cache_key] = result
-            return result
+            response = await self._create_completion(
+                "batch",
+                model="gpt-3.5-turbo",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": self._get_classification_prompt()
+                    },
+                    {
+                        "role": "user",
+                        "content": (
+                            "Classify each of these merchants. Respond with a single JSON object whose keys are "
+                            "the merchant names exactly as given and whose values use the response format above.\n"
+                            f"{merchants}"
+                        )
+                    }
+                ],
+                temperature=0.1
+            )
+
+            return response.choices[0].message.content
+
+        except Exception as e:
+            logger.error(f"OpenAI batch API call failed: {str(e)}")
+            raise ClassificationError(f"OpenAI API error: {str(e)}")
 
+    async def _create_completion(self, kind: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await asyncio.to_thread(self.client.chat.completions.create, **kwargs)
+        finally:
+            OPENAI_REQUEST_LATENCY.labels(kind=kind).observe(time.perf_counter() - started)
+
+        if response.usage:
+            OPENAI_TOKENS.labels(type="prompt").inc(response.usage.prompt_tokens)
+            OPENAI_TOKENS.labels(type="completion").inc(response.usage.completion_tokens)
+        return response
+
+    def _parse_batch_response(self, response: str, merchant_names: List[str]) -> Dict[str, MerchantCategory]:
+        try:
+            data = json.loads(response)
         except Exception as e:
-            logger.error(f"Classification failed for {merchant_name}: {str(e)}")
-            raise ClassificationError(f"Failed to classify merchant: {str(e)}")
+            logger.error(f"Failed to parse batch classification response: {str(e)}")
+            raise ClassificationError(f"Invalid classification format: {str(e)}")
+
+        results = {}
+        for merchant_name in merchant_names:
+            try:
+                results[merchant_name] = MerchantCategory(**data[merchant_name])
+            except Exception as e:
+                sampled("batch_classification_invalid").warning(
+                    "Batch classification missing or invalid for {}: {}", merchant_name, e
+                )
+        return results
 
     async def _get_classification(self, merchant_name: str) -> str:
         try:
-            response = await asyncio.to_thread(
-                self.client.chat.completions.create,
+            response = await self._create_completion(
+                "single",
                 model="gpt-3.5-turbo",
                 messages=[
                     {
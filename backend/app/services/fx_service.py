@@ -0,0 +1,143 @@
+import asyncio
+import bisect
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Set, Tuple
+
+from cachetools import TTLCache
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.core.logger import sampled
+from app.core.metrics import FX_FETCH_LATENCY
+from app.db.crud import FxRateCrud
+
+if TYPE_CHECKING:
+    import aiohttp
+
+settings = get_settings()
+
+# fawazahmed0's currency API: every currency against one base, per day or "latest"
+RATE_SOURCE_URL = "https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@{version}/v1/currencies/{base}.json"
+
+# Dates the rate source had nothing for (not yet published, or before its history) aren't retried for an hour
+_unavailable_dates: TTLCache = TTLCache(maxsize=10000, ttl=3600)
+
+
+class FxService:
+    """
+    Exchange rates from the foreign currencies in ``FX_CURRENCIES`` into ``HOME_CURRENCY``.
+
+    Rates are kept in the shared ``fx_rates`` table. A missing date is filled with one request
+    to the rate source, which returns every currency at once. Converting a batch therefore costs
+    one bounded table read plus at most one request per new date, however many foreign transactions it
+    holds. A transaction uses the latest rate on or before its date, or the earliest after it
+    when the source's history starts later.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.home = settings.HOME_CURRENCY
+
+    async def get_rates(self, wanted: Iterable[Tuple[date, str]]) -> Dict[Tuple[date, str], Decimal]:
+        """Home-currency price of one unit of each (date, currency); pairs without any rate are left out"""
+        wanted = {(day, currency.upper()) for day, currency in wanted if currency.upper() != self.home}
+        if not wanted:
+            return {}
+
+        days = {day for day, _ in wanted}
+        await self.fill(days)
+
+        # Only the batch's span of each series, and the rates either side of it, is read
+        series = defaultdict(lambda: ([], []))
+        currencies = {currency for _, currency in wanted}
+        for base, day, rate in FxRateCrud.get_rates(self.db, currencies, self.home, min(days), max(days)):
+            series[base][0].append(day)
+            series[base][1].append(Decimal(str(rate)))
+
+        rates = {}
+        for day, currency in wanted:
+            days_known, values = series.get(currency, ([], []))
+            if days_known:
+                index = bisect.bisect_right(days_known, day)
+                rates[(day, currency)] = values[index - 1] if index else values[0]
+            elif currency in settings.FX_FALLBACK_RATES:
+                sampled("fx_rate_failed").warning("No {} rate stored, using fallback rate", currency)
+                rates[(day, currency)] = Decimal(str(settings.FX_FALLBACK_RATES[currency]))
+        return rates
+
+    async def ensure_range(self, start: date, end: date):
+        """Fill rates every ``FX_REPORTING_STEP_DAYS`` across a range, for re-denominating reports"""
+        step = max(settings.FX_REPORTING_STEP_DAYS, 1)
+        days = {start + timedelta(days=offset) for offset in range(0, (end - start).days + 1, step)}
+        await self.fill(days | {end})
+
+    async def fill(self, days: Set[date]):
+        """Fetch and store the rates of dates that aren't in the table yet"""
+        today = date.today()
+        missing = sorted(
+            day for day in set(days) - FxRateCrud.get_dates(self.db, self.home, days)
+            if day <= today and day not in _unavailable_dates
+        )
+        if not missing:
+            return
+
+        import aiohttp  # Only needed once rates are missing, so kept out of startup
+
+        semaphore = asyncio.Semaphore(settings.FX_FETCH_CONCURRENCY)
+        async with aiohttp.ClientSession() as session:
+            async def fetch_day(day: date):
+                async with semaphore:
+                    return day, await self._fetch(session, day.isoformat())
+
+            results = await asyncio.gather(*(fetch_day(day) for day in missing))
+            unavailable = [day for day, result in results if result is None]
+            if unavailable:
+                # Recent days may not be published yet; the latest rates stand in for them
+                for day in unavailable:
+                    _unavailable_dates[day] = True
+                results.append((None, await self._fetch(session, "latest", source="latest")))
+
+        rows = {}
+        for _, result in results:
+            if result:
+                published, quotes = result
+                for currency, rate in quotes.items():
+                    rows[(currency, published)] = {"base": currency, "quote": self.home, "date": published, "rate": rate}
+        FxRateCrud.add_rates(self.db, list(rows.values()))
+
+    async def _fetch(
+            self,
+            session: "aiohttp.ClientSession",
+            version: str,
+            source: str = "historical"
+    ) -> Optional[Tuple[date, Dict[str, Decimal]]]:
+        """The publication date and the home-currency price of each FX_CURRENCIES currency, or None"""
+        import aiohttp
+
+        url = RATE_SOURCE_URL.format(version=version, base=self.home.lower())
+        started = time.perf_counter()
+        try:
+            async with session.get(url, timeout=10) as response:
+                if response.status != 200:
+                    return None
+                data = await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            sampled("fx_rate_failed").warning("Failed to fetch {} exchange rates: {}", version, e)
+            return None
+        finally:
+            FX_FETCH_LATENCY.labels(source=source).observe(time.perf_counter() - started)
+
+        # The source quotes foreign units per home unit; stored rates are home units per foreign unit
+        quoted = data.get(self.home.lower(), {})
+        quotes = {
+            currency: (Decimal(1) / Decimal(str(quoted[currency.lower()]))).quantize(Decimal("0.00000001"))
+            for currency in settings.FX_CURRENCIES if quoted.get(currency.lower())
+        }
+        if not quotes:
+            return None
+        published = data.get("date") or (date.today().isoformat() if version == "latest" else version)
+        sampled("fx_rate").debug("Fetched {} exchange rates published {}", version, published)
+        return date.fromisoformat(published), quotes
@@ -1,24 +1,35 @@
 import base64
 import os
 import pickle
+import time
 from datetime import datetime
-from typing import List
-
-from google.auth.exceptions import RefreshError
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from typing import Callable, List, Optional, Tuple
 
 from app.config import get_settings
-from app.core.exceptions import GmailAPIError
+from app.core.exceptions import GmailAPIError, GmailHistoryExpiredError
 from app.core.logger import logger
+from app.core.metrics import GMAIL_MESSAGES, GMAIL_REQUEST_LATENCY
 from app.models.schemas import EmailMessage
 
 settings = get_settings()
 
 
+def _part_fields(depth: int) -> str:
+    """Partial-response selector for a MIME part and its nested parts, without headers or attachment IDs"""
+    fields = 'mimeType,body/data'
+    if depth > 0:
+        fields += f',parts({_part_fields(depth - 1)})'
+    return fields
+
+
+# multipart/mixed > multipart/alternative > text/html is the deepest layout alerts use
+MESSAGE_FIELDS = f'id,internalDate,payload({_part_fields(3)})'
+MESSAGE_WITH_HEADERS_FIELDS = f'id,internalDate,payload(headers,{_part_fields(3)})'
+
+
 class GmailService:
-    def __init__(self):
+    def __init__(self, token_path: Optional[str] = None):
+        self.token_path = token_path or settings.GMAIL_TOKEN_PATH
         self._service = None
 
     @property
@@ -27,12 +38,27 @@ class GmailService:
             self._service = self._initialize_service()
         return self._service
 
-    @staticmethod
-    def _initialize_service():
+    def authorize(self, interactive: bool = True) -> bool:
+        """
+        Initialise the client. Non-interactive callers (the background scheduler) get False
+        instead of the OAuth browser flow when there is no usable token.
+        """
+        if not self._service:
+            self._service = self._initialize_service(interactive)
+        return self._service is not None
+
+    def _initialize_service(self, interactive: bool = True):
+        # The Google SDKs take a large share of startup time, so they're only imported once a
+        # tenant's mailbox is first used
+        from google.auth.exceptions import RefreshError
+        from google.auth.transport.requests import Request
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
+
         try:
             creds = None
-            if os.path.exists(settings.GMAIL_TOKEN_PATH):
-                with open(settings.GMAIL_TOKEN_PATH, 'rb') as token:
+            if os.path.exists(self.token_path):
+                with open(self.token_path, 'rb') as token:
                     creds = pickle.load(token)
 
             if not creds or not creds.valid:
@@ -44,18 +70,21 @@ class GmailService:
                         logger.warning(f"Token refresh failed: {e}. Initiating new authentication flow.")
                         creds = None
                         # Remove invalid token file
-                        if os.path.exists(settings.GMAIL_TOKEN_PATH):
-                            os.remove(settings.GMAIL_TOKEN_PATH)
+                        if os.path.exists(self.token_path):
+                            os.remove(self.token_path)
 
                 # If still no valid credentials, run the authorization flow
                 if not creds or not creds.valid:
+                    if not interactive:
+                        return None
                     flow = InstalledAppFlow.from_client_secrets_file(
                         settings.GMAIL_CREDENTIALS_PATH,
                         settings.GMAIL_SCOPES
                     )
                     creds = flow.run_local_server(port=0)
 
-                    with open(settings.GMAIL_TOKEN_PATH, 'wb') as token:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.token_path)), exist_ok=True)
+                    with open(self.token_path, 'wb') as token:
                         pickle.dump(creds, token)
 
             return build('gmail', 'v1', credentials=creds)
@@ -64,56 +93,210 @@ class GmailService:
             logger.error(f"Failed to initialize Gmail service: {str(e)}")
             raise GmailAPIError(f"Gmail service initialization failed: {str(e)}")
 
-    def get_messages(self, query: str) -> List[EmailMessage]:
+    @staticmethod
+    def _execute(request, operation: str) -> dict:
+        started = time.perf_counter()
+        try:
+            return request.execute()
+        finally:
+            GMAIL_REQUEST_LATENCY.labels(operation=operation).observe(time.perf_counter() - started)
+            if operation.startswith('get'):
+                GMAIL_MESSAGES.labels(operation=operation).inc()
+
+    def get_messages(
+            self,
+            query: str,
+            matches: Optional[Callable[[str, str], bool]] = None
+    ) -> List[EmailMessage]:
+        """
+        Fetch the messages matching a Gmail search query. If ``matches(sender, subject)`` is
+        given, only messages whose headers it accepts are downloaded in full.
+        """
         try:
-            results = self.service.users().messages().list(
-                userId='me',
-                q=query
-            ).execute()
+            messages = []
+            page_token = None
+
+            while True:
+                results = self._execute(self.service.users().messages().list(
+                    userId='me',
+                    q=query,
+                    maxResults=500,
+                    pageToken=page_token
+                ), 'list')
+
+                messages.extend(results.get('messages', []))
+                GMAIL_MESSAGES.labels(operation='list').inc(len(results.get('messages', [])))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
 
-            messages = results.get('messages', [])
-            return [self._fetch_email_message(msg['id']) for msg in messages]
+            return self._fetch_messages([msg['id'] for msg in messages], matches)
 
         except Exception as e:
             logger.error(f"Failed to fetch Gmail messages: {str(e)}")
             raise GmailAPIError(f"Failed to fetch messages: {str(e)}")
 
-    def _fetch_email_message(self, message_id: str) -> EmailMessage:
+    def get_history_id(self) -> str:
+        """Return the mailbox's current history ID, the starting point for the next incremental sync."""
         try:
-            msg = self.service.users().messages().get(
+            profile = self._execute(self.service.users().getProfile(userId='me'), 'profile')
+            return profile['historyId']
+
+        except Exception as e:
+            logger.error(f"Failed to fetch Gmail profile: {str(e)}")
+            raise GmailAPIError(f"Failed to fetch mailbox history ID: {str(e)}")
+
+    def get_messages_since(
+            self,
+            history_id: str,
+            matches: Optional[Callable[[str, str], bool]] = None
+    ) -> Tuple[List[EmailMessage], str]:
+        """
+        Fetch messages added to the mailbox after ``history_id`` via ``users.history.list``.
+
+        ``matches(sender, subject)`` is checked against message headers before the full
+        message is downloaded. Returns the messages and the new history ID. Raises
+        GmailHistoryExpiredError when Gmail no longer holds history that far back.
+        """
+        from googleapiclient.errors import HttpError
+
+        try:
+            message_ids = []
+            seen = set()
+            latest_history_id = history_id
+            page_token = None
+
+            while True:
+                results = self._execute(self.service.users().history().list(
+                    userId='me',
+                    startHistoryId=history_id,
+                    historyTypes=['messageAdded'],
+                    pageToken=page_token
+                ), 'history')
+
+                for record in results.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        message = added['message']
+                        labels = message.get('labelIds', [])
+                        if message['id'] in seen or 'DRAFT' in labels or 'SENT' in labels:
+                            continue
+                        seen.add(message['id'])
+                        message_ids.append(message['id'])
+
+                latest_history_id = results.get('historyId', latest_history_id)
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+
+        except HttpError as e:
+            if e.resp.status == 404:
+                raise GmailHistoryExpiredError(f"History ID {history_id} is no longer available")
+            logger.error(f"Failed to fetch Gmail history: {str(e)}")
+            raise GmailAPIError(f"Failed to fetch history: {str(e)}")
+        except Exception as e:
+            logger.error(f"Failed to fetch Gmail history: {str(e)}")
+            raise GmailAPIError(f"Failed to fetch history: {str(e)}")
+
+        GMAIL_MESSAGES.labels(operation='history').inc(len(message_ids))
+        return self._fetch_messages(message_ids, matches), latest_history_id
+
+    def _fetch_messages(
+            self,
+            message_ids: List[str],
+            matches: Optional[Callable[[str, str], bool]] = None
+    ) -> List[EmailMessage]:
+        if not matches:
+            return [self._fetch_email_message(message_id) for message_id in message_ids]
+
+        emails = []
+        for message_id in message_ids:
+            sender, subject = self._fetch_sender_and_subject(message_id)
+            if matches(sender, subject):
+                emails.append(self._fetch_email_message(message_id, sender, subject))
+        return emails
+
+    def _fetch_sender_and_subject(self, message_id: str) -> Tuple[str, str]:
+        try:
+            msg = self._execute(self.service.users().messages().get(
                 userId='me',
                 id=message_id,
-                format='full'
-            ).execute()
+                format='metadata',
+                metadataHeaders=['From', 'Subject'],
+                fields='payload/headers'
+            ), 'get_metadata')
 
             headers = {
                 header['name'].lower(): header['value']
-                for header in msg['payload']['headers']
+                for header in msg['payload'].get('headers', [])
             }
+            return headers.get('from', ''), headers.get('subject', '')
 
-            body = self._get_email_body(msg)
+        except Exception as e:
+            logger.error(f"Failed to fetch email headers: {str(e)}")
+            raise GmailAPIError(f"Failed to fetch message headers: {str(e)}")
+
+    def _fetch_email_message(
+            self,
+            message_id: str,
+            sender: Optional[str] = None,
+            subject: Optional[str] = None
+    ) -> EmailMessage:
+        try:
+            # Headers already read by the prefilter are left out of the full fetch
+            headers_known = sender is not None and subject is not None
+            msg = self._execute(self.service.users().messages().get(
+                userId='me',
+                id=message_id,
+                format='full',
+                fields=MESSAGE_FIELDS if headers_known else MESSAGE_WITH_HEADERS_FIELDS
+            ), 'get')
+
+            if not headers_known:
+                headers = {
+                    header['name'].lower(): header['value']
+                    for header in msg['payload'].get('headers', [])
+                }
+                sender = headers.get('from', '')
+                subject = headers.get('subject', '')
 
             return EmailMessage(
-                subject=headers.get('subject', ''),
-                sender=headers.get('from', ''),
+                subject=subject,
+                sender=sender,
                 date=datetime.fromtimestamp(int(msg['internalDate']) / 1000),
-                body=body
+                body=self._get_email_body(msg['payload']),
+                message_id=msg['id']
             )
 
         except Exception as e:
             logger.error(f"Failed to fetch email message: {str(e)}")
             raise GmailAPIError(f"Failed to fetch message details: {str(e)}")
 
-    def _get_email_body(self, message: dict) -> str:
-        if 'data' in message['payload']['body']:
-            return base64.urlsafe_b64decode(
-                message['payload']['body']['data']
-            ).decode('utf-8')
+    @staticmethod
+    def _get_email_body(payload: dict) -> str:
+        """
+        Walk the MIME tree and decode only the part the parsers need: the first text/html
+        part, else the first text/plain part, else the first part with any data.
+        """
+        plain = None
+        fallback = None
+        stack = [payload]
+        while stack:
+            part = stack.pop()
+            data = part.get('body', {}).get('data')
+            if data:
+                mime_type = part.get('mimeType', '')
+                if mime_type == 'text/html':
+                    return GmailService._decode_part(data)
+                if plain is None and mime_type == 'text/plain':
+                    plain = data
+                elif fallback is None:
+                    fallback = data
+            # Reversed so parts are visited in document order
+            stack.extend(reversed(part.get('parts', [])))
 
-        parts = message['payload'].get('parts', [])
-        if parts:
-            return base64.urlsafe_b64decode(
-                parts[0]['body']['data']
-            ).decode('utf-8')
+        data = plain or fallback
+        return GmailService._decode_part(data) if data else ''
 
-        return ''
+    @staticmethod
+    def _decode_part(data: str) -> str:
+        return base64.urlsafe_b64decode(data).decode('utf-8', errors='replace')
@@ -0,0 +1,345 @@
+import os
+import re
+import zlib
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.db.crud import TransactionCrud
+
+settings = get_settings()
+
+NGRAM_SIZES = (2, 3, 4)
+DIGITS = re.compile(r"\d+")
+NON_WORD = re.compile(r"[^A-Z0-9#&]+")
+
+# Every transaction the local model classified has a description starting with this, so its own
+# predictions never come back as training labels
+LOCAL_DESCRIPTION = "Local model"
+
+HOLDOUT_BUCKETS = 5  # One merchant in five (by name hash) is held out to calibrate confidence
+MIN_HOLDOUT = 50  # Held-out merchants needed to fit a temperature; a smaller bucket falls back to cross-validation
+RECALIBRATE_GROWTH = 1.25
+TEMPERATURES = np.exp(np.linspace(np.log(0.25), np.log(4.0), 49))
+RULE_WEIGHT = 5.0  # Special rules count as this many labeled merchants
+L2 = 1e-4
+LEARNING_RATE = 0.2
+EPOCHS = 60
+WARM_EPOCHS = 20  # When most weights carry over from the previous model
+
+
+def merchant_features(name: str) -> Set[int]:
+    """
+    Hashes of the character 2-4 grams and words of a merchant name, upper-cased and reduced to
+    ASCII letters, digits, '&' and '#'. Digit runs collapse to '#', so store numbers and
+    reference codes don't split a merchant.
+    """
+    words = NON_WORD.sub(" ", DIGITS.sub("#", name.upper())).split()
+    text = f" {' '.join(words)} ".encode()
+    crc32 = zlib.crc32
+    hashed = {crc32(text[i:i + n]) for n in NGRAM_SIZES for i in range(len(text) - n + 1)}
+    hashed.update(crc32(b"w:" + word.encode()) for word in words)
+    return hashed
+
+
+@dataclass
+class Examples:
+    """Training merchants as a sparse matrix of feature columns, one example per merchant"""
+    hashed: List[np.ndarray]  # feature hashes of each merchant
+    targets: np.ndarray  # label index per merchant
+    weights: np.ndarray
+    features: np.ndarray  # distinct feature hashes, sorted; column i is features[i]
+    columns: np.ndarray  # column of each nonzero, row by row
+    row_starts: np.ndarray
+    values: np.ndarray  # 1/sqrt(features in the row), so every row has unit norm
+
+    @classmethod
+    def build(cls, hashed: List[np.ndarray], targets: np.ndarray, weights: np.ndarray) -> "Examples":
+        lengths = np.array([len(row) for row in hashed], dtype=np.int64)
+        features, columns = np.unique(np.concatenate(hashed), return_inverse=True)
+        return cls(
+            hashed=hashed, targets=targets, weights=weights, features=features, columns=columns,
+            row_starts=np.concatenate(([0], np.cumsum(lengths)[:-1])),
+            values=np.repeat(1 / np.sqrt(np.maximum(lengths, 1)), lengths).astype(np.float32)
+        )
+
+    def subset(self, mask: np.ndarray) -> "Examples":
+        rows = np.flatnonzero(mask)
+        return Examples.build([self.hashed[i] for i in rows], self.targets[rows], self.weights[rows])
+
+
+class LocalMerchantModel:
+    """
+    Multinomial logistic regression over hashed character n-grams of merchant names, trained on
+    a tenant's own labeled transactions and special rules, with no network access.
+
+    Weights are kept only for n-grams seen in training (sorted hashes, found with a binary
+    search), so a model of a few thousand merchants is a few megabytes and classifies a name in
+    tens of microseconds. Softmax probabilities are rescaled by a temperature fitted on held-out
+    merchants, so the confidence of names it has never seen is roughly the chance it is right.
+    """
+
+    def __init__(
+            self,
+            labels: List[Tuple[str, str]],
+            features: np.ndarray,
+            weights: np.ndarray,
+            bias: np.ndarray,
+            temperature: float = 1.0,
+            merchant_count: int = 0,
+            calibrated_count: int = 0,
+            holdout_accuracy: Optional[float] = None,
+            trained_at: Optional[datetime] = None
+    ):
+        self.labels = labels
+        self.features = features
+        self.weights = weights
+        self.bias = bias
+        self.temperature = temperature
+        self.merchant_count = merchant_count
+        self.calibrated_count = calibrated_count
+        self.holdout_accuracy = holdout_accuracy
+        self.trained_at = trained_at or datetime.now()
+        self._rows = dict(zip(features.tolist(), range(len(features))))
+
+    @property
+    def calibrated(self) -> bool:
+        """Whether the temperature was fitted on held-out merchants; until then confidences are raw softmax"""
+        return self.holdout_accuracy is not None
+
+    def predict(self, name: str) -> Tuple[str, str, float]:
+        """(primary category, subcategory, calibrated confidence) of a merchant name"""
+        probabilities = self.predict_proba(name)
+        best = int(probabilities.argmax())
+        primary, subcategory = self.labels[best]
+        return primary, subcategory, float(probabilities[best])
+
+    def predict_proba(self, name: str) -> np.ndarray:
+        hashed = merchant_features(name)
+        rows = [self._rows[feature] for feature in hashed if feature in self._rows]
+        logits = (self.bias + self.weights[rows].sum(axis=0) / np.sqrt(len(hashed))) / self.temperature
+        exp = np.exp(logits - logits.max())
+        return exp / exp.sum()
+
+    @classmethod
+    def fit(
+            cls,
+            names: Sequence[str],
+            labels: Sequence[Tuple[str, str]],
+            weights: Optional[Sequence[float]] = None,
+            previous: Optional["LocalMerchantModel"] = None
+    ) -> "LocalMerchantModel":
+        """
+        Train on one label per merchant.
+
+        With a ``previous`` model, training starts from its weights for the labels and n-grams
+        both share and keeps its temperature, so a retrain after some new labels takes a fraction
+        of the epochs. Once the merchants have grown by ``RECALIBRATE_GROWTH`` since the last
+        calibration (or the previous model was never calibrated) the temperature is fitted again
+        on held-out merchants, see ``_calibrate``. A model with fewer than ``MIN_HOLDOUT``
+        merchants stays uncalibrated.
+        """
+        label_list = sorted(set(labels))
+        label_index = {label: i for i, label in enumerate(label_list)}
+        targets = np.array([label_index[label] for label in labels], dtype=np.int64)
+        weights = np.ones(len(names), dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+        examples = Examples.build(
+            [np.fromiter(merchant_features(name), dtype=np.uint32) for name in names], targets, weights
+        )
+
+        recalibrate = (
+            previous is None or not previous.calibrated
+            or len(names) >= previous.calibrated_count * RECALIBRATE_GROWTH
+        )
+        if not recalibrate:
+            temperature, holdout_accuracy = previous.temperature, previous.holdout_accuracy
+            calibrated_count = previous.calibrated_count
+        else:
+            temperature, holdout_accuracy, calibrated_count = 1.0, None, 0
+            buckets = np.array([zlib.crc32(name.encode()) % HOLDOUT_BUCKETS for name in names])
+            calibration = _calibrate(examples, buckets, label_list)
+            if calibration is not None:
+                temperature, holdout_accuracy, split = calibration
+                calibrated_count = len(names)
+                # Continue from the model trained without the held-out merchants, or from scratch
+                # after cross-validation, rather than from one that saw them
+                previous = cls(label_list, *split) if split else None
+
+        model_weights, bias = _train(examples, len(label_list), *_initial(previous, examples.features, label_list))
+        return cls(
+            label_list, examples.features, model_weights, bias, temperature=temperature,
+            merchant_count=len(names), calibrated_count=calibrated_count, holdout_accuracy=holdout_accuracy
+        )
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path, features=self.features, weights=self.weights, bias=self.bias,
+            primary=np.array([primary for primary, _ in self.labels]),
+            subcategory=np.array([subcategory for _, subcategory in self.labels]),
+            temperature=self.temperature, merchant_count=self.merchant_count, calibrated_count=self.calibrated_count,
+            holdout_accuracy=np.nan if self.holdout_accuracy is None else self.holdout_accuracy,
+            trained_at=self.trained_at.timestamp()
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LocalMerchantModel"]:
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            holdout_accuracy = float(data["holdout_accuracy"])
+            return cls(
+                labels=list(zip(data["primary"].tolist(), data["subcategory"].tolist())),
+                features=data["features"], weights=data["weights"], bias=data["bias"],
+                temperature=float(data["temperature"]), merchant_count=int(data["merchant_count"]),
+                calibrated_count=int(data["calibrated_count"]),
+                holdout_accuracy=None if np.isnan(holdout_accuracy) else holdout_accuracy,
+                trained_at=datetime.fromtimestamp(float(data["trained_at"]))
+            )
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _logits(examples: Examples, weights: np.ndarray, bias: np.ndarray) -> np.ndarray:
+    contributions = weights[examples.columns] * examples.values[:, None]
+    return np.add.reduceat(contributions, examples.row_starts, axis=0) + bias
+
+
+def _transfer(features: np.ndarray, weights: np.ndarray, to_features: np.ndarray) -> np.ndarray:
+    """Rows of ``weights`` (one per hash in ``features``) for ``to_features``, zero for unseen hashes"""
+    transferred = np.zeros((len(to_features), weights.shape[1]), dtype=np.float32)
+    _, ours, theirs = np.intersect1d(to_features, features, assume_unique=True, return_indices=True)
+    transferred[ours] = weights[theirs]
+    return transferred
+
+
+def _initial(previous: Optional[LocalMerchantModel], features: np.ndarray, labels: List[Tuple[str, str]]) -> tuple:
+    """Starting weights, bias and epoch count: the previous model's where it has them, zero otherwise"""
+    weights = np.zeros((len(features), len(labels)), dtype=np.float32)
+    bias = np.zeros(len(labels), dtype=np.float32)
+    if previous is None:
+        return weights, bias, EPOCHS
+
+    previous_index = {label: i for i, label in enumerate(previous.labels)}
+    shared = [(i, previous_index[label]) for i, label in enumerate(labels) if label in previous_index]
+    if not shared:
+        return weights, bias, EPOCHS
+    ours, theirs = (np.array(indices) for indices in zip(*shared))
+    _, rows, previous_rows = np.intersect1d(features, previous.features, assume_unique=True, return_indices=True)
+    weights[np.ix_(rows, ours)] = previous.weights[np.ix_(previous_rows, theirs)]
+    bias[ours] = previous.bias[theirs]
+    return weights, bias, WARM_EPOCHS
+
+
+def _train(examples: Examples, label_count: int, weights: np.ndarray, bias: np.ndarray, epochs: int) -> tuple:
+    """Full-batch Adam on the weighted cross-entropy with a small L2 penalty"""
+    one_hot = np.eye(label_count, dtype=np.float32)[examples.targets]
+    sample_weights = (examples.weights / examples.weights.sum())[:, None].astype(np.float32)
+    rows = np.repeat(np.arange(len(examples.hashed)), [len(row) for row in examples.hashed])
+    # Gradients are summed per feature column; sorting the nonzeros by column once turns that into a reduceat
+    order = np.argsort(examples.columns, kind="stable")
+    column_starts = np.searchsorted(examples.columns[order], np.arange(len(examples.features)))
+    sorted_rows, sorted_values = rows[order], examples.values[order, None]
+
+    moments = [np.zeros_like(weights), np.zeros_like(weights), np.zeros_like(bias), np.zeros_like(bias)]
+    beta1, beta2 = 0.9, 0.999
+    for step in range(1, epochs + 1):
+        errors = (_softmax(_logits(examples, weights, bias)) - one_hot) * sample_weights
+        contributions = errors[sorted_rows] * sorted_values
+        weight_gradient = np.add.reduceat(contributions, column_starts, axis=0) + L2 * weights
+        bias_gradient = errors.sum(axis=0)
+
+        correction = np.sqrt(1 - beta2 ** step) / (1 - beta1 ** step)
+        for parameter, gradient, first, second in (
+                (weights, weight_gradient, moments[0], moments[1]),
+                (bias, bias_gradient, moments[2], moments[3])
+        ):
+            first *= beta1
+            first += (1 - beta1) * gradient
+            second *= beta2
+            second += (1 - beta2) * gradient ** 2
+            parameter -= LEARNING_RATE * correction * first / (np.sqrt(second) + 1e-8)
+    return weights, bias
+
+
+def _calibrate(examples: Examples, buckets: np.ndarray, labels: List[Tuple[str, str]]) -> Optional[tuple]:
+    """
+    (temperature, held-out accuracy, split model or None) fitted on merchants the model wasn't
+    trained on, or None with fewer than ``MIN_HOLDOUT`` merchants to hold out. The split model
+    is the (features, weights, bias) of a model trained without the held-out merchants.
+
+    Bucket 0 of the name hashes is held out when it has ``MIN_HOLDOUT`` merchants, and the
+    model trained on the rest is returned for the final training to start from. Smaller
+    histories are cross-validated instead: each bucket is held out in turn and the temperature
+    is fitted on all the out-of-fold predictions, so the first model (at
+    ``LOCAL_CLASSIFIER_MIN_MERCHANTS``) is calibrated too. Calibration models are trained from
+    scratch: a previous model has seen the held-out merchants.
+    """
+    single = np.count_nonzero(buckets == 0) >= MIN_HOLDOUT
+    if not single and len(buckets) < MIN_HOLDOUT:
+        return None
+
+    held_logits, held_targets, held_weights = [], [], []
+    split = None
+    for bucket in [0] if single else range(HOLDOUT_BUCKETS):
+        holdout = buckets == bucket
+        if holdout.all() or not holdout.any():
+            continue
+        train = examples.subset(~holdout)
+        split_weights, split_bias = _train(train, len(labels), *_initial(None, train.features, labels))
+        held = examples.subset(holdout)
+        held_logits.append(_logits(held, _transfer(train.features, split_weights, held.features), split_bias))
+        held_targets.append(held.targets)
+        held_weights.append(held.weights)
+        if single:
+            split = (train.features, split_weights, split_bias)
+    if not held_logits:
+        return None
+
+    logits, targets, weights = np.concatenate(held_logits), np.concatenate(held_targets), np.concatenate(held_weights)
+    temperature = _fit_temperature(logits, targets, weights)
+    accuracy = float(np.average(logits.argmax(axis=1) == targets, weights=weights))
+    return temperature, accuracy, split
+
+
+def _fit_temperature(logits: np.ndarray, targets: np.ndarray, weights: np.ndarray) -> float:
+    """Temperature minimizing the weighted log loss of held-out predictions"""
+    losses = []
+    for temperature in TEMPERATURES:
+        probabilities = _softmax(logits / temperature)[np.arange(len(targets)), targets]
+        losses.append(-np.average(np.log(np.maximum(probabilities, 1e-12)), weights=weights))
+    return float(TEMPERATURES[int(np.argmin(losses))])
+
+
+def training_examples(db: Session, tenant_id: str, rules: List[Dict[str, str]]) -> tuple:
+    """
+    (merchant names, (primary, subcategory) labels, weights) from the tenant's transactions and
+    special rules. A merchant's label is the one most of its transactions have; its weight grows
+    with the log of its transaction count. Rules override transactions and weigh ``RULE_WEIGHT``.
+    """
+    counts = defaultdict(Counter)
+    for merchant, primary, subcategory, count in TransactionCrud.get_merchant_labels(
+            db, tenant_id, settings.LOCAL_CLASSIFIER_MIN_LABEL_CONFIDENCE, LOCAL_DESCRIPTION
+    ):
+        counts[merchant.upper()][(primary, subcategory)] += count
+
+    examples = {}
+    for merchant, labels in counts.items():
+        label, _ = labels.most_common(1)[0]
+        examples[merchant] = (label, float(np.log1p(sum(labels.values()))))
+    for rule in rules:
+        examples[rule["merchant"].upper()] = ((rule["category"], rule["subcategory"]), RULE_WEIGHT)
+
+    names = list(examples)
+    return names, [examples[name][0] for name in names], [examples[name][1] for name in names]
+
@@ -0,0 +1,205 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.logger import logger
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.crud import AnalysisRunCrud, RecurringPaymentCrud, TransactionCrud
+from app.models.recurring_payment_model import RecurringPaymentModel
+from app.models.schemas import RecurringPayment, RecurringPaymentList
+
+# Median days between charges accepted for each cadence
+CADENCES = (
+    ("weekly", 6, 8),
+    ("biweekly", 13, 16),
+    ("monthly", 26, 33),
+    ("quarterly", 85, 97),
+    ("yearly", 355, 375),
+)
+MIN_OCCURRENCES = 3
+MIN_REGULARITY = 0.75  # Share of intervals within tolerance of the median interval
+MAX_AMOUNT_VARIATION = 0.35  # Utility bills vary month to month; subscriptions barely at all
+AVERAGE_MONTH_DAYS = 30.44
+
+EPOCH = datetime(1970, 1, 1)
+
+FULL_RUN = "recurring"  # AnalysisRunCrud name of a detection over the whole history
+
+
+class Detections(NamedTuple):
+    """Per-merchant results of detect_recurring, one entry per detected merchant code"""
+    codes: np.ndarray
+    cadences: np.ndarray
+    period_days: np.ndarray
+    typical_amounts: np.ndarray
+    amount_variations: np.ndarray
+    regularity: np.ndarray
+    occurrences: np.ndarray
+    first_days: np.ndarray
+    last_days: np.ndarray
+
+
+def _interval_tolerance(period_days: np.ndarray) -> np.ndarray:
+    return np.maximum(2.0, 0.15 * period_days)
+
+
+def group_medians(codes: np.ndarray, values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Lower median of ``values`` per code (NaN for codes without values) with one sort"""
+    ordered = values[np.lexsort((values, codes))]
+    starts = np.cumsum(counts) - counts
+    medians = np.full(len(counts), np.nan)
+    present = counts > 0
+    medians[present] = ordered[starts[present] + (counts[present] - 1) // 2]
+    return medians
+
+
+def detect_recurring(
+        codes: np.ndarray,
+        days: np.ndarray,
+        amounts: np.ndarray,
+        original_amounts: np.ndarray,
+        merchant_count: int
+) -> Detections:
+    """
+    Find merchants charged at a regular cadence for a stable amount, in one vectorized pass over
+    every transaction. ``codes`` maps each transaction to a merchant in ``range(merchant_count)``;
+    ``days`` are fractional day numbers.
+
+    A merchant is recurring when it has at least MIN_OCCURRENCES charges, its median interval
+    falls in one of the CADENCES, most intervals are close to that median, and the
+    original-currency amounts vary little (so USD subscriptions aren't penalised for JMD rate moves).
+    """
+    order = np.lexsort((days, codes))
+    codes, days = codes[order], days[order]
+    amounts, original_amounts = amounts[order], original_amounts[order]
+
+    counts = np.bincount(codes, minlength=merchant_count)
+    starts = np.cumsum(counts) - counts
+
+    # Intervals between consecutive charges of the same merchant
+    same_merchant = codes[1:] == codes[:-1]
+    intervals = np.diff(days)[same_merchant]
+    interval_codes = codes[1:][same_merchant]
+    interval_counts = np.bincount(interval_codes, minlength=merchant_count)
+
+    period = group_medians(interval_codes, intervals, interval_counts)
+    tolerance = _interval_tolerance(period)
+    regular = np.abs(intervals - period[interval_codes]) <= tolerance[interval_codes]
+    regularity = np.bincount(interval_codes, weights=regular, minlength=merchant_count) / np.maximum(interval_counts, 1)
+
+    totals = np.bincount(codes, weights=original_amounts, minlength=merchant_count)
+    squares = np.bincount(codes, weights=original_amounts ** 2, minlength=merchant_count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = totals / counts
+        variation = np.sqrt(np.maximum(squares / counts - means ** 2, 0)) / np.abs(means)
+
+    cadence = np.full(merchant_count, -1)
+    for index, (_, low, high) in enumerate(CADENCES):
+        cadence[(period >= low) & (period <= high)] = index
+
+    detected = np.flatnonzero(
+        (counts >= MIN_OCCURRENCES) & (cadence >= 0) & (regularity >= MIN_REGULARITY) & (variation <= MAX_AMOUNT_VARIATION)
+    )
+    typical = group_medians(codes, amounts, counts)
+
+    return Detections(
+        codes=detected,
+        cadences=cadence[detected],
+        period_days=period[detected],
+        typical_amounts=typical[detected],
+        amount_variations=variation[detected],
+        regularity=regularity[detected],
+        occurrences=counts[detected],
+        first_days=days[starts[detected]],
+        last_days=days[starts[detected] + counts[detected] - 1],
+    )
+
+
+def _to_date(day: float) -> date:
+    return (EPOCH + timedelta(days=float(day))).date()
+
+
+class RecurringPaymentService:
+    def __init__(self, db: Session, tenant_id: str = DEFAULT_TENANT):
+        self.db = db
+        self.tenant_id = tenant_id
+
+    def refresh(self, merchants: Optional[Iterable[str]] = None) -> int:
+        """
+        Re-run detection for the given merchants, or for the whole history when None or when no
+        full run has completed for the tenant yet. Returns the number of recurring payments found.
+        """
+        if merchants is not None:
+            merchants = [merchant for merchant in set(merchants) if merchant]
+            if not merchants:
+                return 0
+            if AnalysisRunCrud.get_completed_at(self.db, self.tenant_id, FULL_RUN) is None:
+                merchants = None
+
+        rows = TransactionCrud.get_merchant_series(self.db, self.tenant_id, merchants)
+        # Merchant codes in order of first appearance; a dict is much faster than np.unique on strings
+        names = {}
+        codes = np.fromiter((names.setdefault(row[0], len(names)) for row in rows), dtype=np.int64, count=len(rows))
+        columns = list(zip(*rows)) or [(), (), (), ()]
+        days, amounts, original_amounts = (np.array(column, dtype=float) for column in columns[1:])
+
+        detections = detect_recurring(codes, days, amounts, original_amounts, len(names))
+        merchant_names = list(names)
+        now = datetime.now()
+
+        payments = [
+            RecurringPaymentModel(
+                tenant_id=self.tenant_id,
+                merchant=merchant_names[code],
+                cadence=CADENCES[cadence][0],
+                period_days=round(float(period), 2),
+                typical_amount=Decimal(str(round(float(amount), 2))),
+                amount_variation=round(float(variation), 4),
+                regularity=round(float(regularity), 4),
+                occurrences=int(occurrences),
+                first_date=_to_date(first_day),
+                last_date=_to_date(last_day),
+                next_expected_date=_to_date(last_day + period),
+                updated_at=now
+            )
+            for code, cadence, period, amount, variation, regularity, occurrences, first_day, last_day in zip(*detections)
+        ]
+        RecurringPaymentCrud.replace_payments(self.db, self.tenant_id, payments, merchants)
+        if merchants is None:
+            # Marked even when nothing was found, so later syncs only revisit the merchants they touch
+            AnalysisRunCrud.mark_completed(self.db, self.tenant_id, FULL_RUN, now)
+        logger.debug(f"Recurring payment detection over {len(rows)} transactions found {len(payments)} for tenant {self.tenant_id}")
+        return len(payments)
+
+    def get_recurring(self, active_only: bool = True) -> RecurringPaymentList:
+        today = date.today()
+        payments = []
+        for model in RecurringPaymentCrud.get_payments(self.db, self.tenant_id):
+            # A payment is still running until it is clearly overdue
+            grace = timedelta(days=max(7.0, model.period_days / 2))
+            active = today <= model.next_expected_date + grace
+            if active_only and not active:
+                continue
+            payments.append(RecurringPayment(
+                merchant=model.merchant,
+                cadence=model.cadence,
+                period_days=model.period_days,
+                typical_amount=Decimal(str(model.typical_amount)),
+                amount_variation=model.amount_variation,
+                regularity=model.regularity,
+                occurrences=model.occurrences,
+                first_date=model.first_date,
+                last_date=model.last_date,
+                next_expected_date=model.next_expected_date,
+                active=active
+            ))
+
+        monthly_total = sum(
+            (payment.typical_amount * Decimal(str(AVERAGE_MONTH_DAYS / payment.period_days))
+             for payment in payments if payment.active),
+            Decimal("0")
+        )
+        return RecurringPaymentList(payments=payments, monthly_total=monthly_total.quantize(Decimal("0.01")))
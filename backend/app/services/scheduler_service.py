@@ -0,0 +1,134 @@
+"""
+Background Gmail sync, so the first read of the day doesn't pay for ingesting the night's mail.
+
+Every uvicorn worker starts a SyncScheduler, but only the one holding an exclusive lock on
+the scheduler lock file syncs; the others keep trying the lock each interval and take over
+if that worker exits. The lock is per host, so deployments spread over several machines
+should enable the scheduler on one of them only.
+
+The tenants synced are the allowed ones (TENANTS, or the default tenant without it) that have
+a Gmail token. Like the API, the scheduler doesn't serve the default tenant once TENANTS is set
+unless it is listed; start() warns when that leaves a default mailbox token unused.
+"""
+import asyncio
+import os
+import random
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows; a single worker is assumed
+    fcntl = None
+
+from app.config import get_settings
+from app.core.logger import logger
+from app.core.metrics import SCHEDULED_SYNCS
+from app.core.tenancy import DATA_DIR, DEFAULT_TENANT, allowed_tenant_ids, gmail_token_path
+from app.db.database import SessionLocal
+from app.services.tenant_services import get_email_archive, get_gmail_service, get_merchant_classifier
+from app.services.transaction_service import TransactionService
+
+settings = get_settings()
+
+# Spread out the first run so restarting every worker at once doesn't hit Gmail at once
+MAX_INITIAL_DELAY_SECONDS = 60
+
+
+class SyncScheduler:
+    def __init__(
+            self,
+            interval_minutes: int = settings.SCHEDULED_SYNC_INTERVAL_MINUTES,
+            jitter: float = settings.SCHEDULED_SYNC_JITTER,
+            lock_file: Optional[str] = None
+    ):
+        self.interval = interval_minutes * 60
+        self.jitter = jitter
+        self.lock_file = Path(lock_file or settings.SCHEDULED_SYNC_LOCK_FILE or DATA_DIR / "scheduler.lock")
+        self._lock_fd: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if DEFAULT_TENANT not in allowed_tenant_ids() and os.path.exists(gmail_token_path(DEFAULT_TENANT)):
+            logger.warning(f"The {DEFAULT_TENANT} tenant has a Gmail token but isn't in TENANTS, so its mail "
+                           f"won't be synced; add it to TENANTS to keep syncing it")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._release_lock()
+
+    def _next_delay(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _run(self):
+        await asyncio.sleep(random.uniform(0, min(MAX_INITIAL_DELAY_SECONDS, self.interval)))
+        while True:
+            if self._acquire_lock():
+                try:
+                    await self.run_once()
+                except Exception as e:
+                    logger.error(f"Scheduled sync failed: {str(e)}")
+            await asyncio.sleep(self._next_delay())
+
+    def _acquire_lock(self) -> bool:
+        """Hold the lock file for the life of the process; True while this worker is the syncing one"""
+        if self._lock_fd is not None or fcntl is None:
+            return True
+
+        self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        self._lock_fd = fd
+        logger.info(f"Scheduled sync running in this worker (pid {os.getpid()})")
+        return True
+
+    def _release_lock(self):
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    @staticmethod
+    def _tenant_ids() -> list:
+        # Tenants that never authorised Gmail can't be synced without a user at the browser
+        return [tenant_id for tenant_id in allowed_tenant_ids() if os.path.exists(gmail_token_path(tenant_id))]
+
+    async def run_once(self):
+        """Sync the recent mail of every tenant with a Gmail token, one tenant at a time"""
+        db = SessionLocal()
+        try:
+            for tenant_id in self._tenant_ids():
+                gmail_service = get_gmail_service(tenant_id)
+                try:
+                    if not await asyncio.to_thread(gmail_service.authorize, False):
+                        logger.warning(f"Skipping scheduled sync for tenant {tenant_id}: Gmail token needs re-authorising")
+                        continue
+
+                    service = TransactionService(
+                        gmail_service=gmail_service,
+                        classifier=get_merchant_classifier(tenant_id),
+                        db=db,
+                        archive=get_email_archive(tenant_id),
+                        tenant_id=tenant_id
+                    )
+                    synced = await service.sync_recent(settings.SYNC_WINDOW_DAYS)
+                except Exception as e:
+                    db.rollback()
+                    SCHEDULED_SYNCS.labels(outcome="failed").inc()
+                    logger.error(f"Scheduled sync for tenant {tenant_id} failed: {str(e)}")
+                    continue
+
+                SCHEDULED_SYNCS.labels(outcome="synced" if synced else "unchanged").inc()
+                logger.debug(f"Scheduled sync for tenant {tenant_id}: {'synced' if synced else 'mailbox unchanged'}")
+        finally:
+            db.close()
@@ -0,0 +1,34 @@
+"""
+Per-tenant service instances shared by API requests and the background scheduler.
+
+They are pooled so a tenant's requests and scheduled syncs reuse one authenticated Gmail
+client and a warm classifier cache; the least recently used tenants are dropped beyond
+TENANT_POOL_SIZE.
+"""
+from functools import lru_cache
+from typing import Optional
+
+from app.config import get_settings
+from app.core.tenancy import DEFAULT_TENANT, archive_dir, classifier_model_path, gmail_token_path, rules_file_path
+from app.services.archive_service import EmailArchive
+from app.services.classifier_service import MerchantClassifier
+from app.services.gmail_service import GmailService
+
+settings = get_settings()
+
+
+@lru_cache(maxsize=settings.TENANT_POOL_SIZE)
+def get_gmail_service(tenant_id: str = DEFAULT_TENANT) -> GmailService:
+    return GmailService(token_path=gmail_token_path(tenant_id))
+
+
+@lru_cache(maxsize=settings.TENANT_POOL_SIZE)
+def get_merchant_classifier(tenant_id: str = DEFAULT_TENANT) -> MerchantClassifier:
+    return MerchantClassifier(
+        rules_file_path=rules_file_path(tenant_id), model_path=classifier_model_path(tenant_id)
+    )
+
+
+@lru_cache(maxsize=settings.TENANT_POOL_SIZE)
+def get_email_archive(tenant_id: str = DEFAULT_TENANT) -> Optional[EmailArchive]:
+    return EmailArchive(tenant_id, archive_dir(tenant_id)) if settings.EMAIL_ARCHIVE_ENABLED else None
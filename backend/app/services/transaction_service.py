@@ -1,22 +1,41 @@
-import re
+import asyncio
 import uuid
-import aiohttp
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
-from app.core.logger import logger
 from app.config import get_settings
-from app.db.crud import TransactionCrud, SyncInfoCrud
+from app.core.events import get_event_bus
+from app.core.exceptions import GmailHistoryExpiredError, GmailNotAuthorizedError
+from app.core.logger import logger, sampled
+from app.core.metrics import SYNC_GAP_DAYS
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.crud import BudgetCrud, TransactionCrud, SyncInfoCrud
 from app.models.schemas import (
-    Transaction, TransactionSummary, CategorySummary,
-    EmailMessage, DateRange, CreateTransactionRequest
+    Transaction, TransactionSummary, CategorySummary, SummaryDelta, CategoryDelta, TransactionSearchResult,
+    EmailMessage, DateRange, CreateTransactionRequest, MerchantCategory
 )
+from app.models.sync_info_model import SyncInfoModel
+from app.models.transaction_model import TransactionModel
+from app.parsers.base import ParsedAlert
+from app.parsers.registry import get_template_registry
+from app.services.anomaly_service import AnomalyService
+from app.services.archive_service import EmailArchive
+from app.services.budget_service import BudgetService
 from app.services.classifier_service import MerchantClassifier
+from app.services.fx_service import FxService
 from app.services.gmail_service import GmailService
+from app.services.recurring_service import RecurringPaymentService
+
+settings = get_settings()
+
+CENT = Decimal("0.01")
+
+# Syncs are serialised within a tenant; different tenants sync concurrently
+_sync_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
 
 
 class TransactionService:
@@ -24,11 +43,16 @@ class TransactionService:
             self,
             gmail_service: GmailService,
             classifier: MerchantClassifier,
-            db: Session
+            db: Session,
+            archive: Optional[EmailArchive] = None,
+            tenant_id: str = DEFAULT_TENANT
     ):
         self.gmail_service = gmail_service
         self.classifier = classifier
         self.db = db
+        self.archive = archive
+        self.tenant_id = tenant_id
+        self.fx = FxService(db)
 
     async def get_transactions(
             self,
@@ -50,50 +74,300 @@ class TransactionService:
 
         # Then retrieve transactions from database with filters
         db_transactions = TransactionCrud.get_transactions(
-            self.db, date_range, categories, category, subcategory, min_confidence, include_excluded, limit, offset
+            self.db, self.tenant_id, date_range, categories, category, subcategory, min_confidence, include_excluded,
+            limit, offset
         )
 
         # Convert DB models to Pydantic models
-        return [
-            Transaction(
-                id=uuid.UUID(tx.id),
-                date=tx.date,
-                amount=Decimal(str(tx.amount)),
-                merchant=tx.merchant,
-                primary_category=tx.primary_category,
-                subcategory=tx.subcategory,
-                confidence=tx.confidence,
-                description=tx.description,
-                excluded=tx.excluded,
-                original_currency=tx.original_currency,
-                original_amount=Decimal(str(tx.original_amount)) if tx.original_amount else None,
-                exchange_rate=Decimal(str(tx.exchange_rate)) if tx.exchange_rate else None,
-                exchange_rate_date=tx.exchange_rate_date,
-                card_type=tx.card_type
-            ) for tx in db_transactions
-        ]
+        return [self._to_transaction(tx) for tx in db_transactions]
+
+    @staticmethod
+    def _to_transaction(tx: TransactionModel) -> Transaction:
+        return Transaction(
+            id=uuid.UUID(tx.id),
+            date=tx.date,
+            amount=Decimal(str(tx.amount)),
+            merchant=tx.merchant,
+            primary_category=tx.primary_category,
+            subcategory=tx.subcategory,
+            confidence=tx.confidence,
+            description=tx.description,
+            excluded=tx.excluded,
+            original_currency=tx.original_currency,
+            original_amount=Decimal(str(tx.original_amount)) if tx.original_amount else None,
+            exchange_rate=Decimal(str(tx.exchange_rate)) if tx.exchange_rate else None,
+            exchange_rate_date=tx.exchange_rate_date,
+            card_type=tx.card_type,
+            gmail_message_id=tx.gmail_message_id
+        )
 
     async def _sync_transactions(self, date_range: DateRange):
         """Fetch transactions from Gmail and store in SQLite if not already present"""
+        # A request can't wait on the OAuth browser flow; tenants sign in with `python -m app.authorize`
+        if not await asyncio.to_thread(self.gmail_service.authorize, False):
+            raise GmailNotAuthorizedError(
+                f"Gmail is not authorized for tenant '{self.tenant_id}'; run `python -m app.authorize --tenant {self.tenant_id}`"
+            )
+
+        # One sync per tenant at a time; a request that had to wait finds its gaps already covered
+        async with _sync_locks[self.tenant_id]:
+            await self._sync_gaps(date_range)
+
+    async def sync_recent(self, days: int) -> bool:
+        """
+        Sync the last ``days`` days for the background scheduler. When every gap is newer than
+        the stored history ID and the mailbox's history ID hasn't moved, nothing can have arrived,
+        so the range is marked covered without listing messages. Returns whether Gmail was synced.
+        """
+        now = datetime.now()
+        # Ending after now lets the sync record a history ID, as reads of the current month do
+        date_range = DateRange(start_date=now - timedelta(days=days), end_date=now + timedelta(days=1))
+
+        async with _sync_locks[self.tenant_id]:
+            sync_info = SyncInfoCrud.get_last_sync(self.db, self.tenant_id)
+            sync_gaps = SyncInfoCrud.get_sync_gaps(self.db, self.tenant_id, date_range)
+            if not sync_gaps:
+                return False
+
+            if all(self._can_sync_incrementally(sync_info, gap) for gap in sync_gaps):
+                history_id = await asyncio.to_thread(self.gmail_service.get_history_id)
+                if history_id == sync_info.history_id:
+                    SyncInfoCrud.add_coverage(self.db, self.tenant_id, sync_info.history_date, now)
+                    SyncInfoCrud.update_last_sync(self.db, self.tenant_id)
+                    SyncInfoCrud.update_history(self.db, self.tenant_id, history_id, now)
+                    return False
+
+            await self._sync_gaps(date_range)
+            return True
+
+    async def _sync_gaps(self, date_range: DateRange):
         # Only sync the gaps that haven't been synced yet
-        sync_gaps = SyncInfoCrud.get_sync_gaps(self.db, date_range)
+        sync_gaps = SyncInfoCrud.get_sync_gaps(self.db, self.tenant_id, date_range)
         
         if not sync_gaps:
             return  # No gaps to sync
-            
-        for gap in sync_gaps:
-            query = self._build_gmail_query(gap)
-            emails = self.gmail_service.get_messages(query)
 
-            for email in emails:
-                transaction = await self._parse_transaction(email)
-                if transaction and not TransactionCrud.transaction_exists(self.db, transaction):
-                    TransactionCrud.create_transaction(self.db, transaction)
+        sync_info = SyncInfoCrud.get_last_sync(self.db, self.tenant_id)
+        sync_started = datetime.now()
+        history_id = None
+        events = get_event_bus(self.tenant_id)
+        events.publish("sync_progress", {
+            "stage": "started", "gaps": len(sync_gaps),
+            "start_date": sync_gaps[0].start_date, "end_date": sync_gaps[-1].end_date
+        })
+        created = 0
+
+        for index, gap in enumerate(sync_gaps):
+            emails = None
+            SYNC_GAP_DAYS.observe((gap.end_date - gap.start_date).total_seconds() / 86400)
+
+            if history_id is None and self._can_sync_incrementally(sync_info, gap):
+                try:
+                    emails, history_id = await asyncio.to_thread(
+                        self.gmail_service.get_messages_since,
+                        sync_info.history_id, get_template_registry().find_template
+                    )
+                    logger.info(f"Incremental sync fetched {len(emails)} new alerts since history {sync_info.history_id}")
+                except GmailHistoryExpiredError:
+                    logger.info("Gmail history has expired, falling back to a windowed sync")
+
+            if emails is None:
+                query = self._build_gmail_query(gap)
+                # The Gmail client blocks; keep it off the event loop so other tenants aren't stalled
+                emails = await asyncio.to_thread(self.gmail_service.get_messages, query)
+
+            gap_created = await self.ingest_emails(emails)
+            created += gap_created
+            events.publish("sync_progress", {
+                "stage": "gap", "index": index, "gaps": len(sync_gaps),
+                "start_date": gap.start_date, "end_date": gap.end_date,
+                "messages": len(emails), "created": gap_created
+            })
+
+            # Coverage can't extend past now, or mail arriving later in the window would be skipped
+            covered_end = min(gap.end_date, sync_started)
+            if covered_end > gap.start_date:
+                SyncInfoCrud.add_coverage(self.db, self.tenant_id, gap.start_date, covered_end)
+
+        SyncInfoCrud.update_last_sync(self.db, self.tenant_id)
+
+        # A history ID is only a valid resume point if everything up to now has been synced
+        if sync_gaps[-1].end_date >= sync_started:
+            if history_id is None:
+                history_id = await asyncio.to_thread(self.gmail_service.get_history_id)
+            SyncInfoCrud.update_history(self.db, self.tenant_id, history_id, sync_started)
+
+        events.publish("sync_progress", {"stage": "completed", "created": created})
+
+    async def ingest_emails(self, emails: List[EmailMessage]) -> int:
+        """Parse, batch-classify and bulk insert alert emails, returning the number of new transactions"""
+        if self.archive:
+            self.archive.add(self.db, emails)
+
+        # Emails that already produced a transaction (an overlapping re-sync) are dropped before
+        # any parsing, classification or exchange rate lookups
+        ingested = TransactionCrud.get_ingested_message_ids(
+            self.db, self.tenant_id, [email.message_id for email in emails if email.message_id]
+        )
+        emails = [email for email in emails if email.message_id not in ingested]
+
+        alerts = []
+        for email in emails:
+            alert = get_template_registry().parse(email)
+            if alert:
+                alerts.append((email, alert))
+            else:
+                sampled("parse_failed").warning("Failed to parse transaction from email dated {}", email.date)
+
+        classifications = await self.classifier.classify_merchants(alert.merchant for _, alert in alerts)
+        # One rate lookup for the whole batch, however many foreign-currency alerts it has
+        rates = await self.fx.get_rates((email.date.date(), alert.currency) for email, alert in alerts)
+
+        transactions = []
+        for email, alert in alerts:
+            transaction = await self._parse_transaction(email, alert, classifications.get(alert.merchant), rates)
+            if transaction:
+                transactions.append(transaction)
+
+        # The unique (tenant_id, gmail_message_id) index skips anything a concurrent sync inserted meanwhile
+        new_transactions = list({
+            transaction.gmail_message_id or transaction.id: transaction for transaction in transactions
+        }.values())
+        created_ids = TransactionCrud.create_transactions(self.db, self.tenant_id, new_transactions)
+        # Rows a concurrent sync inserted first were skipped, and were announced by that sync
+        created = [transaction for transaction in new_transactions if str(transaction.id) in created_ids]
+        if created:
+            self._publish_transactions("transactions_created", created)
+            self._refresh_recurring({transaction.merchant for transaction in created})
+            self._score_anomalies(created)
+            self._check_budgets()
+            await self._retrain_classifier()
+        return len(created)
+
+    async def _retrain_classifier(self):
+        """Fold merchants labeled since the local classifier was trained into it, once there are enough"""
+        if not self.classifier.needs_training():
+            return
+        try:
+            await self.classifier.retrain(self.db, self.tenant_id)
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Local classifier training failed: {str(e)}")
 
-        # Update the sync info with the originally requested range
-        start_date = date_range.start_date if date_range else None
-        end_date = date_range.end_date if date_range else None
-        SyncInfoCrud.update_last_sync(self.db, start_date, end_date)
+    def _refresh_recurring(self, merchants: set):
+        """Re-detect recurring payments for merchants that just got new transactions"""
+        try:
+            RecurringPaymentService(self.db, self.tenant_id).refresh(merchants)
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Recurring payment detection failed: {str(e)}")
+
+    def _check_budgets(self):
+        """Announce budgets that spend just took past an alert threshold"""
+        try:
+            BudgetService(self.db, self.tenant_id).check_thresholds()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Budget threshold check failed: {str(e)}")
+
+    def _score_anomalies(self, transactions: List[Transaction]):
+        """Flag unusual charges and category spikes among new transactions and notify live subscribers"""
+        try:
+            anomalies = AnomalyService(self.db, self.tenant_id).score(transactions)
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Anomaly scoring failed: {str(e)}")
+            return
+        if anomalies:
+            get_event_bus(self.tenant_id).publish("anomalies_detected", {
+                "anomalies": [anomaly.model_dump(mode="json") for anomaly in anomalies]
+            })
+
+    async def reprocess_emails(self, emails: List[EmailMessage], reclassify: bool = False) -> Tuple[int, int]:
+        """
+        Re-parse archived alert emails, updating the transactions they produced and adding any
+        that previously failed to parse. Existing categories are kept unless ``reclassify`` is set,
+        and stored exchange rates are reused so no network calls are needed for known rows.
+        Returns the number of (updated, created) transactions.
+        """
+        existing = TransactionCrud.get_transactions_by_message_ids(
+            self.db, self.tenant_id, [email.message_id for email in emails if email.message_id]
+        )
+
+        alerts = []
+        for email in emails:
+            alert = get_template_registry().parse(email)
+            if alert:
+                alerts.append((email, alert))
+
+        merchants = {
+            alert.merchant for email, alert in alerts
+            if reclassify or email.message_id not in existing or existing[email.message_id].merchant != alert.merchant
+        }
+        classifications = await self.classifier.classify_merchants(merchants)
+        # Stored rates are reused, so only new rows and currency changes need rates
+        rates = await self.fx.get_rates(
+            (email.date.date(), alert.currency) for email, alert in alerts
+            if not self._has_rate(existing.get(email.message_id), alert.currency)
+        )
+
+        updated = 0
+        new_transactions = []
+        # Budget spend of updated rows before and after re-parsing
+        uncounted, counted = [], []
+        for email, alert in alerts:
+            tx = existing.get(email.message_id)
+            classification = classifications.get(alert.merchant)
+
+            if tx is None:
+                transaction = await self._parse_transaction(email, alert, classification, rates)
+                if transaction:
+                    new_transactions.append(transaction)
+                continue
+
+            spend_before = BudgetCrud.spend_row(tx)
+            if alert.currency == settings.HOME_CURRENCY:
+                tx.amount = alert.amount
+            elif self._has_rate(tx, alert.currency):
+                tx.amount = (alert.amount * Decimal(str(tx.exchange_rate))).quantize(CENT)
+            elif (email.date.date(), alert.currency) in rates:
+                tx.exchange_rate = rates[(email.date.date(), alert.currency)]
+                tx.exchange_rate_date = email.date.date()
+                tx.amount = (alert.amount * tx.exchange_rate).quantize(CENT)
+            else:
+                sampled("fx_rate_failed").error("No {} exchange rate for {}, keeping stored amount", alert.currency, email.date.date())
+                continue
+            tx.original_currency = alert.currency
+            tx.original_amount = alert.amount
+            tx.merchant = alert.merchant
+            tx.card_type = alert.card_type
+            if classification:
+                tx.primary_category = classification.primary_category
+                tx.subcategory = classification.subcategory
+                tx.confidence = classification.confidence
+                tx.description = classification.description
+            if not tx.excluded:
+                uncounted.append(spend_before)
+                counted.append(BudgetCrud.spend_row(tx))
+            updated += 1
+
+        BudgetCrud.add_spend(self.db, self.tenant_id, uncounted, sign=-1)
+        BudgetCrud.add_spend(self.db, self.tenant_id, counted)
+        self.db.commit()
+        created = TransactionCrud.create_transactions(self.db, self.tenant_id, new_transactions)
+        return updated, len(created)
+
+    @staticmethod
+    def _has_rate(tx: Optional[TransactionModel], currency: str) -> bool:
+        """Whether a stored transaction already has a rate for converting from ``currency``"""
+        return tx is not None and tx.original_currency == currency and bool(tx.exchange_rate)
+
+    @staticmethod
+    def _can_sync_incrementally(sync_info: Optional[SyncInfoModel], gap: DateRange) -> bool:
+        """History covers everything after history_date, so it can only replace gaps starting later"""
+        if not sync_info or not sync_info.history_id or not sync_info.history_date:
+            return False
+        return gap.start_date >= sync_info.history_date
 
     async def get_summary(
             self,
@@ -136,114 +410,54 @@ class TransactionService:
             merchants=list(set(t.merchant for t in included_transactions))
         )
 
-    async def _get_usd_to_jmd_rate(self, transaction_date: datetime) -> Decimal:
-        """
-        Fetch USD to JMD exchange rate for a specific date using fawazahmed0's currency API.
-        Falls back to latest rate if historical data is not available.
-        """
-        try:
-            # Format date as YYYY-MM-DD for the API
-            date_str = transaction_date.strftime("%Y-%m-%d")
-            
-            # Try to get historical rate for the specific date
-            historical_url = f"https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@{date_str}/v1/currencies/usd.json"
-            
-            async with aiohttp.ClientSession() as session:
-                try:
-                    # First try historical rate
-                    async with session.get(historical_url, timeout=10) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            jmd_rate = data.get("usd", {}).get("jmd")
-                            if jmd_rate:
-                                logger.info(f"Using historical USD to JMD rate for {date_str}: {jmd_rate}")
-                                return Decimal(str(jmd_rate))
-                except (aiohttp.ClientError, KeyError, ValueError):
-                    logger.warning(f"Historical rate not available for {date_str}, falling back to latest")
-                
-                # Fallback to latest rate
-                latest_url = "https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@latest/v1/currencies/usd.json"
-                async with session.get(latest_url, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        jmd_rate = data.get("usd", {}).get("jmd")
-                        if jmd_rate:
-                            logger.info(f"Using latest USD to JMD rate for {date_str}: {jmd_rate}")
-                            return Decimal(str(jmd_rate))
-                        else:
-                            raise ValueError("JMD rate not found in API response")
-                    else:
-                        raise ValueError(f"API returned status {response.status}")
-                        
-        except Exception as e:
-            logger.error(f"Failed to fetch USD to JMD exchange rate: {str(e)}")
-            # Fallback to hardcoded rate as last resort
-            fallback_rate = Decimal('159')
-            logger.warning(f"Using fallback USD to JMD rate: {fallback_rate}")
-            return fallback_rate
-
     @staticmethod
     def _build_gmail_query(date_range: DateRange) -> str:
-        settings = get_settings()
-        query = 'from:no-reply-ncbcardalerts@jncb.com'
+        query = get_template_registry().gmail_query()
 
         query += f' after:{int(date_range.start_date.timestamp())}'
         query += f' before:{int(date_range.end_date.timestamp())}'
-
-        query += f' "Transaction Approved" ("{settings.VISA_TYPE}" OR "{settings.MASTERCARD_TYPE}")'
         return query
 
     async def _parse_transaction(
             self,
-            email: EmailMessage
+            email: EmailMessage,
+            parsed: Optional[ParsedAlert] = None,
+            classification: Optional[MerchantCategory] = None,
+            rates: Optional[Dict[tuple, Decimal]] = None
     ) -> Optional[Transaction]:
+        """
+        Build a transaction from an alert, converting foreign amounts with ``rates`` (as returned by
+        FxService.get_rates for a whole batch) or a single rate lookup when not given
+        """
 
         try:
-            amount = 0.0
-            original_currency = None
-            original_amount = None
+            parsed = parsed or get_template_registry().parse(email)
+            if not parsed:
+                sampled("parse_failed").warning("Failed to parse transaction from email dated {}", email.date)
+                return None
+
+            amount = parsed.amount
+            merchant = parsed.merchant
             exchange_rate = None
             exchange_rate_date = None
 
-            amount_pattern = r'(?P<currency>USD|JMD)\s+(?P<amount>[\d,\.]+)'
-            amount_match = re.search(amount_pattern, email.body)
-
-            # Get both the currency and amount
-            if amount_match:
-                currency = amount_match.group('currency')  # Get currency from named group
-                raw_amount = Decimal(amount_match.group('amount').replace(',', ''))
-                
-                # Store original transaction details
-                original_currency = currency
-                original_amount = raw_amount
-                
-                if currency == 'USD':
-                    # Get historical exchange rate for the transaction date
-                    exchange_rate = await self._get_usd_to_jmd_rate(email.date)
-                    amount = raw_amount * exchange_rate
-                    exchange_rate_date = email.date.date()
-                    logger.info(f"Converted USD {raw_amount} to JMD {amount} using rate {exchange_rate} for date {exchange_rate_date}")
-                elif currency == 'JMD':
-                    amount = raw_amount
-
-            # Pattern for merchant - looks for content between Merchant and /div
-            merchant_pattern = r'Merchant</div></td>\s*<td[^>]*><div[^>]*>([^<]+)</div>'
-            merchant_match = re.search(merchant_pattern, email.body)
-            merchant = merchant_match.group(1).strip() if merchant_match else ""
-
-            # Extract card type from email body using config settings
-            settings = get_settings()
-            card_type = None
-            if settings.MASTERCARD_TYPE in email.body:
-                card_type = settings.MASTERCARD_TYPE
-            elif settings.VISA_TYPE in email.body:
-                card_type = settings.VISA_TYPE
-
-            if not amount or not merchant:
-                logger.warning(f"Failed to parse transaction from email dated {email.date}")
-                return None
+            if parsed.currency != settings.HOME_CURRENCY:
+                key = (email.date.date(), parsed.currency)
+                if rates is None:
+                    rates = await self.fx.get_rates([key])
+                exchange_rate = rates.get(key)
+                if exchange_rate is None:
+                    sampled("fx_rate_failed").error("No {} exchange rate for {}, skipping transaction", *key)
+                    return None
+                amount = (parsed.amount * exchange_rate).quantize(CENT)
+                exchange_rate_date = email.date.date()
+                sampled("fx_conversion").debug(
+                    "Converted {} {} to {} {} using rate {} for date {}",
+                    parsed.currency, parsed.amount, settings.HOME_CURRENCY, amount, exchange_rate, exchange_rate_date
+                )
 
-            classification = await self.classifier.classify_merchant(merchant)
+            if classification is None:
+                classification = await self.classifier.classify_merchant(merchant)
 
             return Transaction(
                 id=uuid.uuid4(),
@@ -254,11 +468,12 @@ class TransactionService:
                 subcategory=classification.subcategory,
                 confidence=classification.confidence,
                 description=classification.description,
-                original_currency=original_currency,
-                original_amount=original_amount,
+                original_currency=parsed.currency,
+                original_amount=parsed.amount,
                 exchange_rate=exchange_rate,
                 exchange_rate_date=exchange_rate_date,
-                card_type=card_type
+                card_type=parsed.card_type,
+                gmail_message_id=email.message_id
             )
         except Exception as e:
             logger.error(f"Error processing transaction: {str(e)}")
@@ -311,57 +526,71 @@ class TransactionService:
 
     async def set_transaction_exclusion(self, transaction_id: uuid.UUID, excluded: bool) -> Optional[Transaction]:
         """Set the exclusion status of a transaction"""
-        tx = TransactionCrud.set_exclusion(self.db, transaction_id, excluded)
+        previous = self.db.get(TransactionModel, str(transaction_id))
+        was_excluded = previous.excluded if previous and previous.tenant_id == self.tenant_id else None
+
+        tx = TransactionCrud.set_exclusion(self.db, self.tenant_id, transaction_id, excluded)
         if tx:
-            return Transaction(
-                id=uuid.UUID(tx.id),
-                date=tx.date,
-                amount=Decimal(str(tx.amount)),
-                merchant=tx.merchant,
-                primary_category=tx.primary_category,
-                subcategory=tx.subcategory,
-                confidence=tx.confidence,
-                description=tx.description,
-                excluded=tx.excluded,
-                original_currency=tx.original_currency,
-                original_amount=Decimal(str(tx.original_amount)) if tx.original_amount else None,
-                exchange_rate=Decimal(str(tx.exchange_rate)) if tx.exchange_rate else None,
-                exchange_rate_date=tx.exchange_rate_date,
-                card_type=tx.card_type
-            )
+            transaction = self._to_transaction(tx)
+            if was_excluded != excluded:
+                self._publish_transactions("transactions_updated", [transaction], sign=-1 if excluded else 1)
+                self._check_budgets()
+            return transaction
         return None
 
     async def _should_sync_transactions(self, date_range: DateRange = None) -> bool:
         """Determine if we need to sync transactions from Gmail using gap-based logic"""
         if not date_range:
             # If no specific range, check if we've synced today
-            last_sync_info = SyncInfoCrud.get_last_sync(self.db)
+            last_sync_info = SyncInfoCrud.get_last_sync(self.db, self.tenant_id)
             if not last_sync_info:
                 return True
             today = datetime.now().date()
             return last_sync_info.last_sync_date.date() != today
 
         # Use gap detection to determine if sync is needed
-        sync_gaps = SyncInfoCrud.get_sync_gaps(self.db, date_range)
+        sync_gaps = SyncInfoCrud.get_sync_gaps(self.db, self.tenant_id, date_range)
         return len(sync_gaps) > 0
 
     def update_category(self, merchant: str, category: str, subcategory: str) -> bool:
         """Update the category for a merchant"""
         updated_count = TransactionCrud.update_transactions_by_merchant(
-            self.db, merchant, category, subcategory
+            self.db, self.tenant_id, merchant, category, subcategory
         )
+        if updated_count:
+            self.classifier.label_changed(merchant)
+            get_event_bus(self.tenant_id).publish("category_updated", {
+                "merchant": merchant, "category": category, "subcategory": subcategory, "count": updated_count
+            })
+            self._check_budgets()
         return updated_count > 0
 
     def get_categories(self, date_range: DateRange, categories: Optional[List[dict]] = None, category: Optional[str] = None, subcategory: Optional[str] = None, min_confidence: float = 0.0, include_excluded: bool = True) -> dict:
         """Get categories efficiently from database"""
         return TransactionCrud.get_categories(
-            self.db, date_range, categories, category, subcategory, min_confidence, include_excluded
+            self.db, self.tenant_id, date_range, categories, category, subcategory, min_confidence, include_excluded
         )
 
     def get_transaction_count(self, date_range: DateRange, categories: Optional[List[dict]] = None, category: Optional[str] = None, subcategory: Optional[str] = None, min_confidence: float = 0.0, include_excluded: bool = True) -> int:
         """Get transaction count efficiently from database"""
         return TransactionCrud.get_transaction_count(
-            self.db, date_range, categories, category, subcategory, min_confidence, include_excluded
+            self.db, self.tenant_id, date_range, categories, category, subcategory, min_confidence, include_excluded
+        )
+
+    def search_transactions(
+            self,
+            query: str,
+            date_range: Optional[DateRange] = None,
+            include_excluded: bool = True,
+            limit: int = 50,
+            offset: int = 0
+    ) -> TransactionSearchResult:
+        """Full-text search over merchants and descriptions, without syncing from Gmail"""
+        rows, total = TransactionCrud.search_transactions(
+            self.db, self.tenant_id, query, date_range, include_excluded, limit, offset
+        )
+        return TransactionSearchResult(
+            transactions=[self._to_transaction(tx) for tx in rows], total=total, limit=limit, offset=offset
         )
 
     async def create_manual_transaction(self, request: CreateTransactionRequest) -> Transaction:
@@ -376,12 +605,54 @@ class TransactionService:
             confidence=1.0,
             description=request.description or f"Manual entry: {request.merchant}",
             excluded=False,
-            original_currency="JMD",
+            original_currency=settings.HOME_CURRENCY,
             original_amount=request.amount,
             exchange_rate=None,
             exchange_rate_date=None,
             card_type=request.card_type
         )
         
-        TransactionCrud.create_transaction(self.db, transaction)
+        TransactionCrud.create_transaction(self.db, self.tenant_id, transaction)
+        self._publish_transactions("transactions_created", [transaction])
+        self._check_budgets()
         return transaction
+
+    def _publish_transactions(self, event: str, transactions: List[Transaction], sign: int = 1):
+        """
+        Push transactions to live event subscribers, followed by the summary change they cause.
+        ``sign`` is -1 when the transactions stop counting towards spending (e.g. were excluded).
+        """
+        if not transactions:
+            return
+
+        events = get_event_bus(self.tenant_id)
+        events.publish(event, {"transactions": [t.model_dump(mode="json") for t in transactions]})
+
+        counted = transactions if sign < 0 else [t for t in transactions if not t.excluded]
+        if counted:
+            events.publish("summary_delta", self._summary_delta(counted, sign).model_dump(mode="json"))
+
+    @staticmethod
+    def _summary_delta(transactions: List[Transaction], sign: int = 1) -> SummaryDelta:
+        delta = SummaryDelta(
+            total_spending=Decimal('0'),
+            transaction_count=0,
+            by_primary_category={},
+            by_subcategory={},
+            by_card_type={}
+        )
+        for transaction in transactions:
+            amount = transaction.amount * sign
+            delta.total_spending += amount
+            delta.transaction_count += sign
+            keys = [
+                (delta.by_primary_category, transaction.primary_category),
+                (delta.by_subcategory, f"{transaction.primary_category} - {transaction.subcategory}"),
+            ]
+            if transaction.card_type:
+                keys.append((delta.by_card_type, transaction.card_type))
+            for group, key in keys:
+                category = group.setdefault(key, CategoryDelta(total=Decimal('0'), count=0))
+                category.total += amount
+                category.count += sign
+        return delta
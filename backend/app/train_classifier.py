@@ -0,0 +1,64 @@
+"""
+Train a tenant's local merchant classifier from its labeled transactions and special rules.
+
+    python -m app.train_classifier [--tenant default] [--full] [--predict "MERCHANT NAME" ...]
+
+Syncs retrain the model on their own once LOCAL_CLASSIFIER_RETRAIN_AFTER new merchants have
+been labeled; this command trains it right away, for instance after a backfill or after
+recategorizing merchants. Retraining starts from the saved model unless ``--full`` is given,
+which also refits the confidence calibration. Nothing is sent to OpenAI. The model is saved
+to ``app/data/merchant_model.npz`` (``<TENANT_DATA_DIR>/<tenant>/`` for other tenants).
+"""
+import argparse
+import asyncio
+import time
+
+from app.config import get_settings
+from app.core.tenancy import DEFAULT_TENANT, classifier_model_path, rules_file_path, validate_tenant_id
+from app.db.database import SessionLocal
+from app.migrate import migrate
+from app.services.classifier_service import MerchantClassifier
+
+settings = get_settings()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Tenant whose classifier is trained")
+    parser.add_argument("--full", action="store_true", help="Train from scratch instead of from the saved model")
+    parser.add_argument("--predict", action="append", default=[], metavar="MERCHANT",
+                        help="Print the new model's classification of a merchant name (repeatable)")
+    args = parser.parse_args()
+    try:
+        validate_tenant_id(args.tenant)
+    except ValueError as e:
+        parser.error(str(e))
+
+    migrate()
+    classifier = MerchantClassifier(
+        rules_file_path=rules_file_path(args.tenant), model_path=classifier_model_path(args.tenant)
+    )
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        model = asyncio.run(classifier.retrain(db, args.tenant, full=args.full))
+    finally:
+        db.close()
+    if model is None:
+        parser.exit(1, f"Tenant {args.tenant} has fewer than {settings.LOCAL_CLASSIFIER_MIN_MERCHANTS} "
+                       f"labeled merchants\n")
+
+    accuracy = "n/a" if model.holdout_accuracy is None else f"{model.holdout_accuracy:.1%}"
+    print(f"Merchants:   {model.merchant_count} ({len(model.labels)} categories)")
+    print(f"Held out:    {accuracy} accuracy, temperature {model.temperature:.2f} "
+          f"(calibrated on {model.calibrated_count} merchants)")
+    print(f"Location:    {classifier.model_path}")
+    print(f"Elapsed:     {time.perf_counter() - started:.1f}s")
+    for merchant in args.predict:
+        primary_category, subcategory, confidence = model.predict(merchant)
+        deferred = " (below threshold, OpenAI is asked)" if confidence < settings.LOCAL_CLASSIFIER_MIN_CONFIDENCE else ""
+        print(f"{merchant}: {primary_category} > {subcategory} ({confidence:.2f}){deferred}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+MerchantClassifier against a local stub OpenAI server: cold lookups, cache hits and batches.
+The local model is trained on synthetic merchants whose names share stems within a label.
+"""
+import asyncio
+import random
+
+import pytest
+
+from app.config import get_settings
+from app.services.classifier_service import MerchantClassifier
+from app.services.local_classifier import LocalMerchantModel
+
+MERCHANTS = [f"BENCH MERCHANT {i:03d}" for i in range(100)]
+
+SYLLABLES = ["KA", "LO", "MI", "TRE", "STA", "BOR", "QUI", "NEX", "FA", "ZU", "PEL", "ROM", "DEX", "VAN"]
+PLACES = ["KINGSTON", "HALF WAY TREE", "MONTEGO BAY", "PORTMORE", "LIGUANEA", "OCHO RIOS", "MANDEVILLE"]
+
+
+def synthetic_merchants(count: int, label_count: int = 30, seed: int = 11) -> tuple:
+    """(names, labels) of distinct merchants named after a few stems per label, plus a place or store number"""
+    rng = random.Random(seed)
+    labels = [(f"Category {i % 10}", f"Subcategory {i}") for i in range(label_count)]
+    stems = {label: ["".join(rng.choices(SYLLABLES, k=rng.randint(2, 3))) for _ in range(5)] for label in labels}
+    merchants = {}
+    while len(merchants) < count:
+        label = rng.choice(labels)
+        name = f"{rng.choice(stems[label])} {rng.choice(PLACES)} {rng.randint(1, 99)}"
+        merchants.setdefault(name, label)
+    return list(merchants), list(merchants.values())
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def classifier(stub_openai_url):
+    settings = get_settings()
+    original = settings.OPENAI_BASE_URL
+    settings.OPENAI_BASE_URL = stub_openai_url
+    yield MerchantClassifier()
+    settings.OPENAI_BASE_URL = original
+
+
+def bench_classify_cold(benchmark, classifier, loop):
+    """One OpenAI round trip per merchant"""
+    async def classify_all():
+        for merchant in MERCHANTS[:20]:
+            await classifier.classify_merchant(merchant)
+
+    benchmark.pedantic(lambda: loop.run_until_complete(classify_all()), setup=classifier.cache.clear, rounds=10)
+
+
+def bench_classify_cached(benchmark, classifier, loop):
+    async def classify_all():
+        for merchant in MERCHANTS:
+            await classifier.classify_merchant(merchant)
+
+    loop.run_until_complete(classify_all())
+    benchmark(lambda: loop.run_until_complete(classify_all()))
+
+
+def bench_classify_batch_cold(benchmark, classifier, loop):
+    """The same merchants through classify_merchants, CLASSIFY_BATCH_SIZE per round trip"""
+    benchmark.pedantic(
+        lambda: loop.run_until_complete(classifier.classify_merchants(MERCHANTS)),
+        setup=classifier.cache.clear,
+        rounds=10
+    )
+
+
+@pytest.fixture(scope="module")
+def merchants():
+    """2100 merchants: 2000 to train on, 50 more for a retrain and 50 the model never sees"""
+    return synthetic_merchants(2100)
+
+
+@pytest.fixture(scope="module")
+def training_set(merchants):
+    names, labels = merchants
+    return names[:2000], labels[:2000]
+
+
+@pytest.fixture(scope="module")
+def local_model(training_set):
+    return LocalMerchantModel.fit(*training_set)
+
+
+def bench_local_model_fit(benchmark, training_set):
+    """Training from scratch on 2000 merchants, including the held-out calibration"""
+    benchmark.pedantic(lambda: LocalMerchantModel.fit(*training_set), rounds=3)
+
+
+def bench_local_model_retrain(benchmark, merchants, local_model):
+    """Warm-started retrain after 50 new merchants"""
+    names, labels = merchants[0][:2050], merchants[1][:2050]
+    benchmark.pedantic(lambda: LocalMerchantModel.fit(names, labels, previous=local_model), rounds=3)
+
+
+def bench_local_model_predict(benchmark, merchants, local_model):
+    names = merchants[0][2050:]
+    benchmark(lambda: [local_model.predict(name) for name in names])
+
+
+def bench_classify_batch_local(benchmark, classifier, merchants, local_model, loop):
+    """classify_merchants of new merchants with a local model; only those it isn't sure of reach the stub"""
+    names = merchants[0][2050:]
+    classifier.local_model = local_model
+    try:
+        benchmark.pedantic(
+            lambda: loop.run_until_complete(classifier.classify_merchants(names)),
+            setup=classifier.cache.clear,
+            rounds=10
+        )
+    finally:
+        classifier.local_model = None
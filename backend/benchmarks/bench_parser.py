@@ -0,0 +1,13 @@
+"""Bank alert parsing over saved (--corpus) or synthetic alert emails."""
+from app.parsers.registry import get_template_registry
+from benchmarks.parser_bench import legacy_parse
+
+
+def bench_registry_parse(benchmark, alert_corpus):
+    registry = get_template_registry()
+    benchmark(lambda: [registry.parse(email) for email in alert_corpus])
+
+
+def bench_legacy_parse(benchmark, alert_corpus):
+    """The pre-registry inline parsing path, kept as a baseline"""
+    benchmark(lambda: [legacy_parse(email) for email in alert_corpus])
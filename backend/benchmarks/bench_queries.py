@@ -0,0 +1,89 @@
+"""TransactionCrud queries and summary building over synthetic datasets of increasing size."""
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from app.core.tenancy import DEFAULT_TENANT
+from app.db.crud import TransactionCrud
+from app.models.schemas import DateRange
+from app.services.analytics_service import AnalyticsService
+from app.services.recurring_service import RecurringPaymentService
+from app.services.transaction_service import TransactionService
+from benchmarks.datasets import DATASET_DAYS, DATASET_END, message_id
+
+SPANS = {
+    "month": DateRange(start_date=DATASET_END - timedelta(days=30), end_date=DATASET_END),
+    "year": DateRange(start_date=DATASET_END - timedelta(days=365), end_date=DATASET_END),
+    "all": DateRange(start_date=DATASET_END - timedelta(days=DATASET_DAYS), end_date=DATASET_END),
+}
+CATEGORY_FILTER = [{"category": "Food & Dining", "subcategory": "Restaurants"}, {"category": "Transportation"}]
+
+
+@pytest.mark.parametrize("span", SPANS)
+def bench_list(benchmark, db, span):
+    benchmark(TransactionCrud.get_transactions, db, DEFAULT_TENANT, SPANS[span], limit=100, offset=0)
+
+
+@pytest.mark.parametrize("span", SPANS)
+def bench_list_deep_page(benchmark, db, span):
+    benchmark(TransactionCrud.get_transactions, db, DEFAULT_TENANT, SPANS[span], limit=100, offset=5000)
+
+
+@pytest.mark.parametrize("span", SPANS)
+def bench_list_category_filter(benchmark, db, span):
+    benchmark(
+        TransactionCrud.get_transactions, db, DEFAULT_TENANT, SPANS[span], categories=CATEGORY_FILTER, limit=100, offset=0
+    )
+
+
+@pytest.mark.parametrize("span", SPANS)
+def bench_count(benchmark, db, span):
+    benchmark(TransactionCrud.get_transaction_count, db, DEFAULT_TENANT, SPANS[span])
+
+
+@pytest.mark.parametrize("span", SPANS)
+def bench_categories(benchmark, db, span):
+    benchmark(TransactionCrud.get_categories, db, DEFAULT_TENANT, SPANS[span])
+
+
+def bench_to_schema_page(benchmark, db):
+    rows = TransactionCrud.get_transactions(db, DEFAULT_TENANT, SPANS["all"], limit=1000)
+    benchmark(lambda: [TransactionService._to_transaction(tx) for tx in rows])
+
+
+def bench_summary_page(benchmark, db):
+    """get_summary over a full 1000-row page, as built by GET /transactions"""
+    rows = TransactionCrud.get_transactions(db, DEFAULT_TENANT, SPANS["all"], limit=1000)
+    page = [TransactionService._to_transaction(tx) for tx in rows]
+    service = TransactionService(gmail_service=None, classifier=None, db=db)
+    loop = asyncio.new_event_loop()
+    benchmark(lambda: loop.run_until_complete(service.get_summary(page)))
+    loop.close()
+
+
+@pytest.mark.parametrize("query", ["uber", "merchant 01", "zzz"])
+def bench_search(benchmark, db, query):
+    benchmark(TransactionCrud.search_transactions, db, DEFAULT_TENANT, query, limit=50)
+
+
+def bench_ingested_message_ids(benchmark, db):
+    """Idempotency check of a 500-email sync batch, half of it already ingested"""
+    message_ids = [message_id(index) for index in range(0, 1000, 2)]
+    benchmark(TransactionCrud.get_ingested_message_ids, db, DEFAULT_TENANT, message_ids)
+
+
+@pytest.mark.parametrize("span", SPANS)
+def bench_range_summary(benchmark, db, span):
+    """GET /analytics/summary over the whole range, on DuckDB when installed and the range is long enough"""
+    benchmark(AnalyticsService(db).get_summary, SPANS[span])
+
+
+@pytest.mark.parametrize("span", SPANS)
+def bench_monthly_trend(benchmark, db, span):
+    benchmark(AnalyticsService(db).get_trend, SPANS[span], "month", "primary_category")
+
+
+def bench_recurring_refresh(benchmark, db):
+    # Full detection over the tenant's whole history, as on the first refresh
+    benchmark(RecurringPaymentService(db).refresh)
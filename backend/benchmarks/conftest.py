@@ -0,0 +1,57 @@
+import os
+
+# Settings require these; benchmarks never talk to the real services
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("GMAIL_CREDENTIALS_PATH", "credentials.json")
+
+import pytest  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.db.base_class import Base  # noqa: E402
+from benchmarks.corpus import load_corpus, synthetic_ncb_corpus  # noqa: E402
+from benchmarks.datasets import build_dataset  # noqa: E402
+from benchmarks.stub_openai import start_stub_server  # noqa: E402
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--dataset-sizes",
+        default=os.environ.get("BENCH_SIZES", "10000,100000"),
+        help="Comma separated transaction counts for the query benchmarks (e.g. 10000,100000,1000000)"
+    )
+    parser.addoption(
+        "--corpus",
+        default=os.environ.get("BENCH_CORPUS"),
+        help="Directory of saved alert emails for the parser benchmarks (defaults to a synthetic corpus)"
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "dataset_size" in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption("dataset_sizes").split(",") if size]
+        metafunc.parametrize("dataset_size", sizes, ids=[f"{size // 1000}k" for size in sizes], scope="session")
+
+
+@pytest.fixture(scope="session")
+def db(dataset_size):
+    engine = create_engine(f"sqlite:///{build_dataset(dataset_size)}")
+    # Datasets are cached across runs; bring older ones up to the current schema and indexes
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def alert_corpus(pytestconfig):
+    directory = pytestconfig.getoption("corpus")
+    return load_corpus(directory) if directory else synthetic_ncb_corpus(1000)
+
+
+@pytest.fixture(scope="session")
+def stub_openai_url():
+    server = start_stub_server()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
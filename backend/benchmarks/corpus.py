@@ -0,0 +1,92 @@
+"""
+Loading and generation of alert email corpora for the benchmarks.
+
+A corpus is a directory of saved alert emails, either ``.eml`` files (Gmail's
+"Download message") or ``.jsonl`` files with one ``{"subject", "sender", "date",
+"body"}`` object per line.
+"""
+import email
+import email.policy
+import json
+import random
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import List
+
+from app.models.schemas import EmailMessage
+
+NCB_SENDER = "NCB Card Alerts <no-reply-ncbcardalerts@jncb.com>"
+
+MERCHANTS = [
+    "HI-LO", "DIGP", "NWCJ", "FONTANA -WATERLOO SQUARE", "JOHN R WONG SUPERMARKET",
+    "UBER *TRIP", "NETFLIX.COM", "AMAZON MKTPLACE PMTS", "TOTAL BARBICAN", "KFC HALF WAY TREE",
+    "PRICESMART", "SPOTIFY", "MEGAMART", "JUICI PATTIES", "DEVON HOUSE I-SCREAM",
+]
+
+NCB_BODY = """<html><head><style>td {{ font-family: Arial; }}</style></head><body>
+<table width="600" cellpadding="0" cellspacing="0"><tr><td>
+<p>Dear Cardholder,</p>
+<p>Transaction Approved on your {card_type} ending in {last4}.</p>
+<table class="details">
+<tr><td class="label"><div class="label">Amount</div></td>
+<td class="value"><div class="value">{currency} {amount}</div></td></tr>
+<tr><td class="label"><div class="label">Merchant</div></td>
+<td class="value"><div class="value">{merchant}</div></td></tr>
+<tr><td class="label"><div class="label">Date</div></td>
+<td class="value"><div class="value">{date}</div></td></tr>
+</table>
+<p>{padding}</p>
+<p>If you did not authorise this transaction please contact NCB immediately.</p>
+</td></tr></table></body></html>"""
+
+
+def synthetic_ncb_corpus(size: int = 1000, seed: int = 42) -> List[EmailMessage]:
+    """Generate NCB-style alerts with realistic HTML layout for when no saved corpus is available."""
+    rng = random.Random(seed)
+    card_types = ["NCB VISA PLATINUM", "MASTERCARD PLATINUM USD"]
+    start = datetime(2023, 1, 1)
+    emails = []
+    for _ in range(size):
+        sent = start + timedelta(minutes=rng.randint(0, 60 * 24 * 730))
+        card_type = rng.choice(card_types)
+        currency = "USD" if card_type.endswith("USD") else "JMD"
+        emails.append(EmailMessage(
+            subject="NCB Card Alert - Transaction Approved",
+            sender=NCB_SENDER,
+            date=sent,
+            body=NCB_BODY.format(
+                card_type=card_type,
+                last4=rng.randint(1000, 9999),
+                currency=currency,
+                amount=f"{rng.uniform(100, 50000):,.2f}",
+                merchant=rng.choice(MERCHANTS),
+                date=sent.strftime("%d %b %Y %H:%M"),
+                padding="&nbsp;" * rng.randint(50, 400)
+            )
+        ))
+    return emails
+
+
+def _load_eml(path: Path) -> EmailMessage:
+    with open(path, "rb") as f:
+        message = email.message_from_binary_file(f, policy=email.policy.default)
+    part = message.get_body(preferencelist=("html", "plain"))
+    return EmailMessage(
+        subject=message.get("subject", ""),
+        sender=message.get("from", ""),
+        date=parsedate_to_datetime(message["date"]).replace(tzinfo=None),
+        body=part.get_content() if part else ""
+    )
+
+
+def load_corpus(directory: str) -> List[EmailMessage]:
+    """Load every ``.eml`` and ``.jsonl`` email under ``directory``."""
+    emails = []
+    for path in sorted(Path(directory).rglob("*")):
+        if path.suffix == ".eml":
+            emails.append(_load_eml(path))
+        elif path.suffix == ".jsonl":
+            with open(path) as f:
+                emails.extend(EmailMessage(**json.loads(line)) for line in f if line.strip())
+    return emails
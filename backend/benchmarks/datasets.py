@@ -0,0 +1,101 @@
+"""
+Synthetic transaction datasets for the query benchmarks.
+
+Datasets are written once to ``benchmarks/.data/transactions_v<schema>_<size>.db`` with the
+app's schema and reused by later runs, since generating a million rows takes a while. Bump
+SCHEMA_VERSION when the transactions table changes so stale datasets are rebuilt.
+"""
+import random
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+from app.db.base_class import Base
+from app.db.crud import TransactionCrud  # noqa: F401  Registers every model on Base
+from benchmarks.corpus import MERCHANTS
+
+DATA_DIR = Path(__file__).parent / ".data"
+
+CATEGORIES = {
+    "Food & Dining": ["Restaurants", "Groceries & Supermarkets"],
+    "Shopping & Retail": ["Online Retailers", "Department Stores", "Convenience Stores"],
+    "Transportation": ["Gas Stations & Fuel", "Ride Services & Taxis"],
+    "Entertainment": ["Streaming Services", "Movies & Theaters"],
+    "Services": ["Utilities", "Subscription Services"],
+    "Health & Wellness": ["Pharmacies", "Fitness & Gyms"],
+}
+CARD_TYPES = ["NCB VISA PLATINUM", "MASTERCARD PLATINUM USD"]
+
+# Rows span this many days ending at DATASET_END
+DATASET_DAYS = 5 * 365
+DATASET_END = datetime(2025, 1, 1)
+
+SCHEMA_VERSION = 4
+
+
+def message_id(index: int) -> str:
+    """Gmail-style hex message ID of the ``index``-th synthetic row"""
+    return f"{0x18c0000000000000 + index:x}"
+
+
+def dataset_path(size: int) -> Path:
+    return DATA_DIR / f"transactions_v{SCHEMA_VERSION}_{size}.db"
+
+
+def build_dataset(size: int, seed: int = 7) -> Path:
+    """Create (or reuse) a SQLite database holding ``size`` synthetic transactions"""
+    path = dataset_path(size)
+    if path.exists():
+        return path
+
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    engine = create_engine(f"sqlite:///{tmp_path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    rng = random.Random(seed)
+    categories = [(primary, sub) for primary, subs in CATEGORIES.items() for sub in subs]
+    merchants = MERCHANTS + [f"MERCHANT {i:04d}" for i in range(500)]
+    start = DATASET_END - timedelta(days=DATASET_DAYS)
+    span_seconds = DATASET_DAYS * 86400
+
+    def rows():
+        for index in range(size):
+            primary, sub = rng.choice(categories)
+            card_type = rng.choice(CARD_TYPES)
+            amount = round(rng.lognormvariate(8, 1.2), 2)
+            yield (
+                str(uuid.UUID(int=rng.getrandbits(128))),
+                message_id(index),
+                (start + timedelta(seconds=rng.randrange(span_seconds))).isoformat(sep=" "),
+                amount,
+                rng.choice(merchants),
+                primary,
+                sub,
+                round(rng.uniform(0.5, 1.0), 2),
+                f"{primary} merchant",
+                rng.random() < 0.02,
+                "USD" if card_type.endswith("USD") else "JMD",
+                amount,
+                card_type,
+            )
+
+    connection = sqlite3.connect(tmp_path)
+    with connection:
+        connection.executemany(
+            "INSERT INTO transactions (id, gmail_message_id, date, amount, merchant, primary_category, subcategory, "
+            "confidence, description, excluded, original_currency, original_amount, card_type) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows()
+        )
+    connection.execute("ANALYZE")
+    connection.close()
+
+    tmp_path.rename(path)
+    return path
@@ -0,0 +1,73 @@
+"""
+Benchmark the bank alert parser over a corpus of saved alert emails.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.parser_bench                      # synthetic NCB corpus
+    python -m benchmarks.parser_bench --corpus path/to/dir # saved .eml/.jsonl alerts
+
+The template registry is compared with the previous inline implementation of
+``TransactionService._parse_transaction`` so regressions show up as a ratio.
+"""
+import argparse
+import re
+import time
+from decimal import Decimal
+from typing import Callable, List
+
+from app.config import get_settings
+from app.models.schemas import EmailMessage
+from app.parsers.registry import get_template_registry
+from benchmarks.corpus import load_corpus, synthetic_ncb_corpus
+
+
+def legacy_parse(email: EmailMessage):
+    """The pre-registry parsing path: separate searches per field plus two body scans."""
+    settings = get_settings()
+    amount_match = re.search(r'(?P<currency>USD|JMD)\s+(?P<amount>[\d,\.]+)', email.body)
+    amount = Decimal(amount_match.group('amount').replace(',', '')) if amount_match else None
+    merchant_match = re.search(r'Merchant</div></td>\s*<td[^>]*><div[^>]*>([^<]+)</div>', email.body)
+    merchant = merchant_match.group(1).strip() if merchant_match else ""
+    card_type = None
+    if settings.MASTERCARD_TYPE in email.body:
+        card_type = settings.MASTERCARD_TYPE
+    elif settings.VISA_TYPE in email.body:
+        card_type = settings.VISA_TYPE
+    return amount, merchant, card_type
+
+
+def time_parser(parse: Callable, emails: List[EmailMessage], rounds: int) -> float:
+    """Return the best per-email parse time in microseconds over ``rounds`` runs."""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for email in emails:
+            parse(email)
+        best = min(best, time.perf_counter() - started)
+    return best / len(emails) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory of saved alert emails (.eml or .jsonl)")
+    parser.add_argument("--size", type=int, default=5000, help="Synthetic corpus size when --corpus is not given")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    emails = load_corpus(args.corpus) if args.corpus else synthetic_ncb_corpus(args.size)
+    if not emails:
+        parser.error(f"No emails found in {args.corpus}")
+
+    registry = get_template_registry()
+    parsed = sum(1 for email in emails if registry.parse(email))
+
+    legacy_us = time_parser(legacy_parse, emails, args.rounds)
+    registry_us = time_parser(registry.parse, emails, args.rounds)
+
+    print(f"emails:   {len(emails)} ({parsed} parsed)")
+    print(f"legacy:   {legacy_us:8.2f} us/email")
+    print(f"registry: {registry_us:8.2f} us/email ({legacy_us / registry_us:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Measure how long a worker takes to import the app, and which modules account for it.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.startup_bench             # best of 5 cold imports of app.main
+    python -m benchmarks.startup_bench --top 40    # longer module breakdown
+
+Each run is a fresh interpreter started with ``python -X importtime``, so the numbers match
+what uvicorn pays when it boots or reloads a worker. Modules are ranked by cumulative import
+time; nested modules are indented as in the raw importtime output.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+
+def import_once(module: str) -> List[Tuple[str, int]]:
+    """(module, cumulative microseconds) for every module imported by a cold ``import module``"""
+    env = {**os.environ, "SCHEDULED_SYNC_ENABLED": "false"}
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    env.setdefault("GMAIL_CREDENTIALS_PATH", "credentials.json")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings.append((name.rstrip(), int(cumulative)))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    runs = [import_once(args.module) for _ in range(args.rounds)]
+    totals = [dict((name.strip(), us) for name, us in run)[args.module] for run in runs]
+    best = runs[totals.index(min(totals))]
+
+    print(f"import {args.module}: best {min(totals) / 1000:.0f} ms, "
+          f"median {sorted(totals)[len(totals) // 2] / 1000:.0f} ms over {args.rounds} runs")
+    print()
+    slowest: Dict[str, int] = dict(sorted(best, key=lambda timing: timing[1], reverse=True)[:args.top])
+    for name, us in best[::-1]:
+        if name in slowest:
+            print(f"{us / 1000:9.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
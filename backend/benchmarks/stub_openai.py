@@ -0,0 +1,58 @@
+"""
+A local stand-in for the OpenAI chat completions endpoint.
+
+It answers single and batch classification prompts instantly with a fixed category, so the
+classifier benchmarks measure our own overhead (client, prompt building, parsing, caching)
+plus a loopback HTTP round trip rather than OpenAI's latency.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CLASSIFICATION = {
+    "primary_category": "Shopping & Retail",
+    "subcategory": "Specialty Retail",
+    "confidence": 0.8,
+    "description": "Stub classification",
+}
+
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = request["messages"][-1]["content"]
+
+        if prompt.startswith("Classify this merchant:"):
+            content = CLASSIFICATION
+        else:
+            merchants = [line[2:] for line in prompt.splitlines() if line.startswith("- ")]
+            content = {merchant: CLASSIFICATION for merchant in merchants}
+
+        body = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(content)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    """Start the stub on a free loopback port; its base URL is ``http://127.0.0.1:<port>/v1``"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
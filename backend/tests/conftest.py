@@ -0,0 +1,109 @@
+import os
+
+# Settings require these; tests never talk to the real services
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("GMAIL_CREDENTIALS_PATH", "credentials.json")
+os.environ.setdefault("SCHEDULED_SYNC_ENABLED", "false")
+
+import uuid  # noqa: E402
+from datetime import datetime  # noqa: E402
+from decimal import Decimal  # noqa: E402
+from typing import Dict, Iterable, List, Optional  # noqa: E402
+
+import pytest  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.db.base_class import Base  # noqa: E402
+from app.db.crud import TransactionCrud  # noqa: E402, F401  Registers every model on Base
+from app.models.schemas import EmailMessage, MerchantCategory, Transaction  # noqa: E402
+
+TENANT = "test"
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+def make_transaction(
+        merchant: str = "KFC HALF WAY TREE",
+        amount: str = "100.00",
+        date: datetime = datetime(2025, 3, 10, 12, 0),
+        primary_category: str = "Food & Dining",
+        subcategory: str = "Restaurants",
+        message_id: Optional[str] = None,
+        **fields
+) -> Transaction:
+    return Transaction(
+        id=uuid.uuid4(), date=date, amount=Decimal(amount), merchant=merchant,
+        primary_category=primary_category, subcategory=subcategory, confidence=0.9,
+        description=fields.pop("description", "test"), original_currency=fields.pop("original_currency", "JMD"),
+        original_amount=fields.pop("original_amount", Decimal(amount)),
+        gmail_message_id=message_id if message_id is not None else uuid.uuid4().hex,
+        **fields
+    )
+
+
+NCB_BODY = """<html><body><p>Transaction Approved on your {card_type} ending in 1234.</p>
+<table>
+<tr><td><div class="label">Amount</div></td><td><div class="value">{currency} {amount}</div></td></tr>
+<tr><td><div class="label">Merchant</div></td><td><div class="value">{merchant}</div></td></tr>
+</table></body></html>"""
+
+
+def ncb_email(
+        message_id: str,
+        merchant: str = "KFC HALF WAY TREE",
+        amount: str = "1,250.00",
+        currency: str = "JMD",
+        card_type: str = "NCB VISA PLATINUM",
+        date: datetime = datetime(2025, 3, 10, 12, 0),
+        body: Optional[str] = None
+) -> EmailMessage:
+    return EmailMessage(
+        message_id=message_id, date=date, subject="NCB Card Alert",
+        sender="NCB Card Alerts <no-reply-ncbcardalerts@jncb.com>",
+        body=body if body is not None else NCB_BODY.format(
+            card_type=card_type, currency=currency, amount=amount, merchant=merchant
+        )
+    )
+
+
+class FakeClassifier:
+    """Stands in for MerchantClassifier, putting every merchant in one category"""
+
+    def __init__(self):
+        self.classified: List[str] = []
+
+    async def classify_merchant(self, merchant_name: str) -> MerchantCategory:
+        return (await self.classify_merchants([merchant_name]))[merchant_name]
+
+    async def classify_merchants(self, merchant_names: Iterable[str]) -> Dict[str, MerchantCategory]:
+        names = list(dict.fromkeys(merchant_names))
+        self.classified.extend(names)
+        return {
+            name: MerchantCategory(
+                primary_category="Food & Dining", subcategory="Restaurants", confidence=0.9, description="fake"
+            )
+            for name in names
+        }
+
+    def needs_training(self) -> bool:
+        return False
+
+    def label_changed(self, merchant_name: str) -> None:
+        pass
@@ -0,0 +1,229 @@
+import asyncio
+import json
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+import pytest
+from fastapi import FastAPI
+
+from app.api.api_v1.dependencies import get_analytics_service
+from app.api.api_v1.routers.analytics_router import router
+from app.db.crud import TransactionCrud
+from app.models.schemas import DateRange, SpendingTrend
+from app.models.transaction_model import TransactionModel
+from app.services import analytics_service
+from app.services.analytics_service import TREND_GROUPS, TREND_INTERVALS, AnalyticsService
+from tests.conftest import TENANT, make_transaction
+
+YEAR = DateRange(start_date=datetime(2025, 1, 1), end_date=datetime(2025, 12, 31, 23, 59))
+WEEK = DateRange(start_date=datetime(2025, 3, 1), end_date=datetime(2025, 3, 7))
+
+
+class RecordingCursor:
+    """Stands in for a DuckDB cursor, keeping the SQL and parameters it is given"""
+
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, sql, params):
+        self.executed.append((sql, params))
+        return SimpleNamespace(fetchall=lambda: [])
+
+
+@pytest.fixture
+def duckdb_cursor(monkeypatch):
+    """Routes long ranges to a recording cursor over the live database"""
+    cursor = RecordingCursor()
+    monkeypatch.setattr(analytics_service, "duckdb", SimpleNamespace())
+    monkeypatch.setattr(analytics_service, "_duckdb_cursor", lambda: cursor)
+    monkeypatch.setattr(analytics_service.settings, "ANALYTICS_DUCKDB_ENABLED", True)
+    monkeypatch.setattr(analytics_service.settings, "ANALYTICS_DUCKDB_SOURCE", "sqlite")
+    monkeypatch.setattr(analytics_service.settings, "ANALYTICS_DUCKDB_MIN_DAYS", 180)
+    return cursor
+
+
+def store_spending(db):
+    TransactionCrud.create_transactions(db, TENANT, [
+        make_transaction("KFC", amount="1000.00", date=datetime(2025, 1, 10), card_type="VISA"),
+        make_transaction("KFC", amount="500.00", date=datetime(2025, 2, 3), card_type="VISA"),
+        make_transaction("JPS", amount="9000.00", date=datetime(2025, 2, 20), primary_category="Utilities",
+                         subcategory="Electricity", card_type="MASTERCARD"),
+        make_transaction("KFC", amount="700.00", date=datetime(2025, 2, 21), excluded=True),
+    ])
+    TransactionCrud.create_transactions(db, "other", [make_transaction("KFC", date=datetime(2025, 1, 10))])
+
+
+def test_short_ranges_and_conversions_use_the_transactional_database(db, duckdb_cursor):
+    store_spending(db)
+    service = AnalyticsService(db, TENANT)
+
+    summary, engine = service.get_summary(WEEK)
+    assert engine == "sql" and summary.transaction_count == 0
+    assert service.get_summary(YEAR, currency="USD")[1] == "sql"
+    assert duckdb_cursor.executed == []
+
+
+def test_summary_without_duckdb(db, monkeypatch):
+    monkeypatch.setattr(analytics_service, "duckdb", None)
+    store_spending(db)
+
+    summary, engine = AnalyticsService(db, TENANT).get_summary(YEAR)
+
+    assert engine == "sql"
+    assert (summary.total_spending, summary.transaction_count) == (Decimal("10500.00"), 3)
+    assert summary.by_primary_category["Food & Dining"].total == Decimal("1500.00")
+    assert summary.by_card_type["MASTERCARD"].merchants == ["JPS"]
+
+
+def test_trend_without_duckdb(db, monkeypatch):
+    monkeypatch.setattr(analytics_service, "duckdb", None)
+    store_spending(db)
+
+    trend, engine = AnalyticsService(db, TENANT).get_trend(YEAR, "month", "primary_category")
+
+    assert engine == "sql"
+    assert [(point.period.month, point.group, point.total, point.count) for point in trend.points] == [
+        (1, "Food & Dining", Decimal("1000.00"), 1),
+        (2, "Food & Dining", Decimal("500.00"), 1),
+        (2, "Utilities", Decimal("9000.00"), 1),
+    ]
+
+
+@pytest.mark.parametrize("interval", TREND_INTERVALS)
+@pytest.mark.parametrize("group_by", [None, *TREND_GROUPS])
+def test_long_range_trends_are_aggregated_by_duckdb(db, duckdb_cursor, interval, group_by):
+    trend, engine = AnalyticsService(db, TENANT).get_trend(YEAR, interval, group_by)
+
+    assert engine == "duckdb" and trend.points == []
+    (sql, params), = duckdb_cursor.executed
+    assert f"date_trunc('{interval}', date)" in sql
+    assert f'{group_by or "NULL"} AS "group"' in sql
+    # Dates and the tenant are bound, never interpolated
+    assert params == [YEAR.start_date, YEAR.end_date, TENANT]
+    assert TENANT not in sql
+
+
+@pytest.mark.parametrize("interval, group_by", [
+    ("month', date) AS period, 1 AS \"group\", 0 AS total, 0 AS count --", None),
+    ("quarter", None),
+    ("month", "merchant"),
+    ("month", "tenant_id FROM oltp.transactions; --"),
+])
+def test_other_trend_values_never_reach_duckdb(db, duckdb_cursor, interval, group_by):
+    with pytest.raises(ValueError):
+        AnalyticsService(db, TENANT).get_trend(YEAR, interval, group_by)
+
+    assert duckdb_cursor.executed == []
+
+
+class RecordingService:
+    def __init__(self):
+        self.trends = []
+
+    async def prepare_currency(self, date_range, currency):
+        pass
+
+    def get_trend(self, date_range, interval, group_by, currency):
+        self.trends.append((interval, group_by))
+        return SpendingTrend(interval=interval, group_by=group_by, points=[]), "duckdb"
+
+
+@pytest.fixture
+def routed():
+    """The analytics routes over a service recording the trend parameters it is given"""
+    app = FastAPI()
+    app.include_router(router)
+    service = RecordingService()
+    app.dependency_overrides[get_analytics_service] = lambda: service
+    return app, service
+
+
+def get(app, path, **params):
+    """(status, JSON body, headers) of a GET through the ASGI app"""
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http", "path": path,
+        "raw_path": path.encode(), "root_path": "", "query_string": urlencode(params).encode(), "headers": [],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return messages[0]["status"], json.loads(body), dict(messages[0]["headers"])
+
+
+def test_router_passes_allowed_trend_values(routed):
+    app, service = routed
+    dates = {"startDate": "2025-01-01T00:00:00", "endDate": "2025-12-31T00:00:00"}
+
+    for interval in TREND_INTERVALS:
+        for group_by in TREND_GROUPS:
+            status, body, headers = get(app, "/analytics/trends", interval=interval, group_by=group_by, **dates)
+            assert status == 200 and headers[b"x-analytics-engine"] == b"duckdb"
+    assert get(app, "/analytics/trends", **dates)[0] == 200
+
+    assert service.trends == [
+        *((interval, group_by) for interval in TREND_INTERVALS for group_by in TREND_GROUPS), ("month", None)
+    ]
+
+
+@pytest.mark.parametrize("params", [
+    {"interval": "month', date) --"},
+    {"interval": "MONTH"},
+    {"interval": "month "},
+    {"interval": "month\n"},  # Python's re would let "$" match before it
+    {"interval": "year"},
+    {"group_by": "merchant"},
+    {"group_by": "primary_category\" FROM oltp.transactions --"},
+    {"group_by": "primary_category\nsubcategory"},
+])
+def test_router_rejects_other_trend_values(routed, params):
+    app, service = routed
+
+    status, body, _ = get(app, "/analytics/trends", startDate="2025-01-01T00:00:00", endDate="2025-12-31T00:00:00",
+                          **params)
+
+    assert status == 422
+    assert service.trends == []
+
+
+def test_duckdb_and_the_transactional_database_agree(db, monkeypatch):
+    duckdb = pytest.importorskip("duckdb")
+    store_spending(db)
+    connection = duckdb.connect()
+    connection.execute("CREATE SCHEMA oltp")
+    connection.execute("""
+        CREATE TABLE oltp.transactions (
+            tenant_id VARCHAR, date TIMESTAMP, amount DECIMAL(18, 2), merchant VARCHAR, primary_category VARCHAR,
+            subcategory VARCHAR, card_type VARCHAR, excluded BOOLEAN
+        )
+    """)
+    connection.executemany("INSERT INTO oltp.transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+        (transaction.tenant_id, transaction.date, transaction.amount, transaction.merchant,
+         transaction.primary_category, transaction.subcategory, transaction.card_type, transaction.excluded)
+        for transaction in db.query(TransactionModel)
+    ])
+    monkeypatch.setattr(analytics_service, "_duckdb_cursor", connection.cursor)
+    monkeypatch.setattr(analytics_service.settings, "ANALYTICS_DUCKDB_ENABLED", True)
+    monkeypatch.setattr(analytics_service.settings, "ANALYTICS_DUCKDB_SOURCE", "sqlite")
+    monkeypatch.setattr(analytics_service.settings, "ANALYTICS_DUCKDB_MIN_DAYS", 180)
+    service = AnalyticsService(db, TENANT)
+
+    def points(trend):
+        return sorted((point.period, point.group, point.total, point.count) for point in trend.points)
+
+    summary, engine = service.get_summary(YEAR)
+    trend, _ = service.get_trend(YEAR, "month", "primary_category")
+
+    monkeypatch.setattr(analytics_service.settings, "ANALYTICS_DUCKDB_MIN_DAYS", 10000)
+    assert engine == "duckdb"
+    assert summary == service.get_summary(YEAR)[0]
+    assert points(trend) == points(service.get_trend(YEAR, "month", "primary_category")[0])
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.db.crud import TransactionCrud
+from app.models.schemas import DateRange
+from app.services.anomaly_service import MAD_TO_SIGMA, AnomalyService, robust_scores
+from tests.conftest import TENANT, make_transaction
+
+NOW = datetime.now().replace(microsecond=0)
+WEEKLY_AMOUNTS = ["1000.00", "1100.00", "950.00", "1050.00", "980.00", "1020.00", "990.00", "1010.00"]
+
+
+def weekly_history(db, merchant="KFC HALF WAY TREE"):
+    """
+    One charge a week through the baseline window, up to two weeks ago. Weeks without spending
+    count as zero in a category's baseline, so a shorter history has a median week of zero.
+    """
+    TransactionCrud.create_transactions(db, TENANT, [
+        make_transaction(
+            merchant, amount=WEEKLY_AMOUNTS[weeks_ago % len(WEEKLY_AMOUNTS)], date=NOW - timedelta(weeks=weeks_ago)
+        )
+        for weeks_ago in range(2, 52)
+    ])
+
+
+def store_and_score(db, *transactions):
+    TransactionCrud.create_transactions(db, TENANT, list(transactions))
+    return AnomalyService(db, TENANT).score(list(transactions))
+
+
+@pytest.fixture
+def rebuilds(monkeypatch):
+    """Counts baseline rebuilds, which each read the spending series once"""
+    calls = []
+    get_spending_series = TransactionCrud.get_spending_series
+
+    def recording(db, tenant_id, since):
+        calls.append(tenant_id)
+        return get_spending_series(db, tenant_id, since)
+
+    monkeypatch.setattr(TransactionCrud, "get_spending_series", staticmethod(recording))
+    return calls
+
+
+def test_scores_count_mad_estimated_deviations_above_the_median():
+    scores = robust_scores(np.array([1300.0, 900.0]), np.array([1000.0, 1000.0]), np.array([100.0, 100.0]))
+
+    assert scores == pytest.approx([MAD_TO_SIGMA * 3, -MAD_TO_SIGMA])
+
+
+def test_zero_mad_is_floored_at_a_share_of_the_median():
+    # A fixed-price merchant: any change would otherwise be infinitely unusual
+    scores = robust_scores(np.array([1000.0, 1010.0]), np.array([1000.0, 1000.0]), np.array([0.0, 0.0]))
+
+    assert scores == pytest.approx([0.0, MAD_TO_SIGMA * 10 / 50])
+    assert robust_scores(np.array([5.0]), np.array([0.0]), np.array([0.0])) == pytest.approx([0.0])
+
+
+def test_usual_charges_are_not_flagged(db):
+    weekly_history(db)
+    AnomalyService(db, TENANT).rebuild()
+
+    assert store_and_score(db, make_transaction(amount="1040.00", date=NOW)) == []
+
+
+def test_charge_spike_and_category_week_spike_are_flagged(db):
+    weekly_history(db)
+    AnomalyService(db, TENANT).rebuild()
+
+    anomalies = store_and_score(db, make_transaction(amount="6000.00", date=NOW))
+
+    by_kind = {anomaly.kind: anomaly for anomaly in anomalies}
+    assert set(by_kind) == {"merchant", "category"}
+    assert by_kind["merchant"].subject == "KFC HALF WAY TREE" and by_kind["merchant"].ratio == 6.0
+    assert by_kind["category"].subject == "Food & Dining"
+
+
+def test_merchants_with_few_charges_are_not_scored(db):
+    TransactionCrud.create_transactions(db, TENANT, [
+        make_transaction(amount="1000.00", date=NOW - timedelta(weeks=weeks_ago)) for weeks_ago in (2, 3, 4)
+    ])
+    AnomalyService(db, TENANT).rebuild()
+
+    assert [anomaly.kind for anomaly in store_and_score(db, make_transaction(amount="9000.00", date=NOW))] == []
+
+
+def test_first_score_rebuilds_and_rescores_the_window(db, rebuilds):
+    weekly_history(db)
+    TransactionCrud.create_transactions(db, TENANT, [make_transaction(amount="6000.00", date=NOW - timedelta(days=1))])
+
+    anomalies = AnomalyService(db, TENANT).score([make_transaction(amount="1000.00", date=NOW)])
+
+    assert rebuilds == [TENANT]
+    assert anomalies == []  # The new charge is usual; the spike was stored by the rescore
+    listed = AnomalyService(db, TENANT).get_anomalies(DateRange(start_date=NOW - timedelta(days=30)))
+    assert "merchant" in {anomaly.kind for anomaly in listed.anomalies}
+
+
+def test_tenant_without_baselines_is_not_rebuilt_on_every_score(db, rebuilds):
+    # Nothing stored in the window, so the rebuild finds no baselines
+    AnomalyService(db, TENANT).score([make_transaction(date=NOW)])
+    AnomalyService(db, TENANT).score([make_transaction(date=NOW)])
+
+    assert rebuilds == [TENANT]
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import backfill
+from app.db.crud import BackfillCrud
+from app.models.backfill_window_model import BackfillWindowModel
+from app.services.transaction_service import TransactionService
+from tests.conftest import TENANT, FakeClassifier, ncb_email
+
+START = datetime(2025, 1, 1)
+
+
+class FakeGmail:
+    """One alert per window; the window starting at ``failing`` raises instead"""
+    failing = None
+
+    def __init__(self, token_path=None):
+        self.service = object()
+
+    def get_messages(self, query):
+        after = query.split("after:")[1].split()[0]
+        if datetime.fromtimestamp(int(after)) == self.failing:
+            raise RuntimeError("Gmail unavailable")
+        return [ncb_email(f"m{after}")]
+
+
+@pytest.fixture
+def sessions(engine, monkeypatch):
+    """Every session run_backfill opens, the planning session first"""
+    opened = []
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def session_local():
+        opened.append(factory())
+        return opened[-1]
+
+    monkeypatch.setattr(backfill, "SessionLocal", session_local)
+    monkeypatch.setattr(backfill, "migrate", lambda: None)
+    monkeypatch.setattr(backfill, "GmailService", FakeGmail)
+    monkeypatch.setattr(backfill, "MerchantClassifier", lambda **kwargs: FakeClassifier())
+    monkeypatch.setattr(backfill.settings, "EMAIL_ARCHIVE_ENABLED", False)
+    monkeypatch.setattr(FakeGmail, "failing", None)
+    return opened
+
+
+def run(days, workers):
+    return asyncio.run(backfill.run_backfill(START, datetime(2025, 1, 1 + days), 1, workers, TENANT))
+
+
+def statuses(db):
+    return [window.status for window in db.query(BackfillWindowModel).order_by(BackfillWindowModel.start_date)]
+
+
+def test_windows_split_into_consecutive_spans():
+    assert backfill.split_windows(START, datetime(2025, 1, 26), 10) == [
+        (START, datetime(2025, 1, 11)), (datetime(2025, 1, 11), datetime(2025, 1, 21)),
+        (datetime(2025, 1, 21), datetime(2025, 1, 26)),
+    ]
+
+
+def test_each_worker_ingests_on_its_own_session(db, sessions, monkeypatch):
+    used = set()
+    ingest_emails = TransactionService.ingest_emails
+
+    async def recording(self, emails):
+        used.add(self.db)
+        return await ingest_emails(self, emails)
+
+    monkeypatch.setattr(TransactionService, "ingest_emails", recording)
+
+    totals = run(days=4, workers=2)
+
+    assert (totals["windows"], totals["transactions"]) == (4, 4)
+    assert len(sessions) == 3 and used == set(sessions[1:])
+    assert statuses(db) == ["done"] * 4
+
+
+def test_failed_windows_are_checkpointed_and_retried(db, sessions):
+    FakeGmail.failing = datetime(2025, 1, 2)
+    totals = run(days=3, workers=2)
+
+    assert (totals["windows"], totals["failed"]) == (2, 1)
+    assert statuses(db) == ["done", "failed", "done"]
+    assert BackfillCrud.get_windows(db, TENANT, START, datetime(2025, 1, 4))[1].error == "Gmail unavailable"
+
+    FakeGmail.failing = None
+    totals = run(days=3, workers=2)
+    db.expire_all()
+    assert (totals["windows"], totals["failed"], totals["transactions"]) == (1, 0, 1)
+    assert statuses(db) == ["done"] * 3
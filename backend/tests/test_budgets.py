@@ -0,0 +1,92 @@
+from decimal import Decimal
+
+from app.db.crud import TransactionCrud
+from app.models.schemas import BudgetRequest
+from app.services.budget_service import BudgetService
+from tests.conftest import TENANT, make_transaction
+
+MONTH = "2025-03"
+
+
+def budget(db, target, scope="category", amount="1000"):
+    BudgetService(db, TENANT).set_budget(BudgetRequest(scope=scope, target=target, amount=Decimal(amount)))
+
+
+def spend(db, month=MONTH):
+    return {
+        status.target: (status.spent, status.count)
+        for status in BudgetService(db, TENANT).get_status(month).budgets
+    }
+
+
+def recounted(db, month=MONTH):
+    return {
+        status.target: (status.spent, status.count)
+        for status in BudgetService(db, TENANT).get_status(month, recount=True).budgets
+    }
+
+
+def test_counters_are_seeded_then_follow_inserts(db):
+    TransactionCrud.create_transactions(db, TENANT, [make_transaction(amount="100.00", message_id="m1")])
+    budget(db, "Food & Dining")
+    budget(db, "NCB VISA PLATINUM", scope="card")
+    assert spend(db) == {"Food & Dining": (Decimal("100.00"), 1), "NCB VISA PLATINUM": (Decimal("0.00"), 0)}
+
+    TransactionCrud.create_transactions(db, TENANT, [
+        make_transaction(amount="40.00", message_id="m2", card_type="NCB VISA PLATINUM"),
+        make_transaction(amount="999.00", message_id="m1"),  # Already stored, so it doesn't count again
+        make_transaction(amount="5.00", message_id="m3", excluded=True),
+    ])
+
+    assert spend(db) == {"Food & Dining": (Decimal("140.00"), 2), "NCB VISA PLATINUM": (Decimal("40.00"), 1)}
+    assert recounted(db) == spend(db)
+
+
+def test_exclusion_takes_spend_out_and_back(db):
+    budget(db, "Food & Dining")
+    transaction = make_transaction(amount="100.00")
+    TransactionCrud.create_transactions(db, TENANT, [transaction, make_transaction(amount="20.00")])
+    assert spend(db) == {"Food & Dining": (Decimal("120.00"), 2)}
+
+    TransactionCrud.set_exclusion(db, TENANT, transaction.id, True)
+    assert spend(db) == {"Food & Dining": (Decimal("20.00"), 1)}
+
+    TransactionCrud.set_exclusion(db, TENANT, transaction.id, False)
+    assert spend(db) == {"Food & Dining": (Decimal("120.00"), 2)}
+
+
+def test_recategorising_a_merchant_with_mixed_categories(db):
+    for target in ("Food & Dining", "Shopping & Retail", "Travel"):
+        budget(db, target)
+    TransactionCrud.create_transactions(db, TENANT, [
+        make_transaction(merchant="AMAZON", amount="100.00", primary_category="Food & Dining"),
+        make_transaction(merchant="AMAZON", amount="50.00", primary_category="Shopping & Retail",
+                         subcategory="Online Retailers"),
+        make_transaction(merchant="KFC", amount="30.00", primary_category="Food & Dining"),
+    ])
+    assert spend(db)["Travel"] == (Decimal("0.00"), 0)  # Reading the month seeds its counters
+
+    assert TransactionCrud.update_transactions_by_merchant(db, TENANT, "AMAZON", "Travel", "Flights") == 2
+
+    expected = {
+        "Food & Dining": (Decimal("30.00"), 1),
+        "Shopping & Retail": (Decimal("0.00"), 0),
+        "Travel": (Decimal("150.00"), 2),
+    }
+    assert spend(db) == expected
+    assert recounted(db) == expected
+
+
+def test_recategorising_only_moves_counted_spend(db):
+    budget(db, "Food & Dining")
+    budget(db, "Travel")
+    TransactionCrud.create_transactions(db, TENANT, [
+        make_transaction(merchant="AMAZON", amount="100.00"),
+        make_transaction(merchant="AMAZON", amount="70.00", excluded=True),
+        make_transaction(merchant="AMAZON", amount="25.00", primary_category="Travel"),
+    ])
+    assert spend(db) == {"Food & Dining": (Decimal("100.00"), 1), "Travel": (Decimal("25.00"), 1)}
+
+    TransactionCrud.update_transactions_by_merchant(db, TENANT, "AMAZON", "Travel", "Flights")
+
+    assert spend(db) == {"Food & Dining": (Decimal("0.00"), 0), "Travel": (Decimal("125.00"), 2)}
@@ -0,0 +1,127 @@
+import asyncio
+import gzip
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, choose_encoding
+
+BODY = b'{"merchant":"KFC HALF WAY TREE","amount":"1250.00"},' * 100
+
+
+def respond(*chunks, content_type="application/json", headers=()):
+    """ASGI app sending the chunks as one (or a streamed) response body"""
+    async def app(scope, receive, send):
+        raw = [(b"content-type", content_type.encode()), *headers]
+        if len(chunks) == 1:
+            raw.append((b"content-length", str(len(chunks[0])).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": raw})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def request(app, accept_encoding="gzip, deflate, br", minimum_size=1024):
+    """(response headers, body chunks) through the middleware"""
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": headers}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(CompressionMiddleware(app, minimum_size=minimum_size)(scope, receive, send))
+    start, *bodies = messages
+    return {name.decode(): value.decode() for name, value in start["headers"]}, [body["body"] for body in bodies]
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    """Negotiation as if the optional brotli package were installed"""
+    monkeypatch.setattr(compression, "brotli", SimpleNamespace())
+
+
+@pytest.mark.parametrize("accept_encoding, encoding", [
+    ("gzip, deflate", "gzip"),
+    ("GZIP", "gzip"),
+    ("*", "gzip"),
+    ("gzip;q=0, deflate", None),
+    ("gzip;q=oops", None),
+    ("br", None),
+    ("identity", None),
+    ("", None),
+])
+def test_gzip_is_negotiated_without_brotli(monkeypatch, accept_encoding, encoding):
+    monkeypatch.setattr(compression, "brotli", None)
+
+    assert choose_encoding(accept_encoding) == encoding
+
+
+@pytest.mark.parametrize("accept_encoding, encoding", [
+    ("gzip, deflate, br", "br"),
+    ("*", "br"),
+    ("br;q=0, gzip;q=0.5", "gzip"),
+    ("deflate", None),
+])
+def test_brotli_is_preferred_when_installed(with_brotli, accept_encoding, encoding):
+    assert choose_encoding(accept_encoding) == encoding
+
+
+def test_large_responses_are_gzipped(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+    headers, (body,) = request(respond(BODY))
+
+    assert headers["content-encoding"] == "gzip" and headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(body) < len(BODY)
+    assert gzip.decompress(body) == BODY
+
+
+def test_responses_below_the_minimum_size_are_sent_as_they_are():
+    headers, (body,) = request(respond(BODY[:1023]))
+
+    assert "content-encoding" not in headers and headers["vary"] == "Accept-Encoding"
+    assert body == BODY[:1023]
+
+
+def test_clients_not_accepting_compression_get_the_plain_body():
+    for accept_encoding in (None, "identity"):
+        headers, (body,) = request(respond(BODY), accept_encoding=accept_encoding)
+        assert "content-encoding" not in headers and "vary" not in headers and body == BODY
+
+
+@pytest.mark.parametrize("app, content_encoding", [
+    (respond(BODY, content_type="text/event-stream"), None),
+    (respond(BODY, content_type="image/png"), None),
+    (respond(BODY, headers=[(b"content-encoding", b"deflate")]), "deflate"),
+])
+def test_streams_and_encoded_bodies_pass_through(app, content_encoding):
+    headers, (body,) = request(app)
+
+    assert headers.get("content-encoding") == content_encoding and body == BODY
+
+
+def test_streamed_bodies_are_decodable_chunk_by_chunk(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    chunks = [BODY[:500], BODY[500:3000], BODY[3000:]]
+
+    headers, bodies = request(respond(*chunks), minimum_size=10000)
+
+    assert headers["content-encoding"] == "gzip" and "content-length" not in headers
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert [decoder.decompress(body) for body in bodies] == chunks
+    assert decoder.eof
+
+
+def test_brotli_round_trip():
+    brotli = pytest.importorskip("brotli")
+
+    headers, (body,) = request(respond(BODY))
+
+    assert headers["content-encoding"] == "br"
+    assert brotli.decompress(body) == BODY
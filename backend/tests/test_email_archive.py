@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.crud import EmailArchiveCrud
+from app.db.base_class import Base
+from app.services.archive_service import EmailArchive
+from tests.conftest import TENANT, ncb_email
+
+
+def test_archived_emails_read_back(db, tmp_path):
+    archive = EmailArchive(TENANT, archive_dir=str(tmp_path))
+    emails = [ncb_email(f"m{i}", merchant=f"MERCHANT {i}") for i in range(5)]
+
+    assert archive.add(db, emails) == 5
+    assert archive.add(db, emails) == 0
+    assert [email.message_id for email in archive.iter_emails(db)] == [f"m{i}" for i in range(5)]
+    assert archive.get(db, "m3").body == emails[3].body
+    archive.close()
+
+
+def test_concurrent_writers_get_distinct_offsets(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    def write(worker: int):
+        # Each writer has its own archive instance and session, like separate worker processes
+        db = Session()
+        try:
+            for batch in range(25):
+                emails = [ncb_email(f"w{worker}-{batch}-{i}", merchant=f"MERCHANT {worker} {i}") for i in range(2)]
+                EmailArchive(TENANT, archive_dir=str(tmp_path / "archive")).add(db, emails)
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(write, range(8)))
+
+    db = Session()
+    try:
+        entries = EmailArchiveCrud.get_entries(db, TENANT)
+        assert len(entries) == 400
+        assert len({(entry.segment, entry.offset) for entry in entries}) == 400
+        archive = EmailArchive(TENANT, archive_dir=str(tmp_path / "archive"))
+        assert all(archive.read(entry).message_id == entry.message_id for entry in entries)
+        archive.close()
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.api.api_v1.routers.events_router import stream_events
+from app.config import get_settings
+from app.core import events
+from app.core.events import EventBus, ServerEvent, get_event_bus
+
+
+def drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+def test_events_encode_as_server_sent_events():
+    encoded = ServerEvent(7, "sync_progress", {"stage": "fetching", "count": 3}).encode()
+
+    assert encoded == 'id: 7\nevent: sync_progress\ndata: {"stage":"fetching","count":3}\n\n'
+
+
+def test_events_fan_out_to_every_subscriber():
+    async def publish_to_two():
+        bus = EventBus()
+        first, second = bus.subscribe(), bus.subscribe()
+        bus.publish("transactions_created", {"count": 1})
+        bus.unsubscribe(second)
+        bus.publish("summary_delta", {"total": 5})
+        return drain(first), drain(second), bus.has_subscribers
+
+    first, second, has_subscribers = asyncio.run(publish_to_two())
+
+    assert [(event.id, event.event) for event in first] == [(1, "transactions_created"), (2, "summary_delta")]
+    assert [event.id for event in second] == [1]
+    assert has_subscribers
+
+
+def test_reconnecting_clients_resume_after_their_last_event():
+    async def reconnect():
+        bus = EventBus(replay_size=3)
+        for count in range(5):
+            bus.publish("sync_progress", {"count": count})
+        return drain(bus.subscribe(last_event_id=3)), drain(bus.subscribe(last_event_id=0))
+
+    resumed, too_old = asyncio.run(reconnect())
+
+    assert [event.id for event in resumed] == [4, 5]
+    assert [event.id for event in too_old] == [3, 4, 5]  # Older events were no longer kept
+
+
+def test_slow_subscribers_lose_their_oldest_events():
+    async def overflow():
+        bus = EventBus(queue_size=2)
+        queue = bus.subscribe()
+        for count in range(4):
+            bus.publish("sync_progress", {"count": count})
+        return drain(queue)
+
+    assert [event.id for event in asyncio.run(overflow())] == [3, 4]
+
+
+def test_events_published_from_worker_threads_reach_the_loop():
+    async def publish_from_thread():
+        bus = EventBus()
+        queue = bus.subscribe()
+        thread = threading.Thread(target=bus.publish, args=("sync_progress", {"stage": "parsing"}))
+        thread.start()
+        event = await asyncio.wait_for(queue.get(), timeout=1)
+        thread.join()
+        return event
+
+    assert asyncio.run(publish_from_thread()).data == {"stage": "parsing"}
+
+
+@pytest.fixture
+def buses(monkeypatch):
+    monkeypatch.setattr(events, "_buses", events.OrderedDict())
+    monkeypatch.setattr(events.settings, "TENANT_POOL_SIZE", 2)
+    return events._buses
+
+
+def test_each_tenant_has_its_own_bus(buses):
+    assert get_event_bus("alice") is get_event_bus("alice")
+    assert get_event_bus("alice") is not get_event_bus("bob")
+
+
+def test_only_idle_buses_are_dropped_beyond_the_pool_size(buses):
+    async def subscribe_alice():
+        get_event_bus("alice").subscribe()
+        get_event_bus("bob")
+        get_event_bus("carol")
+        get_event_bus("dave")
+
+    asyncio.run(subscribe_alice())
+
+    assert list(buses) == ["alice", "dave"]
+
+
+class FakeRequest:
+    """Stays connected for the given number of polls"""
+
+    def __init__(self, polls):
+        self.polls = polls
+
+    async def is_disconnected(self):
+        self.polls -= 1
+        return self.polls < 0
+
+
+def test_stream_replays_missed_events_then_keeps_the_connection_alive(monkeypatch):
+    monkeypatch.setattr(get_settings(), "EVENTS_HEARTBEAT_SECONDS", 0.01)
+    bus = EventBus()
+
+    async def stream():
+        bus.publish("sync_progress", {"stage": "fetching"})
+        bus.publish("transactions_created", {"count": 2})
+        response = await stream_events(FakeRequest(polls=2), last_event_id=1, events=bus)
+        return response, [chunk async for chunk in response.body_iterator]
+
+    response, chunks = asyncio.run(stream())
+
+    assert response.media_type == "text/event-stream"
+    assert response.headers["cache-control"] == "no-cache"
+    assert chunks == [
+        "retry: 5000\n\n",
+        'id: 2\nevent: transactions_created\ndata: {"count":2}\n\n',
+        ": keepalive\n\n",
+    ]
+    assert not bus.has_subscribers  # Unsubscribed once the client went away
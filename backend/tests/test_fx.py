@@ -0,0 +1,155 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from cachetools import TTLCache
+
+from app.db.crud import FxRateCrud, TransactionCrud
+from app.models.schemas import DateRange
+from app.services import fx_service
+from app.services.fx_service import FxService
+from app.services.transaction_service import TransactionService
+from tests.conftest import TENANT, FakeClassifier, make_transaction, ncb_email
+
+
+def store(db, currency, day, rate):
+    FxRateCrud.add_rates(db, [{"base": currency, "quote": "JMD", "date": day, "rate": Decimal(rate)}])
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Replaces the rate source; each published date maps to its quotes, anything else is unavailable"""
+    published = {}
+    requested = []
+
+    async def fake_fetch(self, session, version, source="historical"):
+        requested.append(version)
+        day = max(published, default=None) if version == "latest" else date.fromisoformat(version)
+        return (day, published[day]) if day in published else None
+
+    monkeypatch.setattr(FxService, "_fetch", fake_fetch)
+    monkeypatch.setattr(fx_service, "_unavailable_dates", TTLCache(maxsize=100, ttl=3600))
+    return published, requested
+
+
+def rates(db, *wanted):
+    return asyncio.run(FxService(db).get_rates(wanted))
+
+
+def test_rate_is_the_latest_on_or_before_the_day(db, fetches):
+    store(db, "USD", date(2025, 3, 1), "155.5")
+    store(db, "USD", date(2025, 3, 10), "157.25")
+
+    result = rates(db, (date(2025, 3, 1), "USD"), (date(2025, 3, 5), "USD"), (date(2025, 3, 12), "usd"))
+
+    assert result == {
+        (date(2025, 3, 1), "USD"): Decimal("155.5"),
+        (date(2025, 3, 5), "USD"): Decimal("155.5"),
+        (date(2025, 3, 12), "USD"): Decimal("157.25"),
+    }
+
+
+def test_days_before_the_stored_history_use_its_first_rate(db, fetches):
+    store(db, "USD", date(2025, 3, 10), "157.25")
+
+    assert rates(db, (date(2025, 1, 1), "USD")) == {(date(2025, 1, 1), "USD"): Decimal("157.25")}
+
+
+def test_only_the_rates_a_batch_can_use_are_read(db):
+    for offset in range(0, 365, 7):
+        store(db, "USD", date(2024, 1, 1) + timedelta(days=offset), str(150 + offset / 100))
+    store(db, "CAD", date(2025, 6, 1), "115")
+
+    rows = FxRateCrud.get_rates(db, {"USD", "CAD", "GBP"}, "JMD", date(2024, 3, 1), date(2024, 3, 20))
+
+    assert [(base, day) for base, day, _ in rows] == [
+        ("CAD", date(2025, 6, 1)),  # No earlier CAD rate, so its first one after the span
+        ("USD", date(2024, 2, 26)),  # The latest before the span
+        ("USD", date(2024, 3, 4)), ("USD", date(2024, 3, 11)), ("USD", date(2024, 3, 18)),
+        ("USD", date(2024, 3, 25)),
+    ]
+
+
+def test_batch_rates_match_lookups_of_the_whole_history(db, fetches):
+    for offset in range(0, 365, 7):
+        store(db, "USD", date(2024, 1, 1) + timedelta(days=offset), str(150 + offset / 100))
+
+    days = [date(2023, 12, 1), date(2024, 3, 2), date(2024, 3, 4), date(2024, 12, 31)]
+    result = rates(db, *((day, "USD") for day in days))
+
+    assert [result[(day, "USD")] for day in days] == [
+        Decimal("150.0"), Decimal("150.56"), Decimal("150.63"), Decimal("153.64")
+    ]
+
+
+def test_home_currency_needs_no_rate(db, fetches):
+    assert rates(db, (date(2025, 3, 1), "JMD")) == {}
+    assert fetches[1] == []
+
+
+def test_missing_days_are_fetched_once_and_stored(db, fetches):
+    published, requested = fetches
+    published[date(2025, 3, 1)] = {"USD": Decimal("155"), "CAD": Decimal("114")}
+    published[date(2025, 3, 2)] = {"USD": Decimal("156"), "CAD": Decimal("115")}
+    wanted = [(date(2025, 3, 1), "USD"), (date(2025, 3, 1), "CAD"), (date(2025, 3, 2), "USD")]
+
+    assert rates(db, *wanted) == {
+        (date(2025, 3, 1), "USD"): Decimal("155"),
+        (date(2025, 3, 1), "CAD"): Decimal("114"),
+        (date(2025, 3, 2), "USD"): Decimal("156"),
+    }
+    assert sorted(requested) == ["2025-03-01", "2025-03-02"]
+
+    # Stored now, so asking again doesn't reach the source
+    rates(db, *wanted)
+    assert len(requested) == 2
+
+
+def test_unpublished_days_fall_back_to_the_latest_rates(db, fetches):
+    published, requested = fetches
+    published[date(2025, 3, 1)] = {"USD": Decimal("155")}
+
+    result = rates(db, (date(2025, 3, 3), "USD"))
+
+    assert result == {(date(2025, 3, 3), "USD"): Decimal("155")}
+    assert requested == ["2025-03-03", "latest"]
+
+
+def test_fallback_rate_when_nothing_can_be_fetched(db, fetches, monkeypatch):
+    monkeypatch.setattr(fx_service.settings, "FX_FALLBACK_RATES", {"USD": 159.0})
+
+    assert rates(db, (date(2025, 3, 1), "USD"), (date(2025, 3, 1), "GBP")) == {
+        (date(2025, 3, 1), "USD"): Decimal("159.0")
+    }
+
+
+def test_foreign_alerts_are_converted_at_ingest(db, fetches):
+    store(db, "USD", date(2025, 3, 10), "156.5")
+    service = TransactionService(gmail_service=None, classifier=FakeClassifier(), db=db, tenant_id=TENANT)
+
+    asyncio.run(service.ingest_emails([ncb_email("m1", amount="12.34", currency="USD")]))
+
+    transaction, = TransactionCrud.get_transactions(db, TENANT)
+    assert transaction.original_currency == "USD"
+    assert transaction.original_amount == Decimal("12.34")
+    assert transaction.exchange_rate == Decimal("156.5")
+    assert transaction.amount == Decimal("1931.21")  # 12.34 * 156.5, rounded to the cent
+
+
+def test_reporting_currency_totals(db):
+    store(db, "USD", date(2025, 3, 1), "160")
+    TransactionCrud.create_transactions(db, TENANT, [
+        make_transaction(merchant="KFC", amount="1600.00", date=datetime(2025, 3, 5)),
+        # Charged in USD: reported at its original amount, not re-converted
+        make_transaction(merchant="NETFLIX", amount="1500.00", date=datetime(2025, 3, 5),
+                         original_currency="USD", original_amount=Decimal("9.99")),
+    ])
+    date_range = DateRange(start_date=datetime(2025, 3, 1), end_date=datetime(2025, 3, 31))
+
+    totals = {
+        row.merchant: Decimal(str(row.total)).quantize(Decimal("0.01"))
+        for row in TransactionCrud.get_spending_breakdown(db, TENANT, date_range, "USD")
+    }
+
+    assert totals == {"KFC": Decimal("10.00"), "NETFLIX": Decimal("9.99")}
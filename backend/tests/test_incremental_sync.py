@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.core.exceptions import GmailHistoryExpiredError
+from app.db.crud import SyncInfoCrud, TransactionCrud
+from app.models.schemas import DateRange
+from app.services.transaction_service import TransactionService
+from tests.conftest import TENANT, FakeClassifier, ncb_email
+
+
+class FakeGmail:
+    def __init__(self, history_emails=None, window_emails=(), history_expired=False):
+        self.history_emails = history_emails or []
+        self.window_emails = list(window_emails)
+        self.history_expired = history_expired
+        self.queries = []
+        self.history_calls = 0
+
+    def authorize(self, interactive=True):
+        return True
+
+    def get_messages_since(self, history_id, matches=None):
+        self.history_calls += 1
+        if self.history_expired:
+            raise GmailHistoryExpiredError(f"History ID {history_id} is no longer available")
+        # Like the real client, only messages whose headers match are downloaded
+        emails = [email for email in self.history_emails if not matches or matches(email.sender, email.subject)]
+        return emails, "200"
+
+    def get_messages(self, query):
+        self.queries.append(query)
+        return self.window_emails
+
+    def get_history_id(self):
+        return "300"
+
+
+def _service(db, gmail):
+    return TransactionService(gmail_service=gmail, classifier=FakeClassifier(), db=db, tenant_id=TENANT)
+
+
+def _synced_until(db, moment: datetime, history_id: str = "100"):
+    """A tenant whose mail is synced up to ``moment``, with a history ID taken then"""
+    SyncInfoCrud.update_last_sync(db, TENANT)
+    SyncInfoCrud.add_coverage(db, TENANT, moment - timedelta(days=30), moment)
+    SyncInfoCrud.update_history(db, TENANT, history_id, moment)
+
+
+def _recent_range(now: datetime) -> DateRange:
+    return DateRange(start_date=now - timedelta(days=7), end_date=now + timedelta(days=1))
+
+
+def test_incremental_sync_reads_history(db):
+    now = datetime.now()
+    _synced_until(db, now - timedelta(hours=2))
+    gmail = FakeGmail(history_emails=[ncb_email("h1", date=now - timedelta(hours=1))])
+
+    asyncio.run(_service(db, gmail)._sync_transactions(_recent_range(now)))
+
+    assert gmail.history_calls == 1
+    assert gmail.queries == []
+    assert TransactionCrud.get_ingested_message_ids(db, TENANT, ["h1"]) == {"h1"}
+    assert SyncInfoCrud.get_last_sync(db, TENANT).history_id == "200"
+
+
+def test_incremental_sync_skips_alerts_a_windowed_sync_would_skip(db):
+    now = datetime.now()
+    _synced_until(db, now - timedelta(hours=2))
+    declined = ncb_email("h2", date=now - timedelta(hours=1))
+    declined.body = declined.body.replace("Transaction Approved", "Transaction Declined")
+    gmail = FakeGmail(history_emails=[declined, ncb_email("h3", card_type="NCB KEYCARD", date=now)])
+
+    asyncio.run(_service(db, gmail)._sync_transactions(_recent_range(now)))
+
+    assert TransactionCrud.get_ingested_message_ids(db, TENANT, ["h2", "h3"]) == set()
+
+
+def test_expired_history_falls_back_to_windowed_sync(db):
+    now = datetime.now()
+    _synced_until(db, now - timedelta(hours=2))
+    gmail = FakeGmail(window_emails=[ncb_email("w1", date=now - timedelta(hours=1))], history_expired=True)
+
+    asyncio.run(_service(db, gmail)._sync_transactions(_recent_range(now)))
+
+    assert gmail.history_calls == 1
+    assert len(gmail.queries) == 1 and '"Transaction Approved"' in gmail.queries[0]
+    assert TransactionCrud.get_ingested_message_ids(db, TENANT, ["w1"]) == {"w1"}
+    # The windowed sync reached now, so a fresh history ID is recorded for the next run
+    assert SyncInfoCrud.get_last_sync(db, TENANT).history_id == "300"
+
+
+def test_gap_before_history_date_is_synced_by_window(db):
+    now = datetime.now()
+    _synced_until(db, now - timedelta(hours=2))
+    gmail = FakeGmail()
+
+    asyncio.run(_service(db, gmail)._sync_transactions(
+        DateRange(start_date=now - timedelta(days=60), end_date=now - timedelta(days=40))
+    ))
+
+    assert gmail.history_calls == 0
+    assert len(gmail.queries) == 1
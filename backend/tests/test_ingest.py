@@ -0,0 +1,58 @@
+import asyncio
+
+from app.core import events
+from app.db.crud import TransactionCrud
+from app.models.transaction_model import TransactionModel
+from app.services.transaction_service import TransactionService
+from tests.conftest import TENANT, FakeClassifier, make_transaction, ncb_email
+
+
+def test_create_transactions_skips_stored_message_ids(db):
+    first = make_transaction(message_id="m1")
+    duplicate = make_transaction(message_id="m1", amount="999.00")
+    other = make_transaction(message_id="m2")
+
+    assert TransactionCrud.create_transactions(db, TENANT, [first]) == {str(first.id)}
+    assert TransactionCrud.create_transactions(db, TENANT, [duplicate, other]) == {str(other.id)}
+
+    amounts = {row.gmail_message_id: row.amount for row in db.query(TransactionModel)}
+    assert amounts == {"m1": first.amount, "m2": other.amount}
+
+
+def test_message_ids_are_unique_per_tenant_only(db):
+    assert len(TransactionCrud.create_transactions(db, TENANT, [make_transaction(message_id="m1")])) == 1
+    assert len(TransactionCrud.create_transactions(db, "other", [make_transaction(message_id="m1")])) == 1
+
+
+def test_reingesting_emails_creates_nothing(db):
+    service = TransactionService(gmail_service=None, classifier=FakeClassifier(), db=db, tenant_id=TENANT)
+    emails = [ncb_email("m1"), ncb_email("m2", merchant="JUICI PATTIES")]
+
+    assert asyncio.run(service.ingest_emails(emails)) == 2
+    assert asyncio.run(service.ingest_emails(emails)) == 0
+    assert db.query(TransactionModel).count() == 2
+
+
+def test_rows_inserted_by_a_concurrent_sync_are_not_announced(db, monkeypatch):
+    monkeypatch.setattr(events, "_buses", events.OrderedDict())
+    service = TransactionService(gmail_service=None, classifier=FakeClassifier(), db=db, tenant_id=TENANT)
+    refreshed = []
+    monkeypatch.setattr(service, "_refresh_recurring", refreshed.append)
+    scored = []
+    monkeypatch.setattr(service, "_score_anomalies", scored.append)
+
+    # Another sync stored m1 after this one checked which emails were already ingested
+    TransactionCrud.create_transactions(db, TENANT, [make_transaction(merchant="KFC HALF WAY TREE", message_id="m1")])
+    monkeypatch.setattr(TransactionCrud, "get_ingested_message_ids", lambda *args: set())
+
+    created = asyncio.run(service.ingest_emails([ncb_email("m1"), ncb_email("m2", merchant="JUICI PATTIES")]))
+
+    assert created == 1
+    assert refreshed == [{"JUICI PATTIES"}]
+    assert [[transaction.gmail_message_id for transaction in batch] for batch in scored] == [["m2"]]
+    announced = [
+        transaction["gmail_message_id"]
+        for event in events.get_event_bus(TENANT)._recent if event.event == "transactions_created"
+        for transaction in event.data["transactions"]
+    ]
+    assert announced == ["m2"]
@@ -0,0 +1,136 @@
+import asyncio
+import random
+import zlib
+
+import numpy as np
+import pytest
+
+from app.config import get_settings
+from app.services import local_classifier
+from app.services.classifier_service import MerchantClassifier
+from app.services.local_classifier import HOLDOUT_BUCKETS, MIN_HOLDOUT, LocalMerchantModel
+
+settings = get_settings()
+
+SYLLABLES = ["KA", "LO", "MI", "TRE", "STA", "BOR", "QUI", "NEX", "FA", "ZU", "PEL", "ROM"]
+PLACES = ["KINGSTON", "HALF WAY TREE", "MONTEGO BAY", "PORTMORE", "LIGUANEA"]
+
+
+def merchants(count, label_count=4, seed=3):
+    """(names, labels) of distinct merchants named after a few stems per label, plus a place and store number"""
+    rng = random.Random(seed)
+    labels = [(f"Category {i}", f"Subcategory {i}") for i in range(label_count)]
+    stems = {label: ["".join(rng.choices(SYLLABLES, k=3)) for _ in range(3)] for label in labels}
+    found = {}
+    while len(found) < count:
+        label = rng.choice(labels)
+        found.setdefault(f"{rng.choice(stems[label])} {rng.choice(PLACES)} {rng.randint(1, 99)}", label)
+    return list(found), list(found.values())
+
+
+@pytest.fixture
+def epochs(monkeypatch):
+    """Epoch counts of every training run, calibration splits included"""
+    runs = []
+    train = local_classifier._train
+
+    def recording_train(examples, label_count, weights, bias, epoch_count):
+        runs.append(epoch_count)
+        return train(examples, label_count, weights, bias, epoch_count)
+
+    monkeypatch.setattr(local_classifier, "_train", recording_train)
+    return runs
+
+
+def test_first_model_is_calibrated_by_cross_validation(epochs):
+    names, labels = merchants(settings.LOCAL_CLASSIFIER_MIN_MERCHANTS)
+    assert sum(zlib.crc32(name.encode()) % HOLDOUT_BUCKETS == 0 for name in names) < MIN_HOLDOUT
+
+    model = LocalMerchantModel.fit(names, labels)
+
+    assert model.calibrated and model.calibrated_count == len(names)
+    assert model.holdout_accuracy > 0.9
+    assert len(epochs) == HOLDOUT_BUCKETS + 1
+
+
+def test_model_predicts_unseen_merchants():
+    names, labels = merchants(260)
+    model = LocalMerchantModel.fit(names[:200], labels[:200])
+
+    predictions = [model.predict(name)[:2] for name in names[200:]]
+    assert np.mean([prediction == label for prediction, label in zip(predictions, labels[200:])]) > 0.9
+
+
+def test_too_few_merchants_stay_uncalibrated_until_there_are_enough():
+    names, labels = merchants(80)
+    small = LocalMerchantModel.fit(names[:40], labels[:40])
+    assert not small.calibrated and small.calibrated_count == 0 and small.temperature == 1.0
+
+    # Not deferred by RECALIBRATE_GROWTH: the previous model was never calibrated
+    model = LocalMerchantModel.fit(names, labels, previous=small)
+    assert model.calibrated and model.calibrated_count == 80
+
+
+def test_warm_start_keeps_the_calibration_until_the_merchants_grow(epochs):
+    names, labels = merchants(300)
+    model = LocalMerchantModel.fit(names[:200], labels[:200])
+
+    del epochs[:]
+    retrained = LocalMerchantModel.fit(names[:220], labels[:220], previous=model)
+    assert epochs == [local_classifier.WARM_EPOCHS]
+    assert (retrained.temperature, retrained.calibrated_count) == (model.temperature, 200)
+    assert retrained.merchant_count == 220
+
+    recalibrated = LocalMerchantModel.fit(names, labels, previous=retrained)
+    assert recalibrated.calibrated_count == 300
+
+
+def test_saved_model_loads_identically(tmp_path):
+    names, labels = merchants(200)
+    model = LocalMerchantModel.fit(names, labels)
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+
+    loaded = LocalMerchantModel.load(path)
+    assert loaded.labels == model.labels and loaded.calibrated_count == model.calibrated_count
+    assert loaded.predict(names[0]) == pytest.approx(model.predict(names[0]))
+
+
+class StubModel:
+    merchant_count = 200
+
+    def __init__(self, confidence, calibrated=True):
+        self.confidence = confidence
+        self.calibrated = calibrated
+
+    def predict(self, name):
+        return "Food & Dining", "Restaurants", self.confidence
+
+
+def classify(model, monkeypatch):
+    """Local results of classify_merchants, and the merchants sent on to OpenAI"""
+    classifier = MerchantClassifier()
+    classifier.local_model = model
+    sent = []
+
+    async def fake_batch(merchant_names):
+        sent.extend(merchant_names)
+        return "{}"
+
+    monkeypatch.setattr(classifier, "_get_batch_classification", fake_batch)
+    return asyncio.run(classifier.classify_merchants(["KFC"])), sent
+
+
+def test_confident_calibrated_predictions_skip_openai(monkeypatch):
+    results, sent = classify(StubModel(settings.LOCAL_CLASSIFIER_MIN_CONFIDENCE + 0.01), monkeypatch)
+    assert results["KFC"].subcategory == "Restaurants" and sent == []
+
+
+def test_unconfident_predictions_go_to_openai(monkeypatch):
+    results, sent = classify(StubModel(settings.LOCAL_CLASSIFIER_MIN_CONFIDENCE - 0.01), monkeypatch)
+    assert results == {} and sent == ["KFC"]
+
+
+def test_uncalibrated_model_is_not_trusted(monkeypatch):
+    results, sent = classify(StubModel(0.99, calibrated=False), monkeypatch)
+    assert results == {} and sent == ["KFC"]
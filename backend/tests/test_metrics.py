@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY
+
+from app import main
+from app.core import metrics
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.db.crud import TransactionCrud
+from tests.conftest import TENANT
+
+
+def get(app, path):
+    """(status, headers, body) of a GET through the ASGI app"""
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http", "path": path,
+        "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": [],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages[0]["status"], dict(messages[0]["headers"]), b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def requests_counted(route, status, method="GET"):
+    return REGISTRY.get_sample_value(
+        "http_request_duration_seconds_count", {"method": method, "route": route, "status": str(status)}
+    ) or 0
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/budgets/{budget_id}")
+    def get_budget(budget_id: int):
+        if budget_id == 0:
+            raise HTTPException(status_code=404, detail="Budget not found")
+        return {"id": budget_id}
+
+    @app.get("/broken")
+    def broken():
+        raise RuntimeError("boom")
+
+    return app
+
+
+def test_requests_are_labelled_by_route_template(app):
+    before = requests_counted("/budgets/{budget_id}", 200), requests_counted("/budgets/{budget_id}", 404)
+
+    for path in ("/budgets/1", "/budgets/2", "/budgets/0"):
+        get(app, path)
+
+    assert requests_counted("/budgets/{budget_id}", 200) == before[0] + 2
+    assert requests_counted("/budgets/{budget_id}", 404) == before[1] + 1
+    assert requests_counted("/budgets/1", 200) == 0  # Raw paths would make a series per ID
+
+
+def test_unmatched_and_failed_requests_are_counted(app):
+    before = requests_counted("unmatched", 404), requests_counted("/broken", 500)
+
+    assert get(app, "/nothing/here")[0] == 404
+    with pytest.raises(RuntimeError):
+        get(app, "/broken")
+
+    assert requests_counted("unmatched", 404) == before[0] + 1
+    assert requests_counted("/broken", 500) == before[1] + 1
+
+
+def test_crud_queries_are_timed_by_method(db):
+    def queries():
+        return REGISTRY.get_sample_value("db_query_duration_seconds_count", {"method": "get_spending_series"}) or 0
+
+    before = queries()
+    TransactionCrud.get_spending_series(db, TENANT, datetime(2025, 1, 1))
+
+    assert queries() == before + 1
+
+
+def test_metrics_endpoint_serves_the_prometheus_text_format():
+    get(main.app, "/metrics")
+    status, headers, body = get(main.app, "/metrics")
+
+    assert status == 200
+    assert headers[b"content-type"].decode() == CONTENT_TYPE_LATEST
+    assert b'http_request_duration_seconds_count{method="GET",route="/metrics",status="200"}' in body
+    assert b"# TYPE db_query_duration_seconds histogram" in body
+
+
+def test_worker_processes_are_aggregated_from_the_multiprocess_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    seen = []
+    monkeypatch.setattr(metrics.multiprocess, "MultiProcessCollector", lambda registry: seen.append(registry))
+
+    content, media_type = render_metrics()
+
+    assert len(seen) == 1 and seen[0] is not REGISTRY
+    assert content == b"" and media_type == CONTENT_TYPE_LATEST  # Nothing from this process's registry
@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.db.base_class import Base
+from app.db.search import FTS_TABLE
+from app.migrate import SchemaMismatchError, head_revisions, migrate
+
+pytest.importorskip("alembic")
+
+
+@pytest.fixture
+def empty_engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    yield engine
+    engine.dispose()
+
+
+def schema_differences(engine):
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+
+    def include_object(obj, name, type_, reflected, compare_to):
+        return not (type_ == "table" and name.startswith(FTS_TABLE))
+
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"include_object": include_object})
+        return compare_metadata(context, Base.metadata)
+
+
+def forget_revision(engine):
+    """Leave the schema as it is but drop the version, like a database that predates migrations"""
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE alembic_version"))
+
+
+def test_new_database_matches_the_models(empty_engine):
+    assert {migrate(empty_engine)} == head_revisions()
+    assert schema_differences(empty_engine) == []
+
+
+def test_baseline_database_is_upgraded_with_its_rows(empty_engine):
+    migrate(empty_engine, "0001")
+    forget_revision(empty_engine)
+    with empty_engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO transactions (id, date, amount, merchant, excluded) "
+            "VALUES ('t1', '2025-03-10 12:00:00', 100, 'KFC HALF WAY TREE', 0)"
+        ))
+        connection.execute(text(
+            "INSERT INTO sync_info (id, last_sync_date) VALUES ('last_sync', '2025-03-11 00:00:00')"
+        ))
+
+    migrate(empty_engine)
+
+    assert schema_differences(empty_engine) == []
+    with empty_engine.connect() as connection:
+        assert connection.execute(text("SELECT id, tenant_id, seq FROM transactions")).all() == [("t1", "default", 1)]
+        assert connection.execute(text("SELECT tenant_id FROM sync_info")).scalars().all() == ["default"]
+        assert connection.execute(text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH 'kfc'")).all()
+
+
+def test_database_from_before_tenancy_keeps_its_archive(empty_engine):
+    migrate(empty_engine, "0005")
+    with empty_engine.begin() as connection:
+        connection.execute(text("INSERT INTO email_archive VALUES ('m1', '2025-03-10 12:00:00', 1, 0, 10, 'gzip')"))
+        connection.execute(text(
+            "INSERT INTO backfill_windows (start_date, end_date, status, message_count, transaction_count) "
+            "VALUES ('2025-03-01', '2025-04-01', 'done', 1, 1)"
+        ))
+    forget_revision(empty_engine)
+
+    migrate(empty_engine)
+
+    assert schema_differences(empty_engine) == []
+    with empty_engine.connect() as connection:
+        assert connection.execute(text("SELECT tenant_id, message_id FROM email_archive")).all() == [("default", "m1")]
+        assert connection.execute(text("SELECT tenant_id, status FROM backfill_windows")).all() == [("default", "done")]
+
+
+def test_database_created_from_current_models_is_stamped_and_upgraded(empty_engine):
+    Base.metadata.create_all(bind=empty_engine)
+
+    assert {migrate(empty_engine)} == head_revisions()
+    assert schema_differences(empty_engine) == []
+
+
+def test_database_without_baseline_columns_is_not_stamped(empty_engine):
+    with empty_engine.begin() as connection:
+        connection.execute(text("CREATE TABLE transactions (id VARCHAR(36) PRIMARY KEY, amount NUMERIC)"))
+
+    with pytest.raises(SchemaMismatchError, match="transactions.merchant"):
+        migrate(empty_engine)
+    with empty_engine.connect() as connection:
+        assert connection.execute(text(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'alembic_version'"
+        )).scalar() == 0
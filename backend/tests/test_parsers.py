@@ -0,0 +1,30 @@
+from app.parsers.registry import get_template_registry
+from tests.conftest import ncb_email
+
+
+def test_parses_approved_alert():
+    alert = get_template_registry().parse(ncb_email("m1", merchant="KFC HALF WAY TREE", amount="1,250.00"))
+
+    assert alert.bank == "NCB"
+    assert alert.merchant == "KFC HALF WAY TREE"
+    assert str(alert.amount) == "1250.00"
+    assert alert.currency == "JMD"
+    assert alert.card_type == "NCB VISA PLATINUM"
+
+
+def test_rejects_alert_that_is_not_an_approval():
+    email = ncb_email("m1")
+    email.body = email.body.replace("Transaction Approved", "Transaction Declined")
+
+    assert get_template_registry().parse(email) is None
+
+
+def test_rejects_alert_for_another_card():
+    assert get_template_registry().parse(ncb_email("m1", card_type="NCB KEYCARD")) is None
+
+
+def test_gmail_query_matches_parse_rules():
+    query = get_template_registry().gmail_query()
+
+    assert '"Transaction Approved"' in query
+    assert '"NCB VISA PLATINUM"' in query and '"MASTERCARD PLATINUM USD"' in query
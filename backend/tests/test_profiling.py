@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core import profiling
+from app.core.profiling import ProfilingMiddleware
+
+
+async def slow_app(scope, receive, send):
+    await asyncio.sleep(0.05 if scope["path"] == "/slow" else 0.01)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def request(middleware, path="/", headers=(), query_string=b""):
+    """Response headers of one request through the middleware"""
+    scope = {"type": "http", "method": "GET", "path": path, "headers": list(headers), "query_string": query_string}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    return dict(messages[0]["headers"])
+
+
+@pytest.fixture
+def sample_rate(monkeypatch):
+    def set_rate(rate):
+        monkeypatch.setattr(profiling.settings, "PROFILING_SAMPLE_RATE", rate)
+    set_rate(0.0)
+    return set_rate
+
+
+def should_profile(headers=(), query_string=b""):
+    return ProfilingMiddleware._should_profile({"headers": list(headers), "query_string": query_string})
+
+
+def test_requests_ask_to_be_profiled_by_header_or_query(sample_rate):
+    assert should_profile(headers=[(b"x-profile", b"1")])
+    assert should_profile(query_string=b"startDate=2025-01-01&profile=true")
+    assert not should_profile(headers=[(b"x-profile", b"0")], query_string=b"profile=no")
+
+
+def test_sample_rate_picks_a_random_fraction(sample_rate, monkeypatch):
+    sample_rate(0.25)
+    monkeypatch.setattr(profiling.random, "random", lambda: 0.2)
+    assert should_profile()
+
+    monkeypatch.setattr(profiling.random, "random", lambda: 0.3)
+    assert not should_profile()
+
+
+def test_report_counts_the_requests_sharing_the_event_loop(tmp_path, sample_rate):
+    middleware = ProfilingMiddleware(slow_app, profile_dir=str(tmp_path))
+
+    async def overlapping():
+        return await asyncio.gather(
+            request(middleware, "/slow", headers=[(b"x-profile", b"1")]),
+            request(middleware, "/fast"),
+            # Asks to be profiled, but another request already is
+            request(middleware, "/fast", query_string=b"profile=1"),
+        )
+
+    profiled, *others = asyncio.run(overlapping())
+
+    assert all(b"x-profile-id" not in headers for headers in others)
+    report = json.loads((tmp_path / f"{profiled[b'x-profile-id'].decode()}-slow.json").read_text())
+    assert report["concurrent_requests"] == 2
+    assert report["profiler"].startswith("pyinstrument" if profiling.PyinstrumentProfiler else "cProfile")
+    assert (tmp_path / report["profile"]).exists()
+
+    # Once it's done, a lone request is profiled with nothing overlapping it
+    alone = asyncio.run(request(middleware, "/slow", headers=[(b"x-profile", b"1")]))
+    report = json.loads((tmp_path / f"{alone[b'x-profile-id'].decode()}-slow.json").read_text())
+    assert report["concurrent_requests"] == 0
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.db.crud import TransactionCrud
+from app.services.recurring_service import RecurringPaymentService, detect_recurring
+from tests.conftest import TENANT, make_transaction
+
+START = datetime(2025, 1, 5, 9, 0)
+
+
+def charges(merchant, count, every_days, amount="1500.00", start=START):
+    return [
+        make_transaction(merchant, amount=amount, date=start + timedelta(days=i * every_days))
+        for i in range(count)
+    ]
+
+
+def detect(series):
+    """detect_recurring over {merchant: [(day, amount), ...]}, by merchant"""
+    names = list(series)
+    codes = np.array([code for code, name in enumerate(names) for _ in series[name]])
+    days = np.array([day for name in names for day, _ in series[name]], dtype=float)
+    amounts = np.array([amount for name in names for _, amount in series[name]], dtype=float)
+    detections = detect_recurring(codes, days, amounts, amounts, len(names))
+    return {names[code]: cadence for code, cadence in zip(detections.codes, detections.cadences)}
+
+
+def test_regular_stable_charges_are_recurring():
+    found = detect({
+        "NETFLIX": [(day, 1500) for day in (0, 30, 61, 91, 122)],
+        "GYM": [(day, 4000) for day in (0, 7, 14, 21, 28, 35)],
+        "KFC": [(day, 1200) for day in (0, 3, 19, 20, 45)],
+    })
+
+    assert found == {"NETFLIX": 2, "GYM": 0}
+
+
+def test_too_few_charges_or_varying_amounts_are_not_recurring():
+    found = detect({
+        "NETFLIX": [(0, 1500), (30, 1500)],
+        "SUPERMARKET": [(0, 3000), (30, 12000), (60, 800), (90, 20000)],
+        "JPS": [(0, 9000), (30, 11000), (60, 10000), (90, 9500)],
+    })
+
+    assert found == {"JPS": 2}
+
+
+def test_an_occasional_late_charge_is_tolerated():
+    found = detect({"NETFLIX": [(day, 1500) for day in (0, 30, 60, 97, 127, 157, 187)]})
+
+    assert found == {"NETFLIX": 2}
+
+
+@pytest.fixture
+def series_requests(monkeypatch):
+    """The merchants argument of every get_merchant_series call (None for the whole history)"""
+    requests = []
+    get_merchant_series = TransactionCrud.get_merchant_series
+
+    def recording(db, tenant_id, merchants=None):
+        requests.append(None if merchants is None else sorted(merchants))
+        return get_merchant_series(db, tenant_id, merchants)
+
+    monkeypatch.setattr(TransactionCrud, "get_merchant_series", staticmethod(recording))
+    return requests
+
+
+def merchants(db):
+    return [payment.merchant for payment in RecurringPaymentService(db, TENANT).get_recurring(active_only=False).payments]
+
+
+def test_first_refresh_covers_the_whole_history(db, series_requests):
+    TransactionCrud.create_transactions(db, TENANT, charges("NETFLIX", 4, 30) + charges("KFC", 2, 11))
+
+    assert RecurringPaymentService(db, TENANT).refresh(["KFC"]) == 1
+    assert series_requests == [None]
+    assert merchants(db) == ["NETFLIX"]
+
+
+def test_history_without_recurring_payments_is_only_scanned_once(db, series_requests):
+    TransactionCrud.create_transactions(db, TENANT, charges("KFC", 2, 11))
+    service = RecurringPaymentService(db, TENANT)
+
+    assert service.refresh(["KFC"]) == 0
+    assert service.refresh(["KFC"]) == 0
+    assert series_requests == [None, ["KFC"]]
+
+
+def test_later_refreshes_only_revisit_the_given_merchants(db, series_requests):
+    TransactionCrud.create_transactions(db, TENANT, charges("NETFLIX", 4, 30))
+    service = RecurringPaymentService(db, TENANT)
+    service.refresh()
+
+    TransactionCrud.create_transactions(db, TENANT, charges("SPOTIFY", 3, 30, amount="900.00"))
+    assert service.refresh(["SPOTIFY"]) == 1
+    assert series_requests == [None, ["SPOTIFY"]]
+    assert merchants(db) == ["NETFLIX", "SPOTIFY"]
+
+
+def test_full_runs_are_per_tenant(db, series_requests):
+    TransactionCrud.create_transactions(db, TENANT, charges("KFC", 2, 11))
+    RecurringPaymentService(db, TENANT).refresh()
+    RecurringPaymentService(db, "other").refresh(["KFC"])
+
+    assert series_requests == [None, None]
@@ -0,0 +1,112 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core import tenancy
+from app.services import scheduler_service
+from app.services.scheduler_service import SyncScheduler
+from app.services.transaction_service import TransactionService
+from tests.conftest import FakeClassifier
+
+
+@pytest.fixture
+def tokens(tmp_path, monkeypatch):
+    """Gives tenants a Gmail token file under a temporary data directory"""
+    monkeypatch.setattr(tenancy.settings, "TENANT_DATA_DIR", str(tmp_path / "tenants"))
+    monkeypatch.setattr(tenancy.settings, "GMAIL_TOKEN_PATH", str(tmp_path / "token.json"))
+
+    def add(*tenant_ids):
+        for tenant_id in tenant_ids:
+            path = Path(tenancy.gmail_token_path(tenant_id))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("{}")
+
+    return add
+
+
+class FakeGmail:
+    def __init__(self, authorized):
+        self.authorized = authorized
+
+    def authorize(self, interactive=True):
+        assert not interactive, "The scheduler must never start the OAuth browser flow"
+        return self.authorized
+
+
+@pytest.fixture
+def synced(engine, monkeypatch):
+    """Tenants run_once synced; tenants named "expired-*" have a token that needs re-authorising"""
+    tenant_ids = []
+
+    async def sync_recent(self, days):
+        tenant_ids.append(self.tenant_id)
+        return True
+
+    monkeypatch.setattr(scheduler_service, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(
+        scheduler_service, "get_gmail_service", lambda tenant_id: FakeGmail(not tenant_id.startswith("expired"))
+    )
+    monkeypatch.setattr(scheduler_service, "get_merchant_classifier", lambda tenant_id: FakeClassifier())
+    monkeypatch.setattr(scheduler_service, "get_email_archive", lambda tenant_id: None)
+    monkeypatch.setattr(TransactionService, "sync_recent", sync_recent)
+    return tenant_ids
+
+
+def test_intervals_vary_within_the_jitter():
+    scheduler = SyncScheduler(interval_minutes=10, jitter=0.2)
+
+    delays = [scheduler._next_delay() for _ in range(200)]
+
+    assert all(480 <= delay <= 720 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+@pytest.mark.skipif(scheduler_service.fcntl is None, reason="The lock file needs fcntl")
+def test_only_one_scheduler_holds_the_lock(tmp_path):
+    first, second = (SyncScheduler(lock_file=str(tmp_path / "scheduler.lock")) for _ in range(2))
+
+    assert first._acquire_lock() and first._acquire_lock()
+    assert not second._acquire_lock()
+
+    # Another worker takes over once the syncing one exits
+    first._release_lock()
+    assert second._acquire_lock()
+    second._release_lock()
+
+
+def test_tenants_without_a_usable_token_are_skipped(tokens, synced, monkeypatch):
+    monkeypatch.setattr(tenancy.settings, "TENANTS", ["alice", "bob", "expired-carol"])
+    tokens("alice", "expired-carol")
+
+    asyncio.run(SyncScheduler().run_once())
+
+    assert synced == ["alice"]
+
+
+def test_default_tenant_is_synced_without_an_allowlist(tokens, synced, monkeypatch):
+    monkeypatch.setattr(tenancy.settings, "TENANTS", [])
+    tokens("default", "alice")
+
+    asyncio.run(SyncScheduler().run_once())
+
+    assert synced == ["default"]
+
+
+def test_allowlist_replaces_the_default_tenant(tokens, synced, monkeypatch, tmp_path):
+    monkeypatch.setattr(tenancy.settings, "TENANTS", ["alice"])
+    tokens("default", "alice")
+    warnings = []
+    monkeypatch.setattr(scheduler_service.logger, "warning", warnings.append)
+
+    async def start_and_sync():
+        scheduler = SyncScheduler(lock_file=str(tmp_path / "scheduler.lock"))
+        scheduler.start()
+        await scheduler.run_once()
+        await scheduler.stop()
+
+    asyncio.run(start_and_sync())
+
+    assert synced == ["alice"]
+    assert len(warnings) == 1 and "isn't in TENANTS" in warnings[0]
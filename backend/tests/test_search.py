@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+from app.db.crud import TransactionCrud
+from app.db.search import FTS_TABLE, fts_query
+from app.models.transaction_model import TransactionModel
+from tests.conftest import TENANT, make_transaction
+
+
+def search(db, query_text, **kwargs):
+    results, total = TransactionCrud.search_transactions(db, TENANT, query_text, **kwargs)
+    assert total == len(results)
+    return [transaction.merchant for transaction in results]
+
+
+def set_merchant(db, merchant, new_merchant):
+    db.query(TransactionModel).filter(TransactionModel.merchant == merchant).update({"merchant": new_merchant})
+    db.commit()
+
+
+def test_words_match_as_prefixes(db):
+    TransactionCrud.create_transactions(db, TENANT, [make_transaction("UBER TRIP"), make_transaction("KFC")])
+
+    assert search(db, "ube tri") == ["UBER TRIP"]
+    assert search(db, "trip kfc") == []
+
+
+def test_operators_in_user_input_are_inert():
+    assert fts_query('uber" OR NOT *') == '"uber"* "OR"* "NOT"*'
+    assert fts_query("  ") == ""
+
+
+def test_index_follows_inserts_updates_and_deletes(db):
+    TransactionCrud.create_transactions(db, TENANT, [make_transaction("UBER TRIP"), make_transaction("KFC")])
+
+    set_merchant(db, "UBER TRIP", "BOLT RIDE")
+    assert search(db, "uber") == []
+    assert search(db, "bolt") == ["BOLT RIDE"]
+
+    db.query(TransactionModel).filter(TransactionModel.merchant == "KFC").delete()
+    db.commit()
+    assert search(db, "kfc") == []
+
+    TransactionCrud.create_transaction(db, TENANT, make_transaction("KFC PORTMORE"))
+    assert search(db, "kfc") == ["KFC PORTMORE"]
+    db.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('integrity-check', 1)"))
+
+
+def test_renumbered_rowids_still_find_the_right_rows(db):
+    TransactionCrud.create_transactions(db, TENANT, [make_transaction("UBER TRIP"), make_transaction("KFC")])
+
+    # VACUUM may renumber the implicit rowid of a table without an INTEGER PRIMARY KEY, and
+    # doesn't fire triggers doing so
+    db.execute(text("UPDATE transactions SET rowid = -rowid"))
+    db.execute(text("UPDATE transactions SET rowid = 3 + rowid"))
+    db.commit()
+
+    assert search(db, "kfc") == ["KFC"]
+    assert search(db, "uber") == ["UBER TRIP"]
+
+
+def test_merchant_matches_outrank_description_matches(db):
+    TransactionCrud.create_transactions(db, TENANT, [
+        make_transaction("AMAZON MARKETPLACE", description="books"),
+        make_transaction("BOOKS AND THINGS", description="stationery"),
+    ])
+
+    assert search(db, "books") == ["BOOKS AND THINGS", "AMAZON MARKETPLACE"]
+
+
+def test_search_is_scoped_to_the_tenant_and_filters(db):
+    TransactionCrud.create_transactions(db, TENANT, [make_transaction("KFC"), make_transaction("KFC", excluded=True)])
+    TransactionCrud.create_transactions(db, "other", [make_transaction("KFC")])
+
+    assert search(db, "kfc") == ["KFC", "KFC"]
+    assert search(db, "kfc", include_excluded=False) == ["KFC"]
+
+
+class CompiledQuery(Query):
+    """Records the SQL a query would run instead of running it"""
+    statements = []
+
+    def _record(self):
+        self.statements.append(str(self.statement.compile(dialect=postgresql.dialect())))
+
+    def count(self):
+        self._record()
+        return 0
+
+    def all(self):
+        self._record()
+        return []
+
+
+def test_postgres_uses_the_trigram_path():
+    session = SimpleNamespace(bind=SimpleNamespace(dialect=postgresql.dialect()))
+    session.query = lambda *entities: CompiledQuery(entities)
+    CompiledQuery.statements = []
+
+    TransactionCrud.search_transactions(session, TENANT, "uber")
+
+    select = CompiledQuery.statements[-1]
+    assert "ILIKE" in select and FTS_TABLE not in select
+    assert "ORDER BY greatest(similarity(transactions.merchant" in select
@@ -0,0 +1,36 @@
+from app.db.crud import TransactionCrud
+from app.models.transaction_model import TransactionModel
+from tests.conftest import TENANT, make_transaction
+
+
+def seqs_after(db, after_seq, tenant_id=TENANT):
+    return [row[0] for row in TransactionCrud.get_rows_after(db, tenant_id, after_seq, 100)]
+
+
+def test_new_rows_get_increasing_seqs(db):
+    TransactionCrud.create_transactions(db, TENANT, [make_transaction(), make_transaction()])
+    TransactionCrud.create_transaction(db, TENANT, make_transaction())
+
+    assert seqs_after(db, 0) == [1, 2, 3]
+    assert seqs_after(db, 2) == [3]
+
+
+def test_row_added_after_deleting_the_newest_is_past_the_watermark(db):
+    TransactionCrud.create_transactions(db, TENANT, [make_transaction(message_id="m1"), make_transaction(message_id="m2")])
+    watermark = seqs_after(db, 0)[-1]
+
+    db.query(TransactionModel).filter(TransactionModel.gmail_message_id == "m2").delete()
+    db.commit()
+    TransactionCrud.create_transactions(db, TENANT, [make_transaction(message_id="m3")])
+
+    # A rowid watermark would miss m3, which takes over m2's rowid
+    rows = TransactionCrud.get_rows_after(db, TENANT, watermark, 100)
+    assert len(rows) == 1 and rows[0][0] > watermark
+
+
+def test_seqs_are_shared_across_tenants(db):
+    TransactionCrud.create_transactions(db, TENANT, [make_transaction()])
+    TransactionCrud.create_transactions(db, "other", [make_transaction()])
+
+    assert seqs_after(db, 0) == [1]
+    assert seqs_after(db, 0, "other") == [2]
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from app.db.crud import SyncInfoCrud
+from app.models.schemas import DateRange
+from tests.conftest import TENANT
+
+JAN = datetime(2024, 1, 1)
+
+
+def day(n: int) -> datetime:
+    return JAN + timedelta(days=n)
+
+
+def coverage(db, tenant_id=TENANT):
+    return [
+        (interval.start_date, interval.end_date)
+        for interval in SyncInfoCrud.get_coverage(db, tenant_id, datetime.min, datetime.max)
+    ]
+
+
+def gaps(db, start, end):
+    return [
+        (gap.start_date, gap.end_date)
+        for gap in SyncInfoCrud.get_sync_gaps(db, TENANT, DateRange(start_date=start, end_date=end))
+    ]
+
+
+def test_disjoint_intervals_are_kept_apart(db):
+    SyncInfoCrud.add_coverage(db, TENANT, day(0), day(5))
+    SyncInfoCrud.add_coverage(db, TENANT, day(10), day(15))
+
+    assert coverage(db) == [(day(0), day(5)), (day(10), day(15))]
+
+
+def test_overlapping_and_touching_intervals_merge(db):
+    SyncInfoCrud.add_coverage(db, TENANT, day(0), day(5))
+    SyncInfoCrud.add_coverage(db, TENANT, day(10), day(15))
+    SyncInfoCrud.add_coverage(db, TENANT, day(20), day(25))
+
+    # Overlaps the first interval and touches the second; the third stays apart
+    SyncInfoCrud.add_coverage(db, TENANT, day(3), day(10))
+
+    assert coverage(db) == [(day(0), day(15)), (day(20), day(25))]
+
+
+def test_interval_inside_existing_coverage_changes_nothing(db):
+    SyncInfoCrud.add_coverage(db, TENANT, day(0), day(10))
+    SyncInfoCrud.add_coverage(db, TENANT, day(2), day(4))
+
+    assert coverage(db) == [(day(0), day(10))]
+
+
+def test_coverage_is_kept_per_tenant(db):
+    SyncInfoCrud.add_coverage(db, TENANT, day(0), day(5))
+    SyncInfoCrud.add_coverage(db, "other", day(3), day(8))
+
+    assert coverage(db) == [(day(0), day(5))]
+    assert coverage(db, "other") == [(day(3), day(8))]
+
+
+def test_gaps_are_the_uncovered_parts_of_the_range(db):
+    SyncInfoCrud.add_coverage(db, TENANT, day(5), day(10))
+    SyncInfoCrud.add_coverage(db, TENANT, day(15), day(20))
+
+    assert gaps(db, day(0), day(25)) == [(day(0), day(5)), (day(10), day(15)), (day(20), day(25))]
+    assert gaps(db, day(6), day(9)) == []
+    assert gaps(db, day(6), day(12)) == [(day(10), day(12))]
+
+
+def test_long_gaps_are_limited_to_the_most_recent_days(db, monkeypatch):
+    from app.db import crud
+
+    monkeypatch.setattr(crud.settings, "MAX_SYNC_DAYS", 10)
+
+    assert gaps(db, day(0), day(30)) == [(day(20), day(30))]
+
+
+def test_legacy_sync_range_becomes_coverage(db):
+    sync_info = SyncInfoCrud.update_last_sync(db, TENANT)
+    sync_info.start_date, sync_info.end_date = day(0), day(10)
+    db.commit()
+
+    assert gaps(db, day(5), day(15)) == [(day(10), day(15))]
+    assert coverage(db) == [(day(0), day(10))]
+    assert SyncInfoCrud.get_last_sync(db, TENANT).start_date is None
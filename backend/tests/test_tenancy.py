@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.api_v1 import dependencies
+from app.core import events, tenancy
+from app.core.exceptions import GmailNotAuthorizedError
+from app.core.tenancy import DEFAULT_TENANT, validate_tenant_id
+from app.models.schemas import DateRange
+from app.services.transaction_service import TransactionService
+from tests.conftest import TENANT, FakeClassifier
+
+KEYS = {"alice-key": "alice", "bob-key": "bob"}
+
+
+@pytest.fixture
+def multi_tenant(monkeypatch):
+    monkeypatch.setattr(tenancy.settings, "TENANTS", ["default", "alice"])
+    monkeypatch.setattr(dependencies.settings, "TENANT_API_KEYS", KEYS)
+
+
+def test_only_the_default_tenant_exists_without_an_allowlist(monkeypatch):
+    monkeypatch.setattr(tenancy.settings, "TENANTS", [])
+
+    assert validate_tenant_id(DEFAULT_TENANT) == DEFAULT_TENANT
+    with pytest.raises(ValueError):
+        validate_tenant_id("alice")
+
+
+def test_requests_are_the_default_tenant_without_api_keys(monkeypatch):
+    monkeypatch.setattr(dependencies.settings, "TENANT_API_KEYS", {})
+
+    assert dependencies._tenant_for_api_key(None) == DEFAULT_TENANT
+    assert dependencies._tenant_for_api_key("anything") == DEFAULT_TENANT
+
+
+def test_tenant_comes_from_the_api_key(multi_tenant):
+    assert dependencies._tenant_for_api_key("alice-key") == "alice"
+
+
+@pytest.mark.parametrize("api_key", [None, "", "alice-ke", "mallory-key"])
+def test_missing_or_unknown_api_keys_are_rejected(multi_tenant, api_key):
+    with pytest.raises(HTTPException) as error:
+        dependencies._tenant_for_api_key(api_key)
+    assert error.value.status_code == 401
+
+
+def test_api_key_of_a_tenant_outside_the_allowlist_is_forbidden(multi_tenant):
+    with pytest.raises(HTTPException) as error:
+        dependencies._tenant_for_api_key("bob-key")
+    assert error.value.status_code == 403
+
+
+class UnauthorizedGmail:
+    def authorize(self, interactive=True):
+        assert not interactive, "Requests must never start the OAuth browser flow"
+        return False
+
+
+def test_sync_without_a_gmail_token_is_a_conflict(db):
+    service = TransactionService(gmail_service=UnauthorizedGmail(), classifier=FakeClassifier(), db=db, tenant_id=TENANT)
+
+    with pytest.raises(GmailNotAuthorizedError) as error:
+        asyncio.run(service._sync_transactions(DateRange()))
+    assert error.value.status_code == 409
+
+
+def test_idle_event_buses_are_dropped_beyond_the_pool_size(monkeypatch):
+    monkeypatch.setattr(events.settings, "TENANT_POOL_SIZE", 2)
+    monkeypatch.setattr(events, "_buses", events.OrderedDict())
+
+    async def subscribe(tenant_id):
+        return events.get_event_bus(tenant_id).subscribe()
+
+    busy = events.get_event_bus("busy")
+    asyncio.run(subscribe("busy"))
+    idle = events.get_event_bus("idle")
+    events.get_event_bus("third")
+
+    assert list(events._buses) == ["busy", "third"]
+    assert events.get_event_bus("busy") is busy
+    assert events.get_event_bus("idle") is not idle
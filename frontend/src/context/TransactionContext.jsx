@@ -1,11 +1,50 @@
-import React, { createContext, useContext, useState } from "react";
-import { useQuery } from "@tanstack/react-query";
-import { fetchTransactions, getTransactionCount } from "../services/api";
+import React, { createContext, useContext, useEffect, useRef, useState } from "react";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
+import {
+  fetchTransactions,
+  getTransactionCount,
+  subscribeToEvents,
+} from "../services/api";
 import { transactionQueryKey } from "../hooks/useTransactionData";
 import { useDateRange } from "./DateRangeContext";
 
 const TransactionContext = createContext();
 
+// Add (sign = 1) or remove (sign = -1) a transaction's amount from one summary bucket
+const adjustBucket = (buckets, key, amount, sign) => {
+  const bucket = buckets[key] || { total: 0, count: 0, average: 0, merchants: [] };
+  const total = Number(bucket.total) + sign * amount;
+  const count = bucket.count + sign;
+  return {
+    ...buckets,
+    [key]: { ...bucket, total, count, average: count ? total / count : 0 },
+  };
+};
+
+const adjustSummary = (summary, transaction, sign) => {
+  const amount = Number(transaction.amount);
+  const totalSpending = Number(summary.total_spending) + sign * amount;
+  const transactionCount = summary.transaction_count + sign;
+  return {
+    ...summary,
+    total_spending: totalSpending,
+    transaction_count: transactionCount,
+    average_transaction: transactionCount ? totalSpending / transactionCount : 0,
+    by_primary_category: adjustBucket(
+      summary.by_primary_category, transaction.primary_category, amount, sign
+    ),
+    by_subcategory: adjustBucket(
+      summary.by_subcategory,
+      `${transaction.primary_category} - ${transaction.subcategory}`,
+      amount,
+      sign
+    ),
+    by_card_type: transaction.card_type
+      ? adjustBucket(summary.by_card_type, transaction.card_type, amount, sign)
+      : summary.by_card_type,
+  };
+};
+
 export const TransactionProvider = ({ children }) => {
   // Use category filters only, date range comes from DateRangeContext
   const [filters, setFilters] = useState({
@@ -21,6 +60,7 @@ export const TransactionProvider = ({ children }) => {
 
   // Get date range from DateRangeContext
   const { appliedDateRange } = useDateRange();
+  const queryClient = useQueryClient();
 
   // Fetch transaction count for pagination
   const {
@@ -57,6 +97,53 @@ export const TransactionProvider = ({ children }) => {
     enabled: !!appliedDateRange.startDate && !!appliedDateRange.endDate,
   });
 
+  // Apply live updates pushed by the backend instead of polling /transactions. The stream stays
+  // open across filter and page changes; handlers read the current view from this ref.
+  const currentView = useRef();
+  currentView.current = { filters, appliedDateRange, pagination };
+
+  useEffect(() => {
+    const inRange = (transaction) => {
+      const { startDate, endDate } = currentView.current.appliedDateRange;
+      const date = new Date(transaction.date);
+      return !!startDate && !!endDate && date >= startDate && date <= endDate;
+    };
+
+    return subscribeToEvents({
+      // Patch rows on the current page; the summary only changes if the cached row actually differs,
+      // so events for changes a refetch has already picked up are harmless
+      transactions_updated: ({ transactions }) => {
+        const view = currentView.current;
+        queryClient.setQueryData(
+          transactionQueryKey(view.filters, view.appliedDateRange, view.pagination),
+          (data) => {
+            if (!data) return data;
+            let summary = data.transaction_summary;
+            const rows = data.transactions.map((row) => {
+              const updated = transactions.find((t) => t.id === row.id);
+              if (!updated) return row;
+              if (updated.excluded !== row.excluded) {
+                summary = adjustSummary(summary, updated, updated.excluded ? -1 : 1);
+              }
+              return { ...row, ...updated };
+            });
+            return { ...data, transactions: rows, transaction_summary: summary };
+          }
+        );
+      },
+      // New rows can change ordering and pagination, so refetch once when any fall in the range
+      transactions_created: ({ transactions }) => {
+        if (transactions.some(inRange)) {
+          queryClient.invalidateQueries({ queryKey: ["transactions"] });
+          queryClient.invalidateQueries({ queryKey: ["transactionCount"] });
+        }
+      },
+      category_updated: () => {
+        queryClient.invalidateQueries({ queryKey: ["transactions"] });
+      },
+    });
+  }, [queryClient]);
+
   const updateFilters = (categories) => {
     setFilters((prev) => ({
       ...prev,
@@ -3,6 +3,11 @@ import axios from "axios";
 const API_BASE_URL =
   process.env.REACT_APP_API_BASE_URL || "http://localhost:8000/api/v1";
 
+// Multi-tenant deployments identify the tenant by API key. It is asked for on the first 401 and
+// kept in this browser, never built into the bundle.
+const API_KEY_STORAGE_KEY = "apiKey";
+const getApiKey = () => window.localStorage.getItem(API_KEY_STORAGE_KEY);
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -10,10 +15,23 @@ const api = axios.create({
   },
 });
 
+api.interceptors.request.use((config) => {
+  const apiKey = getApiKey();
+  if (apiKey) config.headers.Authorization = `Bearer ${apiKey}`;
+  return config;
+});
+
 // Add response interceptor for error handling
 api.interceptors.response.use(
   (response) => response,
   (error) => {
+    if (error.response?.status === 401 && !error.config._apiKeyRetry) {
+      const apiKey = window.prompt("API key");
+      if (apiKey) {
+        window.localStorage.setItem(API_KEY_STORAGE_KEY, apiKey);
+        return api({ ...error.config, _apiKeyRetry: true });
+      }
+    }
     const errorMessage =
       error.response?.data?.detail || "An unexpected error occurred";
     console.error("API Error:", errorMessage);
@@ -182,3 +200,16 @@ export const createTransaction = async (transactionData) => {
     throw new Error(`Failed to create transaction: ${error.message}`);
   }
 };
+
+// Live updates pushed by the backend over Server-Sent Events. EventSource reconnects on its own
+// and resumes from the last event it saw. Returns a function that closes the stream.
+export const subscribeToEvents = (handlers) => {
+  if (typeof EventSource === "undefined") return () => {};
+  const apiKey = getApiKey();
+  const query = apiKey ? `?api_key=${encodeURIComponent(apiKey)}` : "";
+  const source = new EventSource(`${API_BASE_URL}/events${query}`);
+  Object.entries(handlers).forEach(([event, handler]) => {
+    source.addEventListener(event, (message) => handler(JSON.parse(message.data)));
+  });
+  return () => source.close();
+};